@@ -3,12 +3,38 @@
 SOLVER_CN = "Solver"
 TIME_CN = "Elapsed Time (s)"
 TEST_PATH_CN = 'Test Path'
-SUCCESS_CN = 'Success' # Takes on values False, True, Time Out
+SUCCESS_CN = 'Success' # Takes on values False, True, Timed Out, Out of Memory, Skipped (...)
+TIMED_OUT = 'Timed Out'
+OUT_OF_MEMORY = 'Out of Memory'
+SKIPPED = 'Skipped' # Prefix of tests not run, e.g. Skipped (predicted timeout), see mmb.py --skip_after
 
 D_CN = 'd'
 M_CN = 'm'
 N_CN = 'n'
 
+USER_TIME_CN = 'User Time (s)'
+SYSTEM_TIME_CN = 'System Time (s)'
+PEAK_RSS_CN = 'Peak RSS (MB)'
+PARSE_TIME_CN = 'Parse Time (s)'
+SOLVE_TIME_CN = 'Solve Time (s)'
+EMIT_TIME_CN = 'Emit Time (s)'
+
+# REPEATED RUN COLUMNS (mmb.py --repeat)
+
+MIN_TIME_CN = 'Min Time (s)'
+MEDIAN_TIME_CN = 'Median Time (s)'
+IQR_TIME_CN = 'IQR Time (s)'
+STDDEV_TIME_CN = 'Stddev Time (s)'
+REPEATS_CN = 'Repeats'
+SAMPLES_CN = 'Samples (s)' # Elapsed time of every run, separated by SAMPLES_SEP
+SAMPLES_SEP = ';'
+
+# SOLUTION QUALITY COLUMNS
+
+MAX_MATCHING_CN = 'Max Matching'
+MATCHING_SIZE_CN = 'Matching Size' # Also the best matching found by solvers that timed out
+QUALITY_CN = 'Quality' # Matching Size / Max Matching
+
 
 # CUSTOM COLUMNS
 
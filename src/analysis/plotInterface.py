@@ -12,9 +12,15 @@ For a simple run, use the following:
 
 python <path_to_this_file> <path_to_csv>
 
+The path may also be an SQLite results database written by mmb.py, in
+which case only the course, d and solvers asked for are loaded:
+
+python <path_to_this_file> <path_to_db> -c <course> -pd 2 -sv <solver> -sv <solver>
+
 '''
 
 import os
+import sys
 import pathlib
 
 import seaborn as sns
@@ -33,6 +39,10 @@ import argparse
 from os import listdir
 from os.path import isfile, join
 
+# Finds path to mmb_results, better done by updating PATH in environment.
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+from mmb_results import query_results, SQLITE_EXTS
+
 
 def prepareData(args):
     """Creates the dataframe after parsing CSV file 
@@ -63,6 +73,18 @@ def prepareData(args):
 
         return df, COURSENAME
     
+    # Case - When an SQLite results database is provided, query the subset asked for
+    elif str(args.path).endswith(SQLITE_EXTS):
+        columns, rows = query_results(args.path, args.course, args.partitions, args.solver)
+
+        assert len(rows) >= 1, "NO RESULTS MATCH THE COURSE, D AND SOLVERS SPECIFIED"
+
+        df = pd.DataFrame(rows, columns=columns)
+
+        COURSENAME = args.course or args.path.stem
+
+        return df, COURSENAME
+
     # Case - When only a file path is provided
     else:
         FILEPATH = args.path
@@ -77,6 +99,8 @@ def refineData(df):
     df.drop_duplicates(subset=[TEST_PATH_CN,SOLVER_CN],keep="first", inplace=True)        
     
     df.drop(df[df[SUCCESS_CN]=='False'].index, inplace=True)
+    df.drop(df[df[SUCCESS_CN]==OUT_OF_MEMORY].index, inplace=True)
+    df.drop(df[df[SUCCESS_CN].astype(str).str.startswith(SKIPPED)].index, inplace=True)
     
     # Leaves a single case where it timed out, so that it's expressed in the graph
     mask = df.duplicated(subset=[SOLVER_CN, SUCCESS_CN], keep='first') & (df[SUCCESS_CN] == "Timed Out")
@@ -161,6 +185,11 @@ if __name__ == "__main__":
     parser.add_argument("-o", "--output", action="store_true", help = "Whether or not to output the graph to a file")
     parser.add_argument("-lt", "--logtime", action="store_true", help = "Whether or not to Use Logarithimic Time")
     parser.add_argument("-rmr", "--removeExcessRuntime", action="store_true", help = "Whether or not to subtract the earliest pass test from each runtime")
+    parser.add_argument("-s", "--statistic", choices=["median", "min"], default="median", help = "Which statistic of repeated runs (mmb.py --repeat) to plot as the runtime")
+    parser.add_argument("-c", "--course", default=None, help = "Only plot results of this course (.mmb file name) from an SQLite database")
+    parser.add_argument("-pd", "--partitions", default=None, type=int, help = "Only plot results for instances with this d from an SQLite database")
+    parser.add_argument("-sv", "--solver", action="append", help = "Only plot results of this solver from an SQLite database, may be repeated")
+    parser.add_argument("-rs", "--rawSamples", action="store_true", help = "Plot every repeated run recorded with mmb.py --raw_samples instead of one time per test")
 
     # Parses input arguments
     args = parser.parse_args()
@@ -168,10 +197,15 @@ if __name__ == "__main__":
     # -------- PROGRAM STARTS HERE -------------------------
 
     df, COURSENAME = prepareData(args)    
+    selectTimeStatistic(df, args.statistic)
 
     # REFINED DATA OVERWRITES VANILLA
     refineData(df)
 
+    if args.rawSamples:
+        df = explodeSamples(df)
+        addMinusFirstPassTime(df)
+
     groupsOfNames = df.groupby(SOLVER_CN)
 
     f, (ax1, ax2)= plt.subplots(1,2, figsize=(16, 8)) # Width and Height of the chart
@@ -19,6 +19,32 @@ def addTimeOutColumn(df):
     df[TIMEOUT_CN] = [df[TIME_CN].max()]*len(df)
 
 
+# --- Repeated Runs ---
+def selectTimeStatistic(df, statistic):
+    """Uses the min or median of repeated runs as the time of each test.
+    Rows without the statistic, e.g. timeouts or results from single
+    runs, keep their elapsed time."""
+    column = {'min': MIN_TIME_CN, 'median': MEDIAN_TIME_CN}[statistic]
+    if column in df:
+        df[TIME_CN] = df[column].fillna(df[TIME_CN])
+
+
+def explodeSamples(df):
+    """Returns df with one row per recorded run of each test, with that
+    run's time as its time.  Tests without raw samples keep one row."""
+    if SAMPLES_CN not in df:
+        return df
+
+    def samples(row):
+        if isinstance(row[SAMPLES_CN], str) or not math.isnan(row[SAMPLES_CN]):
+            return [float(t) for t in str(row[SAMPLES_CN]).split(SAMPLES_SEP)]
+        return [row[TIME_CN]]
+
+    df = df.copy()
+    df[TIME_CN] = df.apply(samples, axis=1)
+    return df.explode(TIME_CN, ignore_index=True).astype({TIME_CN: float})
+
+
 # --- Metrics ---
 def closeToCompleteMetric(n,m,d,t,to):
     return m/(n**d)
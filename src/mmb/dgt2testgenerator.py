@@ -33,28 +33,28 @@ def make_graph(d, n, m, matching_size, name):
     exclude_index = r.randint(0, len(nodes) - 1)
 
     # get nodes that added edges can use 
+    unused = set(nodes[exclude_index])
     okay = []
     for i in range(1, n + 1):
-        if nodes[exclude_index].count(i) == 0:
+        if i not in unused:
             okay.append(i)
 
-    
-    for i in range(matching_size, m):
+    # every added edge goes through a matched node of the excluded column
+    if m > matching_size * n ** (d - 1):
+        raise ValueError(f"m = {m} is more than the {matching_size * n ** (d - 1)} distinct edges possible")
+
+    seen = set(tuple(edge) for edge in edges)
+    while len(edges) < m:
         new_edge = []
         for j in range(0, d):
             if j != exclude_index:
                 new_edge.append(range(1, n + 1)[r.randint(0, n - 1)])
             else:
                 new_edge.append(okay[r.randint(0, len(okay) - 1)])
-        if edges.count(new_edge) == 0:
+        if tuple(new_edge) not in seen:
+            seen.add(tuple(new_edge))
             edges.append(new_edge)
-        else:
-            #Just generate a new edge
-            i = i - 1
-
-        if len(edges) == m:
-            #Be prepared to stop making edges early to prevent infinite loop
-            break
+        # else just generate a new edge
 
     f = open(name, "w")
     f.write(str(d) + "\n")
@@ -66,7 +66,7 @@ def make_graph(d, n, m, matching_size, name):
             to_add = to_add + str(node) + ", "
         f.write(to_add[:-2] + "\n")
     f.write(str(matching_size))
-    f.close
+    f.close()
 
 if __name__ == "__main__":
     d = int(input("Enter d for testing suite: "))
@@ -1,14 +1,425 @@
 #!/bin/python3
 
-import csv
-import time, os, glob, sys, shlex, subprocess, argparse
-from subprocess import PIPE, TimeoutExpired
-from mmb_tools import parse_mmi, parse_check_is_matching
+import statistics
+import time, os, glob, sys, shlex, argparse, queue, threading, signal
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import PIPE, DEVNULL, TimeoutExpired, run
+from mmb_tools import parse_mmi_file, parse_check_matchings, parse_timings, parse_fields, FLUSH_GRACE
+from mmb_tools import CAPABILITIES_FLAG, CAPABILITIES_PREFIX
+from mmb_arrays import load_mmi, mmib_path, EdgeView, format_edges, MMIB_EXT
+from mmb_cache import InstanceCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from mmb_inprocess import load_solver_class, split_solver_spec, solve_in_fork
+from mmb_persistent import PersistentWorker
+from mmb_resources import UsagePopen, OutOfMemory, kill_group, limit_memory, memory_limiter, is_out_of_memory, MEMORY_LIMITS_SUPPORTED
+from mmb_resume import file_hash, solver_id, SOLVER_ID_CN, INSTANCE_HASH_CN
+from mmb_results import open_results
+from mmb_catalog import load_catalog, compile_query, is_current, DEFAULT_CATALOG
+from mmb_schedule import AdaptiveScheduler, instance_sizes, order_tests
+from mmb_profile import (profile_command, test_profile_path, run_profile_path, merge_profile, write_profile_reports,
+                         DEFAULT_PROFILE_DIR, INTERRUPT_GRACE)
 from sam_visualizer import print_graph
 import ast  # Safe parsing for solver output
 
-# ================== Main ====================
-if __name__ == "__main__":
+CSV_HEADER = [
+    'Test Number', 'Test Path', 'd', 'n', 'm', 'Max Matching',
+    'Elapsed Time (s)', 'Solver', 'Success',
+    'User Time (s)', 'System Time (s)', 'Peak RSS (MB)',
+    'Parse Time (s)', 'Solve Time (s)', 'Emit Time (s)',
+    'Min Time (s)', 'Median Time (s)', 'IQR Time (s)', 'Stddev Time (s)',
+    'Repeats', 'Samples (s)', 'Matching Size', 'Quality', SOLVER_ID_CN, INSTANCE_HASH_CN
+]
+
+# Keys of the usage and timings dicts behind the resource columns
+USAGE_COLUMNS = {'user': 'User Time (s)', 'system': 'System Time (s)', 'peak_rss': 'Peak RSS (MB)'}
+TIMINGS_COLUMNS = {'parse': 'Parse Time (s)', 'solve': 'Solve Time (s)', 'emit': 'Emit Time (s)'}
+# Statistics over the elapsed times of repeated runs, see sample_stats()
+STATS_COLUMNS = ['Min Time (s)', 'Median Time (s)', 'IQR Time (s)', 'Stddev Time (s)']
+SAMPLES_SEP = ';'
+# Seconds a solver command gets to tell the d it solves, see
+# command_capabilities()
+CAPABILITIES_TIMEOUT = 30
+
+def collect_tests(mmb_file_name, tests):
+    '''Expands the lines of a .mmb file into a list of (test number,
+    .mmi path) pairs, skipping comments and empty lines.  Numbering
+    follows the order of the .mmb file, so it doesn't depend on the
+    order in which tests are later run.'''
+    mmb_file_dir = os.path.dirname(mmb_file_name)
+    test_paths = []
+    for test in tests:
+        if len(test) > 0 and test[0] == "#" or len(test.strip()) == 0:
+            continue  # Skip comments and empty lines
+
+        # Handle wildcard paths in the test case
+        paths = glob.glob(os.path.join(mmb_file_dir, test.strip())) if "*" in test else [os.path.join(mmb_file_dir, test.strip())]
+        # Binary instances matched alongside their .mmi source are only run once
+        test_paths += [p for p in paths
+                       if not (p.endswith(MMIB_EXT) and os.path.splitext(p)[0] + ".mmi" in paths)]
+    return list(enumerate(test_paths, start=1))
+
+def select_tests(test_list, catalog, query, log=print):
+    '''Returns the tests of test_list, as returned by collect_tests(),
+    whose catalog entry satisfies the query, keeping their numbers.
+    catalog is as returned by mmb_catalog.load_catalog().  Tests that
+    aren't in the catalog are left out and reported through log.'''
+    predicate = compile_query(query)
+    selected = []
+    (missing, stale) = (0, 0)
+    for (i, test_path) in test_list:
+        entry = catalog.get(os.path.abspath(test_path))
+        if entry is None:
+            missing += 1
+            continue
+        if not is_current(entry, test_path):
+            stale += 1
+        if predicate(entry):
+            selected.append((i, test_path))
+    if missing or stale:
+        log(f"Warning: {missing} tests missing from the catalog and {stale} changed since it was built, "
+            f"rebuild it with tools/build_catalog.py")
+    return selected
+
+def load_test(test_path, cache, fast_parse):
+    '''Loads the instance of a test, returning (d, n, m, E, result).'''
+    if cache is not None and mmib_path(test_path) is None:
+        # Reuse the parsed instance if any earlier run has parsed this content
+        (d, n, m, E, result) = cache.load(test_path)
+        return (d, n, m, EdgeView(E), result)
+    elif fast_parse or mmib_path(test_path) is not None:
+        # Read the file in bulk, or memory-map its binary .mmib version,
+        # E becomes a lazy dict view of the edge array
+        (d, n, m, E, result) = load_mmi(test_path)
+        return (d, n, m, EdgeView(E), result)
+    else:
+        # Stream d, n, m, E, and the expected result from the .mmi file
+        with open(test_path) as f:
+            return parse_mmi_file(f)
+
+def load_instance(test_path, cache, fast_parse):
+    '''Returns (instance hash, (d, n, m, E, result)) for the test at
+    test_path, to be shared between runs of run_test().'''
+    return (file_hash(test_path), load_test(test_path, cache, fast_parse))
+
+def get_solver_name(args):
+    '''Returns the solver name recorded in the results for args.exec_cmd.'''
+    if args.solver_name:
+        return args.solver_name
+    exec_cmd = split_solver_spec(args.exec_cmd)[0] if args.in_process else args.exec_cmd
+    return os.path.basename(exec_cmd).replace('.py', '')
+
+def run_command(exec_cmd, in_str, timeout, cpu=None, memory_limit=None, interrupt=False):
+    '''Runs exec_cmd with in_str on standard input, optionally pinned to
+    the CPU cpu and limited to memory_limit MB of address space.  Returns
+    (stdout, stderr, elapsed wall time, usage) where usage holds the
+    command's CPU time and peak memory (see mmb_resources.py).  Raises
+    TimeoutExpired, after killing the command, if it runs for longer
+    than timeout seconds; the usage up to that point is attached to it
+    as its usage attribute.  Before being killed the command gets a
+    SIGTERM and FLUSH_GRACE seconds to write the best matching it found,
+    which becomes the output of the TimeoutExpired.  With interrupt set
+    it gets a SIGINT and INTERRUPT_GRACE seconds instead, e.g. to also
+    write out its profile.  Raises OutOfMemory if the command failed
+    for lack of memory.'''
+
+    # Start the timer
+    start_time = time.perf_counter()
+
+    # Run the solver command
+    preexec_fn = memory_limiter(memory_limit)
+    if sys.platform == 'win32':
+        p = UsagePopen([sys.executable] + shlex.split(exec_cmd), stdin=PIPE, stdout=PIPE, stderr=PIPE, text=True)
+    else:
+        # In a process group of its own, see kill_group(), and limited to
+        # memory_limit before the command starts
+        p = UsagePopen(shlex.split(exec_cmd), stdin=PIPE, stdout=PIPE, stderr=PIPE, text=True,
+                       start_new_session=True, preexec_fn=preexec_fn)
+    if cpu is not None:
+        os.sched_setaffinity(p.pid, {cpu})
+    if memory_limit is not None and preexec_fn is None:
+        limit_memory(p.pid, memory_limit)
+
+    try:
+        stdout_data, stderr_data = p.communicate(in_str, timeout=timeout)
+    except TimeoutExpired as e:
+        output = ""
+        if sys.platform != 'win32':
+            p.send_signal(signal.SIGINT if interrupt else signal.SIGTERM)
+            try:
+                (output, _) = p.communicate(timeout=INTERRUPT_GRACE if interrupt else FLUSH_GRACE)
+            except TimeoutExpired:
+                pass
+        kill_group(p)
+        p.communicate()
+        e.usage = p.usage
+        e.output = output
+        raise
+    except BaseException:
+        kill_group(p)
+        p.wait()
+        raise
+
+    # Stop the timer
+    end_time = time.perf_counter()
+    if is_out_of_memory(p.returncode, stderr_data, p.usage, memory_limit):
+        raise OutOfMemory(f"Exited with code {p.returncode}: {stderr_data}", p.usage, end_time - start_time)
+    return (stdout_data, stderr_data, end_time - start_time, p.usage)
+
+def make_row(i, test_path, G, max_matching, elapsed_time, solver_name, success, usage, timings,
+             times=(), raw_samples=False, matching_size=None):
+    '''Returns the CSV row of a test as a dict keyed by CSV_HEADER, with
+    the resource columns left empty where usage or timings lack them.
+    times are the elapsed times of the test's measured runs, summarized
+    in the statistics columns and, if raw_samples is set, listed in the
+    samples column.  elapsed_time is None for tests that weren't run.
+    matching_size is the size of the valid matching the solver gave, if
+    any, also the best one found by a solver that timed out; its
+    quality is its ratio to max_matching.'''
+    (d, n, m, _) = G
+    row = {
+        'Test Number': i, 'Test Path': test_path, 'd': d, 'n': n, 'm': m,
+        'Max Matching': max_matching,
+        'Elapsed Time (s)': f"{elapsed_time:.7f}" if elapsed_time is not None else "",
+        'Solver': solver_name, 'Success': success
+    }
+    for (values, columns) in ((usage, USAGE_COLUMNS), (timings, TIMINGS_COLUMNS)):
+        for (key, column) in columns.items():
+            value = values.get(key)
+            row[column] = f"{value:.7f}" if value is not None else ""
+    stats = sample_stats(times) if times else {}
+    for column in STATS_COLUMNS:
+        row[column] = f"{stats[column]:.7f}" if column in stats else ""
+    row['Repeats'] = len(times)
+    row['Samples (s)'] = SAMPLES_SEP.join(f"{t:.7f}" for t in times) if raw_samples else ""
+    row['Matching Size'] = matching_size if matching_size is not None else ""
+    row['Quality'] = f"{matching_size / max_matching:.4f}" if matching_size is not None and max_matching else ""
+    return row
+
+def solve_test(G, args, cpu=None, solver_class=None, worker=None, profile_path=None):
+    '''Runs the solver once on the instance G = (d, n, m, E), in whichever
+    mode run_test() was asked for.  Returns (stdout, stderr, elapsed
+    time, usage, timings) and raises like run_command().  If
+    profile_path is given, the run is profiled and its profile added to
+    that file, also if it times out.'''
+    (d, n, m, E) = G
+    run_path = run_profile_path(profile_path) if profile_path is not None else None
+    try:
+        if solver_class is not None:
+            # Hand the parsed instance straight to a forked solver
+            (M_lines, timings, usage) = solve_in_fork(solver_class, G, args.timeout, cpu, args.memory_limit,
+                                                      run_path)
+            return ("\n".join(M_lines), "", timings["solve"], usage, timings)
+
+        # Prepare input for the solver
+        in_str = f"{d}\n{n}\n{m}\n" + format_edges(E)
+        if worker is not None:
+            return worker.solve(in_str, args.timeout, cpu)
+        exec_cmd = profile_command(args.exec_cmd, run_path) if run_path is not None else args.exec_cmd
+        (stdout_data, stderr_data, elapsed_time, usage) = run_command(exec_cmd, in_str, args.timeout, cpu,
+                                                                      args.memory_limit, run_path is not None)
+        return (stdout_data, stderr_data, elapsed_time, usage, parse_timings(stderr_data))
+    finally:
+        if run_path is not None:
+            merge_profile(run_path, profile_path)
+
+def check_outputs(G, result, outputs, i, log):
+    '''Checks the outputs of several runs of a solver on G at once, see
+    parse_check_matchings().  Returns, for each output in order, (whether
+    it is a valid matching of G of the known maximum size result, its
+    size or None if it isn't a matching), logging why not if it can't be
+    checked.'''
+    # The solver output lines, without blank ones
+    pairs = [(G, [line for line in stdout_data.strip().split("\n") if line.strip()])
+             for stdout_data in outputs]
+    checks = []
+    for size in parse_check_matchings(pairs):
+        if isinstance(size, Exception):
+            log.append(f"Test {i}: Error checking result: {size}")
+            checks.append((False, None))
+        else:
+            checks.append((result is None or result == size, size))
+    return checks
+
+def check_output(G, result, stdout_data, i, log):
+    '''Checks a single output as check_outputs() does.'''
+    return check_outputs(G, result, [stdout_data], i, log)[0]
+
+def sample_stats(times):
+    '''Returns the min, median, interquartile range and standard
+    deviation of the elapsed times of a test's runs, keyed by column.'''
+    if len(times) > 1:
+        (q1, _, q3) = statistics.quantiles(times, n=4, method='inclusive')
+        (iqr, stddev) = (q3 - q1, statistics.stdev(times))
+    else:
+        (iqr, stddev) = (0, 0)
+    return {'Min Time (s)': min(times), 'Median Time (s)': statistics.median(times),
+            'IQR Time (s)': iqr, 'Stddev Time (s)': stddev}
+
+def merge_fields(dicts):
+    '''Combines the usage or timings dicts of repeated runs: the peak RSS
+    is the largest seen, anything else the median.'''
+    merged = {}
+    for key in set().union(*dicts):
+        values = [v[key] for v in dicts if v.get(key) is not None]
+        if values:
+            merged[key] = max(values) if key == "peak_rss" else statistics.median(values)
+    return merged
+
+def run_test(i, test_path, args, cache, cpus=None, solver_class=None, worker=None,
+             solver_key=None, done=frozenset(), instance=None, scheduler=None):
+    '''Runs args.exec_cmd on a single test and checks its output.  If
+    solver_class is given, that Solver subclass is run in-process on the
+    parsed instance instead, and only its solve() call is timed.  If
+    worker is given, the test is sent to that PersistentWorker instead
+    of starting the command afresh.
+
+    solver_key is the solver's identity, see mmb_resume.py, recorded in
+    the row along with the instance's content hash.  The test is skipped
+    if that pair is in the set done.  instance, if given, is the test's
+    (instance hash, (d, n, m, E, result)) as loaded by load_instance(),
+    so several solvers can share one parsed instance.
+
+    If scheduler, an AdaptiveScheduler, predicts the test would time
+    out or the solver's time budget is spent, the test isn't run and
+    its row records why.  Otherwise the outcome is reported to it.
+
+    The solver is run args.warmup times untimed, then args.repeat times
+    timed, with the median run reported as the test's elapsed time.
+    The outputs of the timed runs are checked together once they are
+    all done.  With args.profile the timed runs are profiled into the test's
+    .pstats file, see mmb_profile.py.
+
+    Returns (row, log, elapsed_time) where row is the CSV row for the
+    test as a dict, see make_row(), or None if it couldn't be run, log
+    holds the lines to report for it and elapsed_time is the total time
+    of its timed runs.  Output is returned rather than printed so that
+    tests run concurrently are still reported in test order.  If cpus
+    is a queue of CPU ids, the solver is pinned to one taken from it
+    for the duration of the test.
+    '''
+    timeout, verbose = args.timeout, args.verbose
+    solver_name = get_solver_name(args)
+    log = []
+    if verbose:
+        log.append(f"Running Test {i}: {test_path}")
+
+    try:
+        instance_hash = instance[0] if instance is not None else file_hash(test_path)
+    except OSError as e:
+        log.append(f"Error parsing {test_path}: {e}")
+        return (None, log, 0)
+    if (solver_key, instance_hash) in done:
+        log.append(f"Test {i}: Already measured, skipped.")
+        return (None, log, 0)
+    ids = {SOLVER_ID_CN: solver_key, INSTANCE_HASH_CN: instance_hash}
+
+    reason = scheduler.skip_reason(test_path) if scheduler is not None else None
+    if reason is not None:
+        log.append(f"Test {i}: {reason}.")
+        (d, n, m) = scheduler.sizes.get(test_path, ("", "", ""))
+        return ({**make_row(i, test_path, (d, n, m, None), "", None, solver_name, reason, {}, {}),
+                 **ids}, log, 0)
+
+    try:
+        # Parse d, n, m, E, and the expected result from the .mmi file
+        if instance is not None:
+            (d, n, m, E, result) = instance[1]
+        else:
+            (d, n, m, E, result) = load_test(test_path, cache, args.fast_parse)
+        # The known max matching from the last line of the .mmi file
+        max_matching = result
+    except Exception as e:
+        log.append(f"Error parsing {test_path}: {e}")
+        return (None, log, 0)
+
+    profile_path = None
+    if args.profile:
+        profile_path = test_profile_path(args.profile_dir, solver_name, i, test_path)
+        os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+        if os.path.exists(profile_path):
+            os.remove(profile_path)  # Left by an earlier sweep
+
+    cpu = cpus.get() if cpus is not None else None
+    samples = []
+    try:
+        # Warm up caches and JITs, then time the measured runs
+        for _ in range(args.warmup):
+            solve_test((d, n, m, E), args, cpu, solver_class, worker)
+        for _ in range(args.repeat):
+            samples.append(solve_test((d, n, m, E), args, cpu, solver_class, worker, profile_path))
+    except TimeoutExpired as e:
+        elapsed_time = timeout  # Log max timeout value
+        if scheduler is not None:
+            scheduler.record(test_path, "Timed Out", elapsed_time + sum(s[2] for s in samples))
+        # The best matching the solver found before the timeout, if it gave one
+        matching_size = None
+        if e.output and e.output.strip():
+            (_, matching_size) = check_output((d, n, m, E), None, e.output, i, log)
+        if matching_size is not None:
+            log.append(f"Test {i}: Timed out, best matching found has {matching_size} edges"
+                       + (f" of {max_matching}." if max_matching is not None else "."))
+        else:
+            log.append(f"Test {i}: Timed out.")
+        # Log the timeout in CSV, with the runs that finished before it
+        return ({**make_row(i, test_path, (d, n, m, E), max_matching, elapsed_time, solver_name,
+                            "Timed Out", getattr(e, "usage", {}), {},
+                            [s[2] for s in samples], args.raw_samples, matching_size), **ids}, log,
+                elapsed_time + sum(s[2] for s in samples))
+    except OutOfMemory as e:
+        log.append(f"Test {i}: Out of memory.")
+        if verbose:
+            log.append(f"Test {i} ERROR:\n{e}")
+        elapsed_time = e.elapsed or 0
+        if scheduler is not None:
+            scheduler.record(test_path, "Out of Memory", elapsed_time + sum(s[2] for s in samples))
+        # Log running out of memory in CSV, with its peak memory
+        return ({**make_row(i, test_path, (d, n, m, E), max_matching, elapsed_time, solver_name,
+                            "Out of Memory", e.usage, {},
+                            [s[2] for s in samples], args.raw_samples), **ids}, log,
+                elapsed_time + sum(s[2] for s in samples))
+    except Exception as e:
+        log.append(f"Test {i}: Error running command: {e}")
+        return (None, log, 0)
+    finally:
+        if cpu is not None:
+            cpus.put(cpu)
+
+    # Every run has to produce a correct matching, the first that doesn't
+    # is reported
+    checks = check_outputs((d, n, m, E), result, [s[0] for s in samples], i, log)
+    failed = [k for (k, (ok, _)) in enumerate(checks) if not ok]
+    k = failed[0] if failed else len(samples) - 1
+    (success, matching_size) = checks[k]
+    (stdout_data, stderr_data) = samples[k][:2]
+
+    times = [s[2] for s in samples]
+    usage = merge_fields([s[3] for s in samples])
+    timings = merge_fields([s[4] for s in samples])
+    elapsed_time = statistics.median(times)
+    if scheduler is not None:
+        scheduler.record(test_path, success, sum(times))
+
+    if args.print_graphs:
+        in_name = test_path.split("/")[-1][:-4]
+        print_graph((d, n, m, E), in_name.split(".")[0], stdout_data.strip().split("\n"))
+
+    if success and len(times) > 1:
+        log.append(f"Test {i}: Success! {elapsed_time:.7f} seconds median of {len(times)} runs")
+    elif success:
+        log.append(f"Test {i}: Success! {elapsed_time:.7f} seconds")
+    else:
+        log.append(f"Test {i}: Failed.")
+
+    if verbose:
+        log.append(f"Test {i} STDOUT:\n{stdout_data}")
+        log.append(f"Test {i} STDERR:\n{stderr_data}")
+
+    return ({**make_row(i, test_path, (d, n, m, E), max_matching, elapsed_time, solver_name,
+                        success, usage, timings, times, args.raw_samples, matching_size), **ids},
+            log, sum(times))
+
+def make_parser():
+    '''Returns the command line parser of mmb.py, also used to read the
+    solver options of race files (see mmb_race.py).'''
     parser = argparse.ArgumentParser(description="CSC-489 Benchmarker for Maximum Matching Solvers.")
 
     # Arguments
@@ -18,145 +429,312 @@ if __name__ == "__main__":
     parser.add_argument("exec_cmd", type=str, help="Executable command to test, put in quotes if arguments are included.")
     parser.add_argument("-pg", "--print_graphs", action="store_true",
                         help="save png representations of each mmi file and edges picked by solver")
-    parser.add_argument("--output", type=str, default="benchmark_results.csv", 
-                        help="Name of the output CSV file for storing results.")
+    parser.add_argument("--output", type=str, default="benchmark_results.csv",
+                        help="Name of the output file for storing results, a CSV file or, "
+                             "ending in .db, .sqlite or .sqlite3, an SQLite database.")
+    parser.add_argument("-fp", "--fast_parse", action="store_true",
+                        help="parse .mmi files with the vectorized numpy parser")
+    parser.add_argument("--no_cache", action="store_true",
+                        help="don't reuse parsed instances from the on-disk instance cache")
+    parser.add_argument("--cache_dir", type=str, default=None,
+                        help=f"instance cache directory, defaults to {DEFAULT_CACHE_DIR} next to the .mmb file")
+    parser.add_argument("--cache_size", type=int, default=DEFAULT_MAX_BYTES >> 20,
+                        help="size limit of the instance cache in MB, least recently used instances are evicted")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of tests to run concurrently")
+    parser.add_argument("--pin_cpus", action="store_true",
+                        help="pin each concurrently running solver to its own CPU (Linux only)")
+    parser.add_argument("-ip", "--in_process", action="store_true",
+                        help="exec_cmd is a path/to/solver.py[:ClassName] Solver subclass to import and run "
+                             "in a forked worker on the parsed instance, timing only its solve call")
+    parser.add_argument("-ps", "--persistent", action="store_true",
+                        help="keep one exec_cmd --server process per job alive across tests, "
+                             "restarting it only after a timeout or crash")
+    parser.add_argument("-r", "--repeat", type=int, default=1,
+                        help="number of timed runs per test, reported as min/median/IQR/stddev")
+    parser.add_argument("-w", "--warmup", type=int, default=0,
+                        help="number of untimed runs per test before the timed ones")
+    parser.add_argument("-rs", "--raw_samples", action="store_true",
+                        help="also write the elapsed time of every timed run to the CSV")
+    parser.add_argument("-ml", "--memory_limit", type=int, default=None,
+                        help="limit on each solver process's address space (RLIMIT_AS) in MB, "
+                             "solvers that run out are recorded as Out of Memory (Linux only)")
+    parser.add_argument("-q", "--query", type=str, default=None,
+                        help="only run the tests whose catalog metadata satisfies this expression, "
+                             "e.g. \"d >= 4 and m > 10000\", over the fields of mmb_catalog.py")
+    parser.add_argument("--catalog", type=str, default=None,
+                        help=f"instance catalog for --query, defaults to {DEFAULT_CATALOG} next to the .mmb file")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip tests whose instance already has a result for this solver, "
+                             "by command and source, in the output CSV")
+    parser.add_argument("-sa", "--skip_after", type=int, default=None,
+                        help="run each family of tests (same directory and d) smallest first, and skip the larger "
+                             "ones after this many consecutive timeouts")
+    parser.add_argument("-ad", "--any_d", action="store_true",
+                        help="run the solver on instances of every d, even those its Solver subclass "
+                             "doesn't declare support for")
+    parser.add_argument("-tb", "--time_budget", type=float, default=None,
+                        help="skip the remaining tests once the solver's runs add up to this many seconds")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile Python solvers with cProfile, saving a .pstats file per test and an aggregated "
+                             "report and collapsed stacks after the sweep")
+    parser.add_argument("--profile_dir", type=str, default=None,
+                        help=f"directory for the profiles, defaults to {DEFAULT_PROFILE_DIR} next to the .mmb file")
+    parser.add_argument("--solver_name", type=str, default=None,
+                        help="name recorded in the Solver column, defaults to exec_cmd's file name")
+    return parser
+
+def check_args(args):
+    '''Raises ValueError if the options in args are invalid.'''
+    # Validate timeout value
+    if args.timeout is not None and args.timeout < 0:
+        raise ValueError("timeout must be a positive integer.")
+
+    # Validate repeat and warmup values
+    if args.repeat < 1 or args.warmup < 0:
+        raise ValueError("repeat must be a positive and warmup a non-negative integer.")
+
+    # Validate memory limit value
+    if args.memory_limit is not None and args.memory_limit < 1:
+        raise ValueError("memory limit must be a positive integer.")
+    if args.memory_limit is not None and not MEMORY_LIMITS_SUPPORTED:
+        raise ValueError("--memory_limit is not supported on this platform.")
+
+    # Validate jobs value
+    if args.jobs < 1:
+        raise ValueError("jobs must be a positive integer.")
+
+    # Validate adaptive scheduling values
+    if args.skip_after is not None and (args.skip_after < 1 or args.timeout is None):
+        raise ValueError("skip_after must be a positive integer and requires a timeout.")
+    if args.time_budget is not None and args.time_budget <= 0:
+        raise ValueError("time budget must be a positive number of seconds.")
+
+    if args.in_process and args.persistent:
+        raise ValueError("--in_process and --persistent can't be combined.")
+
+    # Profiling needs a fresh Python process, or the solver in-process
+    if args.profile and args.persistent:
+        raise ValueError("--profile and --persistent can't be combined.")
+    if args.profile and not args.in_process and args.exec_cmd:
+        profile_command(args.exec_cmd, os.devnull)
+
+def command_capabilities(exec_cmd):
+    '''Returns the d a command such as "python3 path/to/solver.py" solves
+    as a dict with min_d and, if bounded, max_d, asked of a Solver
+    subclass with CAPABILITIES_FLAG, see Solver.do_main().  The solver
+    is run as a command so none of its code runs in the benchmarker.
+    Returns None if the command doesn't run a Python file or doesn't
+    answer.'''
+    paths = [token for token in shlex.split(exec_cmd) if token.endswith(".py")]
+    if not paths or not os.path.isfile(paths[0]):
+        return None
+    cmd = shlex.split(exec_cmd) + [CAPABILITIES_FLAG]
+    if sys.platform == 'win32':
+        cmd = [sys.executable] + cmd
+    try:
+        answer = run(cmd, stdin=DEVNULL, stdout=PIPE, stderr=DEVNULL, text=True, timeout=CAPABILITIES_TIMEOUT)
+    except (OSError, TimeoutExpired):
+        return None
+    for line in answer.stdout.splitlines():
+        if line.startswith(CAPABILITIES_PREFIX):
+            capabilities = parse_fields(line[len(CAPABILITIES_PREFIX):])
+            return capabilities if "min_d" in capabilities else None
+    return None
+
+def supported_d(args, solver_class=None):
+    '''Returns the supports(d) of the Solver subclass that runs the tests,
+    solver_class if given, else the one args.exec_cmd runs, if it only
+    solves some d (see src/solvers/solver.py).  Returns None if it
+    solves every d, isn't a Solver subclass or args.any_d is set.'''
+    if args.any_d:
+        return None
+    if solver_class is not None:
+        (min_d, max_d) = (solver_class.min_d, solver_class.max_d)
+    else:
+        capabilities = command_capabilities(args.exec_cmd)
+        if capabilities is None:
+            return None
+        (min_d, max_d) = (capabilities["min_d"], capabilities.get("max_d"))
+    if min_d <= 1 and max_d is None:
+        return None
+    return lambda d: min_d <= d and (max_d is None or d <= max_d)
+
+def read_test_list(mmb_file_name, query=None, catalog_path=None):
+    '''Reads the .mmb file and returns its tests as collect_tests() does,
+    narrowed down by the catalog at catalog_path, by default next to
+    the .mmb file, if a query is given.  Raises OSError if either file
+    can't be read and ValueError for invalid queries.'''
+    try:
+        with open(mmb_file_name) as f:
+            tests = f.readlines()
+    except OSError:
+        raise OSError(f"Unable to locate {mmb_file_name}.")
+
+    # Expand the .mmb file, narrowed down by the catalog if queried
+    test_list = collect_tests(mmb_file_name, tests)
+    if query is not None:
+        catalog_path = catalog_path or os.path.join(os.path.dirname(mmb_file_name), DEFAULT_CATALOG)
+        try:
+            catalog = load_catalog(catalog_path)
+        except OSError as e:
+            raise OSError(f"Unable to read catalog {catalog_path}, build it with tools/build_catalog.py: {e}")
+        test_list = select_tests(test_list, catalog, query, log=lambda line: print(line, file=sys.stderr))
+        print(f"Query {query!r} selected {len(test_list)} tests")
+    return test_list
+
+def open_cache(args, mmb_file_dir):
+    '''Returns the instance cache asked for by args, or None.'''
+    if args.no_cache:
+        return None
+    cache_dir = args.cache_dir or os.path.join(mmb_file_dir, DEFAULT_CACHE_DIR)
+    try:
+        return InstanceCache(cache_dir, args.cache_size << 20)
+    except OSError as e:
+        print(f"Warning: instance cache disabled, {e}", file=sys.stderr)
+        return None
+
+def cpu_queue(jobs):
+    '''Returns a queue holding one available CPU id per job.  Raises
+    ValueError if there are too few CPUs or pinning isn't supported.'''
+    if not hasattr(os, "sched_setaffinity"):
+        raise ValueError("--pin_cpus is not supported on this platform.")
+    available = sorted(os.sched_getaffinity(0))
+    if jobs > len(available):
+        raise ValueError(f"cannot pin {jobs} jobs to {len(available)} available CPUs.")
+    cpus = queue.Queue()
+    for cpu in available[:jobs]:
+        cpus.put(cpu)
+    return cpus
 
+def report_profiles(args, solver_name, test_list):
+    '''Writes the aggregated profile of the tests of test_list profiled
+    for solver_name, see mmb_profile.py, and says where.'''
+    paths = [path for path in (test_profile_path(args.profile_dir, solver_name, *test) for test in test_list)
+             if os.path.exists(path)]
+    reports = write_profile_reports(os.path.join(args.profile_dir, solver_name), paths)
+    if reports is None:
+        print(f"Profile: no profiles were written for {solver_name}")
+    else:
+        print(f"Profile of {len(paths)} tests: report in {reports[0]}, collapsed stacks in {reports[1]}")
 
+# ================== Main ====================
+if __name__ == "__main__":
+    parser = make_parser()
     args = parser.parse_args()
     timeout, mmb_file_name, exec_cmd, verbose, output_file= (
         args.timeout, args.mmb_file_name, args.exec_cmd, args.verbose, args.output
     )
 
-    do_print = args.print_graphs
-
-    # Validate timeout value
-    if timeout is not None and timeout < 0:
-        print("Error: timeout must be a positive integer.")
+    try:
+        check_args(args)
+    except ValueError as e:
+        print(f"Error: {e}")
         exit(3)
 
     # Read the .mmb file and extract test cases
     try:
-        with open(mmb_file_name) as f:
-            tests = f.readlines()
-    except:
-        print(f"Error: Unable to locate {mmb_file_name}.", file=sys.stderr)
+        test_list = read_test_list(mmb_file_name, args.query, args.catalog)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
         exit(2)
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(3)
 
     mmb_file_dir = os.path.dirname(mmb_file_name)
+    if args.profile and args.profile_dir is None:
+        args.profile_dir = os.path.join(mmb_file_dir, DEFAULT_PROFILE_DIR)
+
+    # Import the solver once, tests then fork from this process
+    solver_class = None
+    if args.in_process:
+        try:
+            solver_class = load_solver_class(exec_cmd)
+        except Exception as e:
+            print(f"Error: Unable to load solver {exec_cmd}: {e}", file=sys.stderr)
+            exit(2)
+
+    # Run smaller instances first so timeouts on them predict the larger ones,
+    # and leave out instances of a d the solver doesn't solve
+    scheduler = None
+    supports = supported_d(args, solver_class)
+    if args.skip_after is not None or args.time_budget is not None or supports is not None:
+        sizes = instance_sizes(test_list, log=lambda line: print(line, file=sys.stderr))
+        if args.skip_after is not None:
+            test_list = order_tests(test_list, sizes)
+        scheduler = AdaptiveScheduler(sizes, args.skip_after, args.time_budget, supports)
+
+    # Parsed instances are shared between runs through a content addressed cache
+    cache = open_cache(args, mmb_file_dir)
 
-    # Initialize CSV file with headers if it doesn't exist
+    # Hand out one CPU per worker so concurrent timings stay comparable
+    cpus = None
+    if args.pin_cpus:
+        try:
+            cpus = cpu_queue(args.jobs)
+        except ValueError as e:
+            print(f"Error: {e}")
+            exit(3)
+
+    # Open the results file, initializing it if it doesn't exist
     csv_file_path = os.path.join(mmb_file_dir, output_file)
-    if not os.path.exists(csv_file_path):
-        with open(csv_file_path, mode='w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow([
-                'Test Number', 'Test Path', 'd', 'n', 'm', 'Max Matching', 
-                'Elapsed Time (s)', 'Solver', 'Success'
-            ])
+    run_info = {"course": os.path.splitext(os.path.basename(mmb_file_name))[0],
+                "mmb_file": mmb_file_name, "command": exec_cmd, "command_line": shlex.join(sys.argv)}
+    results = open_results(csv_file_path, CSV_HEADER, run_info)
 
-    i = 0  # Test counter
+    # Results are keyed by solver command and source, and instance content
+    solver_key = solver_id(exec_cmd, args.in_process)
+    done = frozenset()
+    if args.resume:
+        if not results.resumable:
+            print(f"Warning: {csv_file_path} predates --resume, nothing will be skipped.", file=sys.stderr)
+        done = frozenset(results.measured_pairs())
+        print(f"Resuming: {sum(key == solver_key for (key, _) in done)} tests already measured "
+              f"for this solver in {csv_file_path}")
 
-    # Loop through each test case in the .mmb file
-    for test in tests:
-        if len(test) > 0 and test[0] == "#" or len(test.strip()) == 0:
-            continue  # Skip comments and empty lines
+    # Each pool thread drives its own persistent worker
+    workers = []
+    local = threading.local()
+    def thread_worker():
+        if not args.persistent:
+            return None
+        if not hasattr(local, "worker"):
+            local.worker = PersistentWorker(exec_cmd, args.memory_limit)
+            workers.append(local.worker)
+        return local.worker
 
-        # Handle wildcard paths in the test case
-        test_paths = glob.glob(os.path.join(mmb_file_dir, test.strip())) if "*" in test else [os.path.join(mmb_file_dir, test.strip())]
+    # Loop through each test case in the .mmb file, with up to args.jobs
+    # running at once; results come back, and are logged, in test order.
+    sweep_start = time.perf_counter()
+    summed_time = 0
+    with results, ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        runs = pool.map(lambda test: run_test(*test, args, cache, cpus, solver_class, thread_worker(),
+                                              solver_key, done, scheduler=scheduler),
+                        test_list)
+        for (row, log, elapsed_time) in runs:
+            for line in log:
+                print(line)
+            summed_time += elapsed_time
 
-        for test_path in test_paths:
-            i += 1
-            if verbose:
-                print(f"Running Test {i}: {test_path}")
+            # Write results, buffered, to the results file
+            if row is not None:
+                results.write(row)
+    sweep_time = time.perf_counter() - sweep_start
 
-            try:
-                with open(test_path) as f:
-                    lines = f.readlines()
-                # Parse d, n, m, E, and the expected result from the .mmi file
-                (d, n, m, E, result) = parse_mmi(lines)
-                # Get the max matching from the last line of the .mmi file
-                max_matching = lines[-1].strip()
-            except Exception as e:
-                print(f"Error parsing {test_path}: {e}")
-                continue
-
-            # Prepare input for the solver
-            in_str = f"{d}\n{n}\n{m}\n" + "\n".join([str(key)[1:-1] for key in E])
-
-            # Start the timer
-            start_time = time.time()
+    for worker in workers:
+        worker.close()
+    if args.persistent:
+        print(f"Persistent workers: {len(workers)} started, {sum(w.restarts for w in workers)} restarts")
 
-            try:
-                # Run the solver command
-                if sys.platform == 'win32':
-                    p = subprocess.Popen([sys.executable] + shlex.split(exec_cmd), stdin=PIPE, stdout=PIPE, stderr=PIPE, text=True)
-                else:
-                    p = subprocess.Popen(shlex.split(exec_cmd), stdin=PIPE, stdout=PIPE, stderr=PIPE, text=True)
+    print(f"Sweep wall time: {sweep_time:.3f} seconds, summed test time: {summed_time:.3f} seconds "
+          f"({summed_time / sweep_time if sweep_time > 0 else 0:.2f}x)")
 
-                stdout_data, stderr_data = p.communicate(in_str, timeout=timeout)
-            except TimeoutExpired:
-                print(f"Test {i}: Timed out.")
-                p.kill()
-                elapsed_time = timeout  # Log max timeout value
-                success = False
-                # Log the timeout in CSV
-                with open(csv_file_path, mode='a', newline='') as file:
-                    writer = csv.writer(file)
-                    solver_name = os.path.basename(exec_cmd).replace('.py', '')
-                    writer.writerow([
-                        i, test_path, d, n, m, max_matching, 
-                        f"{elapsed_time:.7f}", solver_name, "Timed Out"
-                    ])
-                continue  # Skip to next test case
-            except Exception as e:
-                print(f"Test {i}: Error running command: {e}")
-                continue
-
-            # Stop the timer
-            end_time = time.time()
-            elapsed_time = end_time - start_time
-
-            # # Debug: Print raw output to inspect what the solver returned
-            # print(f"Test {i} Raw STDOUT:\n{stdout_data}")
-               
-            try:
-                # Convert the solver output lines into tuples of integers
-                parsed_output = [
-                    tuple(map(int, line.split(',')))  # Convert each line to a tuple of integers
-                    for line in stdout_data.strip().split("\n") if line.strip()
-                ]
-                # Debug print to ensure the parsed output is correct
-                
-
-                # Format the tuples as strings dynamically based on the size of each tuple
-                string_output = [", ".join(map(str, edge)) for edge in parsed_output]
-                
-
-                # Validate the matching using the formatted string output
-                exec_cmd_result = parse_check_is_matching((d, n, m, E), string_output)
-                success = result is None or result == exec_cmd_result
-            except Exception as e:
-                print(f"Test {i}: Error checking result: {e}")
-                success = False
-
-            if do_print:
-                in_name = test.split("/")[-1][:-4]
-                print_graph((d, n, m, E), in_name.split(".")[0], stdout_data.strip().split("\n"))
-
-            if success:
-                print(f"Test {i}: Success! {elapsed_time:.7f} seconds")
-            else:
-                print(f"Test {i}: Failed.")
-
-            # Write results to the CSV file
-            with open(csv_file_path, mode='a', newline='') as file:
-                writer = csv.writer(file)
-                solver_name = os.path.basename(exec_cmd).replace('.py', '')
-                writer.writerow([
-                    i, test_path, d, n, m, max_matching, 
-                    f"{elapsed_time:.7f}", solver_name, success
-                ])
-
-            if verbose:
-                print(f"Test {i} STDOUT:\n{stdout_data}")
-                print(f"Test {i} STDERR:\n{stderr_data}")
+    if args.profile:
+        report_profiles(args, get_solver_name(args), test_list)
+
+    if scheduler is not None:
+        print(f"Adaptive scheduling: {scheduler.skipped} tests skipped, {scheduler.spent:.3f} seconds spent")
+
+    if cache is not None:
+        print(cache.report())
@@ -0,0 +1,311 @@
+'''mmb_arrays.py
+
+Array based counterparts of the parsing tools in mmb_tools.py.  Edges
+are held as a contiguous int32 numpy array of shape (m, d) instead of a
+dict of tuples, which is much cheaper to build for large instances.
+
+Kept apart from mmb_tools.py so solvers that don't use it don't pay
+for importing numpy on start up.
+'''
+
+import os
+import struct
+import threading
+from collections.abc import Mapping
+
+import numpy as np
+
+from mmb_tools import str_is_int
+
+class EdgeView(Mapping):
+    '''Read-only dict-like view of an (m, d) edge array as returned by
+    parse_mmi_array().  Iterating it yields the edges as tuples, so
+    solvers written against the dict E of parse_mmi() keep working.
+    The underlying tuple dict is only built the first time a lookup
+    (e.g. `e in E`) actually needs it.
+    '''
+
+    def __init__(self, array):
+        self.array = array
+        self._dict = None
+
+    def as_dict(self):
+        '''Returns the edges as a dict in the format of parse_mmi().'''
+        if self._dict is None:
+            self._dict = dict.fromkeys(map(tuple, self.array.tolist()), True)
+        return self._dict
+
+    def __getitem__(self, e):
+        return self.as_dict()[e]
+
+    def __contains__(self, e):
+        return e in self.as_dict()
+
+    def __iter__(self):
+        if self._dict is not None:
+            return iter(self._dict)
+        return map(tuple, self.array.tolist())
+
+    def __len__(self):
+        return len(self.array)
+
+    def copy(self):
+        return dict(self.as_dict())
+
+    def __repr__(self):
+        return repr(self.as_dict())
+
+def edge_array(E, d=0):
+    '''Returns the edges E, either a dict as produced by parse_mmi() or
+    an EdgeView, as a contiguous int32 array of shape (m, d).  d is only
+    needed to shape an empty edge set.'''
+    if isinstance(E, EdgeView):
+        return E.array
+    if isinstance(E, np.ndarray):
+        return np.ascontiguousarray(E, dtype=np.int32)
+    if len(E) == 0:
+        return np.empty((0, d), dtype=np.int32)
+    return np.array(list(E), dtype=np.int32)
+
+def _parse_edge_lines(lines, d):
+    '''Parses edge lines one by one into an (m, d) array, reporting the
+    first formatting error with the same message parse_mmi() would give.
+    Used when the vectorized parse can't vouch for the input.'''
+    E = []
+    for i in range(len(lines)):
+        line = lines[i]
+        toks = line.strip().split(",")
+        if len(toks) != d:
+            raise Exception(f"Line {3 + i}: Expected {d}-edge, got {line.strip()}")
+        for j in range(d):
+            if not str_is_int(toks[j]):
+                raise TypeError(f"Line {3 + i}: Expected int, got {toks[j]}")
+        E.append([int(t) for t in toks])
+    return np.array(E, dtype=np.int32).reshape(len(lines), d)
+
+def _parse_edge_block(block, m, d):
+    '''Parses m lines of d comma separated non-negative integers held
+    in the uint8 array block without a Python level loop over edges.
+    Returns the (m, d) int32 edge array, or None if the block contains
+    anything unusual (signs, stray commas, wrong widths, huge values).'''
+    digit = (block >= ord("0")) & (block <= ord("9"))
+    comma = block == ord(",")
+    newline = block == ord("\n")
+    space = (block == ord(" ")) | (block == ord("\t")) | (block == ord("\r"))
+    if not np.all(digit | comma | newline | space):
+        return None
+
+    # Tokens are maximal runs of digits.
+    prev = np.concatenate(([False], digit[:-1]))
+    succ = np.concatenate((digit[1:], [False]))
+    tok_start = np.flatnonzero(digit & ~prev)
+    tok_end = np.flatnonzero(digit & ~succ) + 1
+    commas = np.flatnonzero(comma)
+    if len(tok_start) != m * d or len(commas) != m * (d - 1):
+        return None
+
+    # Every line holds d tokens separated by exactly one comma each.
+    newlines = np.flatnonzero(newline)
+    if np.any(np.searchsorted(newlines, tok_start) != np.repeat(np.arange(m), d)):
+        return None
+    if d > 1:
+        if np.any(np.searchsorted(newlines, commas) != np.repeat(np.arange(m), d - 1)):
+            return None
+        C = commas.reshape(m, d - 1)
+        if np.any(C < tok_end.reshape(m, d)[:, :-1]) or np.any(C > tok_start.reshape(m, d)[:, 1:]):
+            return None
+
+    # Horner's rule over digit positions, one pass per digit.
+    lengths = tok_end - tok_start
+    if lengths.max() > 9:
+        return None
+    vals = np.zeros(len(tok_start), dtype=np.int64)
+    for k in range(lengths.max()):
+        mask = lengths > k
+        vals[mask] = vals[mask] * 10 + (block[tok_start[mask] + k] - ord("0"))
+    return vals.astype(np.int32).reshape(m, d)
+
+def parse_mmi_array(data):
+    '''Vectorized alternative to parse_mmi().  Takes either the whole
+    contents of an .mmi file (str or bytes) or a list of its lines, and
+    returns a tuple (d, n, m, E, result) like parse_mmi() does, except E
+    is a contiguous int32 numpy array of shape (m, d) holding one edge
+    per row in file order.  Wrap E in an EdgeView to get a dict-like
+    view of it.
+
+    Performs the same format and duplicate edge validation as
+    parse_mmi(), raising the same exceptions.  Contents of an .mmib file
+    are recognised by their magic bytes and decoded without copying.
+    '''
+
+    if isinstance(data, str):
+        data = data.encode()
+    elif isinstance(data, (bytes, bytearray)) and data[:len(MMIB_MAGIC)] == MMIB_MAGIC:
+        return _parse_mmib(data)
+    elif not isinstance(data, (bytes, bytearray)):
+        data = "".join(l if l.endswith("\n") else l + "\n" for l in data).encode()
+
+    # Locate line boundaries, a trailing newline doesn't start a new line.
+    buf = np.frombuffer(data, dtype=np.uint8)
+    nl = np.flatnonzero(buf == ord("\n"))
+    starts = np.concatenate(([0], nl + 1))
+    ends = np.concatenate((nl, [len(buf)]))
+    if len(buf) == 0 or buf[-1] == ord("\n"):
+        starts, ends = starts[:-1], ends[:-1]
+    num_lines = len(starts)
+
+    def line(i):
+        return data[starts[i]:ends[i]].decode()
+
+    if num_lines < 3:
+        raise Exception("Insufficient lines to parse.")
+
+    # Parse first three lines.
+    for (i, c) in [(0, "d"), (1, "n"), (2, "m")]:
+        if not str_is_int(line(i).strip()):
+            raise TypeError(f"Line {i}: Expected {c} is int, got: {line(i).strip()}")
+
+    d = int(line(0))
+    n = int(line(1))
+    m = max(int(line(2)), 0)
+
+    if num_lines < m + 3:
+        raise Exception(f"Line {num_lines}: Expected {m} {d}-edges, got {num_lines - 3}")
+
+    # Parse edges in bulk, falling back to a line by line parse to
+    # report errors or handle unusual (but valid) integers.
+    E = np.empty((0, d), dtype=np.int32)
+    if m > 0:
+        block = buf[starts[3]:ends[m + 2]]
+        E = _parse_edge_block(block, m, d)
+        if E is None:
+            E = _parse_edge_lines(block.tobytes().decode().split("\n"), d)
+
+    # Duplicate edges end up adjacent once sorted lexicographically.
+    if m > 1:
+        order = np.lexsort(E.T[::-1])
+        S = E[order]
+        dup = np.all(S[1:] == S[:-1], axis=1)
+        if np.any(dup):
+            i = int(np.min(order[1:][dup]))
+            raise Exception(f"Line {3 + i}: Duplicate edge detected, {line(3 + i).strip()}")
+
+    # Parse optional result.
+    result = None
+    if num_lines == m + 3 + 1:
+        if line(m + 3).strip() != "":
+            if not str_is_int(line(m + 3).strip()):
+                raise TypeError(f"Line {m+3}: Expected int, got: {line(m+3).strip()}")
+            result = int(line(m + 3))
+
+    if num_lines > m + 4:
+        raise Exception(f"Line {m+4}: Unexpected lines, {line(m+4).strip()}")
+
+    return (d, n, m, E, result)
+
+# ---- Binary instance format (.mmib) ----
+#
+# A fixed little-endian header followed by the edge table:
+#   magic b"MMIB", version u32, d u32, n u32, m u64, result i64 (-1 if unknown)
+#   m * d int32 vertices, one edge per row in .mmi order.
+
+MMIB_EXT = ".mmib"
+MMIB_MAGIC = b"MMIB"
+MMIB_VERSION = 1
+MMIB_HEADER = struct.Struct("<4sIIIQq")
+
+def _parse_mmib_header(header, name="instance"):
+    '''Unpacks and checks an .mmib header, returning (d, n, m, result).'''
+    if len(header) < MMIB_HEADER.size:
+        raise ValueError(f"{name}: Truncated .mmib header")
+    (magic, version, d, n, m, result) = MMIB_HEADER.unpack_from(header)
+    if magic != MMIB_MAGIC:
+        raise ValueError(f"{name}: Not an .mmib file")
+    if version != MMIB_VERSION:
+        raise ValueError(f"{name}: Unsupported .mmib version {version}")
+    return (d, n, m, None if result < 0 else result)
+
+def _parse_mmib(data):
+    '''Decodes the bytes of an .mmib file, E is a read-only view into data.'''
+    (d, n, m, result) = _parse_mmib_header(data)
+    if len(data) != MMIB_HEADER.size + 4 * m * d:
+        raise ValueError(f"Expected {m} {d}-edges in .mmib data of {len(data)} bytes")
+    E = np.frombuffer(data, dtype="<i4", count=m * d, offset=MMIB_HEADER.size).reshape(m, d)
+    return (d, n, m, E, result)
+
+def write_mmib(path, G, result=None):
+    '''Writes the instance G = (d, n, m, E), E in any form edge_array()
+    accepts, and the optional known maximum matching size to path in
+    the .mmib format.  The file is replaced atomically.'''
+    (d, n, m, E) = G
+    A = edge_array(E, d).astype("<i4", copy=False)
+    if A.shape != (m, d):
+        raise Exception(f"Expected {m} {d}-edges, got array of shape {A.shape}")
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MMIB_HEADER.pack(MMIB_MAGIC, MMIB_VERSION, d, n, m, -1 if result is None else result))
+        f.write(A.tobytes())
+    os.replace(tmp_path, path)
+
+def read_mmib(path):
+    '''Reads an .mmib file, returning (d, n, m, E, result) like
+    parse_mmi_array() with E memory-mapped from the file, so no edge
+    data is read until it is used.'''
+    with open(path, "rb") as f:
+        (d, n, m, result) = _parse_mmib_header(f.read(MMIB_HEADER.size), path)
+    if os.path.getsize(path) != MMIB_HEADER.size + 4 * m * d:
+        raise ValueError(f"{path}: Expected {m} {d}-edges, file size doesn't match")
+    if m * d == 0:
+        E = np.empty((m, d), dtype="<i4")
+    else:
+        E = np.memmap(path, dtype="<i4", mode="r", offset=MMIB_HEADER.size, shape=(m, d))
+    return (d, n, m, E, result)
+
+def mmib_path(path):
+    '''Returns the path of the binary version of the instance at path:
+    path itself if it is an .mmib file, its .mmib companion if that is
+    at least as new as the .mmi file, or None otherwise.'''
+    if path.endswith(MMIB_EXT):
+        return path
+    companion = os.path.splitext(path)[0] + MMIB_EXT
+    try:
+        if os.path.getmtime(companion) >= os.path.getmtime(path):
+            return companion
+    except OSError:
+        pass
+    return None
+
+def load_mmi(path):
+    '''Loads the instance at path, an .mmi or .mmib file, returning
+    (d, n, m, E, result) like parse_mmi_array().  An up to date .mmib
+    companion is memory-mapped in preference to parsing the text.'''
+    binary = mmib_path(path)
+    if binary is not None:
+        return read_mmib(binary)
+    with open(path, "rb") as f:
+        return parse_mmi_array(f.read())
+
+def read_header(path):
+    '''Returns (d, n, m) of the instance at path, an .mmi or .mmib file,
+    reading only its header.'''
+    binary = mmib_path(path)
+    if binary is not None:
+        with open(binary, "rb") as f:
+            return _parse_mmib_header(f.read(MMIB_HEADER.size), binary)[:3]
+    with open(path) as f:
+        lines = [f.readline().strip() for _ in range(3)]
+    for (i, (line, c)) in enumerate(zip(lines, "dnm")):
+        if not str_is_int(line):
+            raise TypeError(f"Line {i}: Expected {c} is int, got: {line}")
+    (d, n, m) = map(int, lines)
+    return (d, n, max(m, 0))
+
+def format_edges(E):
+    '''Formats edges, a dict, EdgeView or (m, d) array, as the comma
+    separated lines of an .mmi file joined by newlines.'''
+    if isinstance(E, (EdgeView, np.ndarray)):
+        A = edge_array(E)
+        if len(A) == 0:
+            return ""
+        return "\n".join(",".join(map(str, e)) for e in A.tolist())
+    return "\n".join([str(key)[1:-1] for key in E])
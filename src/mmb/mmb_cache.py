@@ -0,0 +1,111 @@
+'''mmb_cache.py
+
+On-disk cache of parsed Maximum Matching Instances, so repeated
+benchmark runs over the same .mmi files only parse each one once.
+
+Entries are stored in the binary .mmib format (see src/README.md) under
+a cache directory, by default .mmcache/, named by a hash of the .mmi
+file's contents.  Editing an instance therefore simply misses the cache.
+The directory is kept under a size limit by evicting the least recently
+used entries, recency being tracked through each entry's mtime.
+'''
+
+import hashlib
+import os
+import struct
+import threading
+
+from mmb_arrays import parse_mmi_array, read_mmib, write_mmib, MMIB_EXT
+
+DEFAULT_CACHE_DIR = ".mmcache"
+DEFAULT_MAX_BYTES = 1 << 30
+
+class InstanceCache:
+    '''Content addressed cache of parsed instances.  load() returns
+    (d, n, m, E, result) like mmb_arrays.parse_mmi_array() does, with E
+    memory-mapped from the cache entry.  Hit, miss and eviction counts
+    are kept for reporting at the end of a run.  Safe to share between
+    threads.
+    '''
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def content_hash(data):
+        '''Returns the cache key for the raw contents of an .mmi file.'''
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key + MMIB_EXT)
+
+    def load(self, path):
+        '''Returns the parsed instance stored in the .mmi file at path,
+        parsing it and adding it to the cache on a miss.  A truncated or
+        corrupt entry counts as a miss and is replaced.  Parse errors
+        are raised as by parse_mmi_array() and nothing is cached.'''
+        with open(path, "rb") as f:
+            data = f.read()
+        entry = self.entry_path(self.content_hash(data))
+
+        try:
+            instance = read_mmib(entry)
+            os.utime(entry)
+            with self.lock:
+                self.hits += 1
+            return instance
+        except OSError:
+            pass
+        except (ValueError, struct.error):
+            # A truncated or corrupt entry, parsed again and replaced below
+            try:
+                os.remove(entry)
+            except OSError:
+                pass
+
+        with self.lock:
+            self.misses += 1
+        (d, n, m, E, result) = parse_mmi_array(data)
+        write_mmib(entry, (d, n, m, E), result)
+        self.evict()
+        return (d, n, m, E, result)
+
+    def evict(self):
+        '''Removes least recently used entries until the cache fits in
+        max_bytes.'''
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(MMIB_EXT):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        entries.sort()
+        for (_, size, entry_path) in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+                with self.lock:
+                    self.evictions += 1
+            except OSError:
+                pass
+            total -= size
+
+    def report(self):
+        '''Returns a one line summary of the cache statistics.'''
+        lookups = self.hits + self.misses
+        rate = 100 * self.hits / lookups if lookups else 0
+        return (f"Instance cache {self.directory}: {self.hits} hits, {self.misses} misses "
+                f"({rate:.1f}% hit rate), {self.evictions} evictions")
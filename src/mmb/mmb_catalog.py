@@ -0,0 +1,200 @@
+'''mmb_catalog.py
+
+Catalog of the instances below a benchmarks directory, so tests can be
+selected by their size and shape without parsing them first.
+
+The catalog is a CSV file, by default benchmarks/catalog.csv, built by
+tools/build_catalog.py.  It holds one row per instance with its path,
+relative to the catalog, and:
+
+- d, n, m and the known maximum matching size M (empty if unknown);
+- density = m / n^d, the fraction of possible edges present;
+- min_degree, max_degree and mean_degree over all d * n vertices;
+- hash, the content hash used by mmb_resume.py, and size and mtime_ns
+  to tell whether the entry is still up to date.
+
+Queries are Python expressions over these fields, e.g.
+"d >= 4 and m > 10000" or "'d3' in path and density < 0.01", evaluated
+by a small interpreter that only allows comparisons, arithmetic and
+boolean operators.
+'''
+
+import ast
+import csv
+import operator
+import os
+
+import numpy as np
+
+from mmb_arrays import parse_mmi_array, MMIB_EXT
+from mmb_resume import file_hash
+
+DEFAULT_CATALOG = "catalog.csv"
+
+CATALOG_FIELDS = ['path', 'hash', 'size', 'mtime_ns', 'd', 'n', 'm', 'M',
+                  'density', 'min_degree', 'max_degree', 'mean_degree']
+INT_FIELDS = {'size', 'mtime_ns', 'd', 'n', 'm', 'M', 'min_degree', 'max_degree'}
+FLOAT_FIELDS = {'density', 'mean_degree'}
+
+def instance_entry(path):
+    '''Parses the instance at path and returns its catalog entry, with
+    path as given.  Raises like parse_mmi_array() on malformed files.'''
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        (d, n, m, E, result) = parse_mmi_array(f.read())
+
+    # Vertices of each partition are numbered 1..n
+    degrees = np.concatenate([np.bincount(E[:, k], minlength=n + 1)[1:] for k in range(d)]) if d and n \
+        else np.zeros(0, dtype=np.int64)
+    return {
+        'path': path, 'hash': file_hash(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+        'd': d, 'n': n, 'm': m, 'M': result,
+        'density': m / n ** d if n else 0.0,
+        'min_degree': int(degrees.min()) if len(degrees) else 0,
+        'max_degree': int(degrees.max()) if len(degrees) else 0,
+        'mean_degree': float(degrees.mean()) if len(degrees) else 0.0,
+    }
+
+def is_current(entry, path):
+    '''Returns whether the file at path is unchanged since entry was made.'''
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    return stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']
+
+def instance_paths(root):
+    '''Yields the instance files below root: every .mmi file, and .mmib
+    files without an .mmi source next to them.'''
+    for (dir_path, dir_names, file_names) in os.walk(root):
+        dir_names.sort()
+        names = set(file_names)
+        for file_name in sorted(file_names):
+            (stem, ext) = os.path.splitext(file_name)
+            if ext == ".mmi" or ext == MMIB_EXT and stem + ".mmi" not in names:
+                yield os.path.join(dir_path, file_name)
+
+def build_catalog(root, catalog_path=None, log=print):
+    '''Catalogs the instances below root into catalog_path, by default
+    catalog.csv in root, reusing the entries of an existing catalog for
+    files that haven't changed.  Instances that can't be parsed are
+    reported through log and left out.  Returns (cataloged, reused,
+    failed).'''
+    catalog_path = catalog_path or os.path.join(root, DEFAULT_CATALOG)
+    catalog_dir = os.path.dirname(os.path.abspath(catalog_path))
+    previous = load_catalog(catalog_path) if os.path.exists(catalog_path) else {}
+
+    entries = []
+    reused = failed = 0
+    for path in instance_paths(root):
+        key = os.path.abspath(path)
+        if key in previous and is_current(previous[key], path):
+            entry = previous[key]
+            reused += 1
+        else:
+            try:
+                entry = instance_entry(path)
+            except Exception as e:
+                log(f"Error cataloging {path}: {e}")
+                failed += 1
+                continue
+        entries.append({**entry, 'path': os.path.relpath(key, catalog_dir)})
+
+    # Written to a temporary file first so a failed build keeps the old catalog
+    tmp_path = f"{catalog_path}.{os.getpid()}.tmp"
+    with open(tmp_path, mode='w', newline='') as file:
+        writer = csv.DictWriter(file, CATALOG_FIELDS)
+        writer.writeheader()
+        for entry in entries:
+            writer.writerow({k: "" if v is None else v for (k, v) in entry.items()})
+    os.replace(tmp_path, catalog_path)
+    return (len(entries), reused, failed)
+
+def load_catalog(catalog_path):
+    '''Returns the entries of the catalog at catalog_path as a dict from
+    absolute instance path to entry, with numeric fields converted and
+    unknown values as None.'''
+    catalog_dir = os.path.dirname(os.path.abspath(catalog_path))
+    entries = {}
+    with open(catalog_path, newline='') as file:
+        for row in csv.DictReader(file):
+            entry = {}
+            for (k, v) in row.items():
+                if v == "":
+                    entry[k] = None
+                elif k in INT_FIELDS:
+                    entry[k] = int(v)
+                elif k in FLOAT_FIELDS:
+                    entry[k] = float(v)
+                else:
+                    entry[k] = v
+            entries[os.path.normpath(os.path.join(catalog_dir, entry['path']))] = entry
+    return entries
+
+# ---- Queries ----
+
+_BOOL_OPS = {ast.And: all, ast.Or: any}
+_UNARY_OPS = {ast.Not: operator.not_, ast.USub: operator.neg, ast.UAdd: operator.pos}
+_BIN_OPS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+            ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv,
+            ast.Mod: operator.mod, ast.Pow: operator.pow}
+_CMP_OPS = {ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt,
+            ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+            ast.In: lambda a, b: a in b, ast.NotIn: lambda a, b: a not in b}
+
+def _check_query(node):
+    '''Raises ValueError if the parsed query uses anything but fields,
+    constants and the operators above.'''
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name):
+            if child.id not in CATALOG_FIELDS:
+                raise ValueError(f"unknown field {child.id}, expected one of {', '.join(CATALOG_FIELDS)}")
+        elif isinstance(child, ast.Constant):
+            if not isinstance(child.value, (int, float, str)) and child.value is not None:
+                raise ValueError(f"unsupported constant {child.value!r}")
+        elif not isinstance(child, (ast.Expression, ast.BoolOp, ast.UnaryOp, ast.BinOp, ast.Compare,
+                                    ast.Load, *_BOOL_OPS, *_UNARY_OPS, *_BIN_OPS, *_CMP_OPS)):
+            raise ValueError(f"unsupported syntax {type(child).__name__}")
+
+def _evaluate(node, entry):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, entry)
+    if isinstance(node, ast.Name):
+        return entry.get(node.id)
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.BoolOp):
+        return _BOOL_OPS[type(node.op)](_evaluate(v, entry) for v in node.values)
+    if isinstance(node, ast.UnaryOp):
+        return _UNARY_OPS[type(node.op)](_evaluate(node.operand, entry))
+    if isinstance(node, ast.BinOp):
+        return _BIN_OPS[type(node.op)](_evaluate(node.left, entry), _evaluate(node.right, entry))
+    # Compare, possibly chained as in 100 < n <= 200, where comparing an
+    # unknown value (None) is simply false
+    left = _evaluate(node.left, entry)
+    for (op, comparator) in zip(node.ops, node.comparators):
+        right = _evaluate(comparator, entry)
+        try:
+            if not _CMP_OPS[type(op)](left, right):
+                return False
+        except TypeError:
+            return False
+        left = right
+    return True
+
+def compile_query(query):
+    '''Returns a predicate on catalog entries for the query expression.
+    Comparisons of fields whose value is unknown, e.g. M, are false
+    rather than raising.  Raises ValueError for invalid queries.'''
+    try:
+        tree = ast.parse(query, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"invalid query {query!r}: {e.msg}")
+    _check_query(tree)
+
+    def predicate(entry):
+        try:
+            return bool(_evaluate(tree, entry))
+        except (TypeError, ZeroDivisionError):
+            return False
+    return predicate
@@ -0,0 +1,216 @@
+#!/bin/python3
+'''mmb_compare.py
+
+Compares a new set of benchmark results against a baseline to catch
+performance regressions after a solver change.
+
+Results, CSV files or SQLite databases as written by mmb.py, are
+matched by solver name and instance hash, so the comparison survives
+moved instances and edited solvers (whose Solver ID changes).  Each
+pair's timing distribution is made of the raw samples of its rows if
+they were recorded (--raw_samples), or the elapsed time of each row
+otherwise, so running with --repeat or appending several sweeps gives
+the test more to work with.
+
+A pair regressed if its new median time is more than --threshold
+(relative) and --min_diff (absolute seconds) slower than the baseline
+and a two-sided Mann-Whitney U test finds the distributions differ at
+level --alpha.  With a single sample on either side no test is
+possible, nor with samples too small for any outcome of the test to
+reach --alpha (e.g. 3 vs 3 samples can't give p < 0.1), and the
+thresholds alone decide.  A pair that used to succeed
+and now times out, runs out of memory or fails also counts as a
+regression, and the reverse as an improvement.
+
+Exits with 1 if anything regressed, so it can gate a change:
+
+    ./mmb_compare.py baseline.csv new.csv --threshold 0.2
+'''
+
+import argparse
+import csv
+import math
+import statistics
+import sys
+from functools import lru_cache
+
+from mmb import SAMPLES_SEP
+from mmb_resume import INSTANCE_HASH_CN
+from mmb_results import query_results, SQLITE_EXTS
+from mmb_schedule import is_skipped
+
+SAMPLES_CN = 'Samples (s)'
+
+# Largest samples for which the exact distribution of U is used
+EXACT_MAX_SAMPLES = 12
+
+def read_rows(path, solvers=None):
+    '''Returns the result rows of the CSV file or SQLite database at path
+    as dicts keyed by column name, only those of the given solver names
+    if solvers is given.'''
+    if path.endswith(SQLITE_EXTS):
+        (columns, rows) = query_results(path, solvers=solvers)
+        return [dict(zip(columns, row)) for row in rows]
+    with open(path, newline='') as file:
+        return [row for row in csv.DictReader(file) if not solvers or row['Solver'] in solvers]
+
+def load_results(path, solvers=None):
+    '''Returns a dict from (solver name, instance hash) to {'path', 'outcome',
+    'samples'} for the results at path.  A pair that succeeded in any
+    row keeps the samples of its successful rows; otherwise its outcome
+    is that of its last row.  Rows without an instance hash, from before
+    mmb.py recorded it, and skipped tests are left out.'''
+    results = {}
+    for row in read_rows(path, solvers):
+        if not row.get(INSTANCE_HASH_CN) or is_skipped(row['Success']):
+            continue
+        entry = results.setdefault((row['Solver'], row[INSTANCE_HASH_CN]),
+                                   {'path': row['Test Path'], 'outcome': None, 'samples': []})
+        outcome = str(row['Success'])
+        if outcome != "True":
+            if entry['outcome'] != "True":
+                entry['outcome'] = outcome
+            continue
+        entry['outcome'] = "True"
+        if row.get(SAMPLES_CN):
+            entry['samples'] += [float(t) for t in str(row[SAMPLES_CN]).split(SAMPLES_SEP)]
+        elif row.get('Elapsed Time (s)') not in (None, ""):
+            entry['samples'].append(float(row['Elapsed Time (s)']))
+    return results
+
+@lru_cache(maxsize=None)
+def _u_counts(n1, n2):
+    '''Returns the number of orderings of n1 + n2 distinct values giving
+    each U statistic 0..n1 * n2, for the exact test.'''
+    if n1 == 0 or n2 == 0:
+        return (1,) + (0,) * (n1 * n2)
+    # The largest value is either from the first sample, adding n2 to U, or not
+    with_first = _u_counts(n1 - 1, n2)
+    without = _u_counts(n1, n2 - 1)
+    return tuple((with_first[u - n2] if u >= n2 else 0) + (without[u] if u < len(without) else 0)
+                 for u in range(n1 * n2 + 1))
+
+def mann_whitney(a, b):
+    '''Returns the two-sided p-value of the Mann-Whitney U test that the
+    samples a and b come from the same distribution: exact for small
+    samples without ties, from the normal approximation with tie and
+    continuity corrections otherwise.'''
+    (n1, n2) = (len(a), len(b))
+    values = sorted([(x, 0) for x in a] + [(x, 1) for x in b])
+
+    # Rank the pooled samples, ties getting their average rank
+    ranks = [0.0] * len(values)
+    tie_term = 0
+    i = 0
+    while i < len(values):
+        j = i
+        while j + 1 < len(values) and values[j + 1][0] == values[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tie_term += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+    u1 = sum(r for (r, (_, sample)) in zip(ranks, values) if sample == 0) - n1 * (n1 + 1) / 2
+    u = min(u1, n1 * n2 - u1)
+
+    if tie_term == 0 and max(n1, n2) <= EXACT_MAX_SAMPLES:
+        counts = _u_counts(n1, n2)
+        return min(1.0, 2 * sum(counts[:int(u) + 1]) / math.comb(n1 + n2, n1))
+
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (n1 * n2 / 2 - u - 0.5) / math.sqrt(variance)
+    return min(1.0, math.erfc(max(z, 0) / math.sqrt(2)))
+
+def min_p_value(n1, n2):
+    '''Returns the smallest p-value mann_whitney() can give for samples
+    of sizes n1 and n2, that of two samples that don't overlap.'''
+    return mann_whitney(range(n1), range(n1, n1 + n2))
+
+def compare_pair(base, new, threshold, alpha, min_diff):
+    '''Returns (verdict, base median, new median, p-value) for one pair,
+    verdict being "regression", "improvement" or "unchanged".  Times
+    and p-value are None where they don't apply.'''
+    if base['outcome'] != "True" or new['outcome'] != "True":
+        if base['outcome'] == new['outcome']:
+            return ("unchanged", None, None, None)
+        return ("improvement" if new['outcome'] == "True" else "regression", None, None, None)
+
+    (base_time, new_time) = (statistics.median(base['samples']), statistics.median(new['samples']))
+    (n1, n2) = (len(base['samples']), len(new['samples']))
+    # Without enough samples for the test to tell, the thresholds decide
+    p = mann_whitney(base['samples'], new['samples']) \
+        if min(n1, n2) > 1 and min_p_value(n1, n2) < alpha else None
+    if p is not None and p >= alpha:
+        return ("unchanged", base_time, new_time, p)
+    if new_time > base_time * (1 + threshold) and new_time - base_time > min_diff:
+        return ("regression", base_time, new_time, p)
+    if new_time < base_time / (1 + threshold) and base_time - new_time > min_diff:
+        return ("improvement", base_time, new_time, p)
+    return ("unchanged", base_time, new_time, p)
+
+def compare(baseline, new, threshold=0.1, alpha=0.05, min_diff=0.0):
+    '''Compares the pairs found in both the baseline and new results, as
+    returned by load_results(), returning a list of (solver, test path,
+    base outcome, new outcome, verdict, base median, new median,
+    p-value) sorted by solver and test path.'''
+    comparisons = []
+    for key in sorted(baseline.keys() & new.keys()):
+        (base_entry, new_entry) = (baseline[key], new[key])
+        (verdict, base_time, new_time, p) = compare_pair(base_entry, new_entry, threshold, alpha, min_diff)
+        comparisons.append((key[0], new_entry['path'], base_entry['outcome'], new_entry['outcome'],
+                            verdict, base_time, new_time, p))
+    return sorted(comparisons, key=lambda c: (c[0], c[1]))
+
+def format_comparison(comparison):
+    (solver, path, base_outcome, new_outcome, verdict, base_time, new_time, p) = comparison
+    if base_time is None:
+        return f"{verdict.upper():<12} [{solver}] {path}: {_describe(base_outcome)} -> {_describe(new_outcome)}"
+    change = f"{(new_time / base_time - 1) * 100 if base_time else 0:+.1f}%"
+    test = f"p={p:.4f}" if p is not None else "untested"
+    return f"{verdict.upper():<12} [{solver}] {path}: {base_time:.7f}s -> {new_time:.7f}s ({change}) {test}"
+
+def _describe(outcome):
+    return {"True": "success", "False": "failed"}.get(outcome, outcome.lower())
+
+# ================== Main ====================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares benchmark results against a baseline.")
+    parser.add_argument("baseline", type=str, help="Path to the baseline results, CSV or SQLite.")
+    parser.add_argument("new", type=str, help="Path to the new results, CSV or SQLite.")
+    parser.add_argument("-th", "--threshold", type=float, default=0.1,
+                        help="relative slowdown of the median time counted as a regression, default 0.1 (10%%)")
+    parser.add_argument("-a", "--alpha", type=float, default=0.05,
+                        help="significance level of the Mann-Whitney U test, default 0.05")
+    parser.add_argument("-md", "--min_diff", type=float, default=0.0,
+                        help="ignore changes in median time of at most this many seconds")
+    parser.add_argument("-sv", "--solver", type=str, nargs="+", default=None,
+                        help="only compare these solvers, by name")
+    parser.add_argument("--all", action="store_true", help="also list the unchanged pairs")
+    args = parser.parse_args()
+
+    if args.threshold < 0 or not 0 < args.alpha <= 1 or args.min_diff < 0:
+        print("Error: threshold and min_diff must be non-negative and alpha in (0, 1].")
+        exit(3)
+
+    try:
+        baseline = load_results(args.baseline, args.solver)
+        new = load_results(args.new, args.solver)
+    except Exception as e:
+        print(f"Error: Unable to read results: {e}", file=sys.stderr)
+        exit(2)
+
+    comparisons = compare(baseline, new, args.threshold, args.alpha, args.min_diff)
+    unmatched = len(baseline.keys() ^ new.keys())
+    counts = {"regression": 0, "improvement": 0, "unchanged": 0}
+    for comparison in comparisons:
+        counts[comparison[4]] += 1
+        if args.all or comparison[4] != "unchanged":
+            print(format_comparison(comparison))
+
+    print(f"Compared {len(comparisons)} (solver, instance) pairs, {unmatched} only in one of the results: "
+          f"{counts['regression']} regressions, {counts['improvement']} improvements, "
+          f"{counts['unchanged']} unchanged")
+    exit(1 if counts["regression"] else 0)
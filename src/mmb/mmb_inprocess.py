@@ -0,0 +1,160 @@
+'''mmb_inprocess.py
+
+Runs Python solvers inside the benchmarker instead of as a separate
+command.  A Solver subclass (see src/solvers/solver.py) is imported
+once by file path, and each test is solved in a forked worker process
+that inherits the already parsed instance, so neither interpreter start
+up, imports nor text I/O are part of the measurement.  Only the call
+to solve() is timed.  The fork still isolates the benchmarker from the
+solver: a worker that runs past the timeout is killed.
+
+Requires the fork start method, i.e. not Windows.
+'''
+
+import cProfile
+import importlib.util
+import inspect
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from subprocess import TimeoutExpired
+from mmb_resources import self_usage, limit_memory, kill_group, OutOfMemory
+from mmb_profile import INTERRUPT_GRACE
+from mmb_tools import FLUSH_GRACE
+
+def split_solver_spec(spec):
+    '''Splits "path/to/solver.py[:ClassName]" into (path, class name or None).'''
+    if ":" in spec and not spec.endswith(".py"):
+        path, class_name = spec.rsplit(":", 1)
+        return (path, class_name)
+    return (spec, None)
+
+def load_solver_class(spec):
+    '''Imports the solver module at the path given by spec, formatted as
+    "path/to/solver.py[:ClassName]", and returns the named Solver
+    subclass.  Without a class name the module must define exactly one
+    concrete Solver subclass.'''
+    (path, class_name) = split_solver_spec(spec)
+    path = os.path.abspath(path)
+
+    # Solvers import their helpers relative to their own directory, which
+    # is only searched while the module loads so it can't shadow others
+    saved_path = list(sys.path)
+    sys.path.insert(0, os.path.dirname(path))
+    try:
+        module_name = "mmb_solver_" + os.path.splitext(os.path.basename(path))[0]
+        module_spec = importlib.util.spec_from_file_location(module_name, path)
+        if module_spec is None:
+            raise Exception(f"Unable to import solver from {path}")
+        module = importlib.util.module_from_spec(module_spec)
+        sys.modules[module_name] = module
+        module_spec.loader.exec_module(module)
+    finally:
+        sys.path[:] = saved_path
+
+    solvers = [obj for (name, obj) in inspect.getmembers(module, inspect.isclass)
+               if obj.__module__ == module_name and not inspect.isabstract(obj)
+               and any(base.__name__ == "Solver" for base in obj.__mro__[1:])]
+    if class_name is not None:
+        solvers = [obj for obj in solvers if obj.__name__ == class_name]
+        if not solvers:
+            raise Exception(f"No Solver subclass {class_name} in {path}")
+    elif len(solvers) != 1:
+        names = ", ".join(obj.__name__ for obj in solvers) or "none"
+        raise Exception(f"Expected one Solver subclass in {path}, found {names}; use {path}:ClassName")
+    return solvers[0]
+
+def _solve_worker(solver_class, G, conn, memory_limit=None, profile_path=None):
+    '''Body of the forked worker: solves G and sends back (ok, lines,
+    timings, usage), or (False, error, {}, usage) if the solver raised.
+    If a SIGTERM or SIGINT interrupts the solver, ok is None and lines
+    the best matching it found.  With a profile_path the solve() call is
+    profiled into that file, also when interrupted.'''
+    try:
+        # Lead a process group, so processes the solver starts are killed
+        # with it, see kill_group()
+        os.setpgrp()
+        if memory_limit is not None:
+            limit_memory(0, memory_limit)
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        solver = solver_class()
+        profiler = cProfile.Profile() if profile_path is not None else None
+        solve_start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            (M, interrupted) = solver.solve_interruptibly(G)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(profile_path)
+        emit_start = time.perf_counter()
+        lines = [", ".join(map(str, e)) for e in M]
+        timings = {"solve": emit_start - solve_start,
+                   "emit": time.perf_counter() - emit_start}
+        conn.send((None if interrupted else True, lines, timings, self_usage()))
+    except BaseException as e:
+        if isinstance(e, MemoryError):
+            e = OutOfMemory(f"MemoryError: {e}")
+        else:
+            e = Exception(f"{type(e).__name__}: {e}")
+        conn.send((False, e, {}, self_usage()))
+    finally:
+        conn.close()
+
+def solve_in_fork(solver_class, G, timeout=None, cpu=None, memory_limit=None, profile_path=None):
+    '''Solves the instance G = (d, n, m, E) with solver_class in a forked
+    worker, optionally pinned to the CPU cpu and limited to memory_limit
+    MB of address space, which includes what it inherits from the
+    benchmarker.  Returns (lines, timings, usage) where lines are the
+    matching's edges formatted as in .mmi files, timings holds the solve
+    and emit times and usage the worker's CPU time and peak memory (see
+    mmb_resources.py).  If profile_path is given, the solve() call is
+    profiled with cProfile into that file.  Raises TimeoutExpired if the
+    worker doesn't finish within timeout seconds, after interrupting it
+    and then killing it; the best matching the solver found by then, if
+    it sent one, is the TimeoutExpired's output.  Raises OutOfMemory if
+    the solver ran out of memory and Exception if it raised otherwise or
+    the worker died.'''
+    ctx = multiprocessing.get_context("fork")
+    (recv, send) = ctx.Pipe(duplex=False)
+    # Not a daemon, so solvers can start worker processes of their own;
+    # it is always reaped below
+    p = ctx.Process(target=_solve_worker, args=(solver_class, G, send, memory_limit, profile_path))
+    p.start()
+    send.close()
+    if cpu is not None:
+        os.sched_setaffinity(p.pid, {cpu})
+
+    start_time = time.perf_counter()
+    try:
+        if not recv.poll(timeout):
+            # Let the worker send its best matching, and write the profile
+            # up to the timeout
+            output = ""
+            os.kill(p.pid, signal.SIGINT if profile_path is not None else signal.SIGTERM)
+            try:
+                if recv.poll(INTERRUPT_GRACE if profile_path is not None else FLUSH_GRACE):
+                    (ok, payload, _, _) = recv.recv()
+                    if ok is not False:
+                        output = "\n".join(payload)
+            except EOFError:
+                pass
+            kill_group(p)
+            raise TimeoutExpired(solver_class.__name__, timeout, output=output)
+        try:
+            (ok, payload, timings, usage) = recv.recv()
+        except EOFError:
+            p.join()
+            raise Exception(f"Solver process exited with code {p.exitcode}")
+    finally:
+        recv.close()
+        p.join()
+
+    if not ok:
+        if isinstance(payload, OutOfMemory):
+            (payload.usage, payload.elapsed) = (usage, time.perf_counter() - start_time)
+        raise payload
+    return (payload, timings, usage)
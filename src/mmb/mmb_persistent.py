@@ -0,0 +1,151 @@
+'''mmb_persistent.py
+
+Drives a long-lived solver process that solves many instances, so
+interpreter start up and imports are paid once per worker instead of
+once per test.  The solver stays a black box command, it only has to
+speak the persistent worker protocol when run with --server:
+
+- For each instance it reads a line holding the byte length of the
+  instance, followed by the instance in the .mmi format.
+- It answers with a line holding the byte length of the matching,
+  followed by the matching as lines of d-tuples, as in normal mode.
+- It exits when standard input is closed.
+
+Solver.do_main in src/solvers/solver.py implements this for every
+Python solver, using the message helpers in mmb_tools.py.  A worker
+that times out or crashes is killed and transparently restarted for
+the next instance.  A worker that times out first gets a SIGTERM and
+FLUSH_GRACE seconds to answer with the best matching it found.
+'''
+
+import os
+import queue
+import shlex
+import signal
+import sys
+import threading
+import time
+from subprocess import PIPE, TimeoutExpired
+from mmb_tools import SERVER_FLAG, FLUSH_GRACE, read_message, write_message
+from mmb_resources import ProcUsage, UsagePopen, OutOfMemory, kill_group, limit_memory, memory_limiter, is_out_of_memory
+
+class PersistentWorker:
+    '''A solver command run with --server, restarted as needed.'''
+
+    def __init__(self, exec_cmd, memory_limit=None):
+        self.exec_cmd = exec_cmd
+        self.memory_limit = memory_limit
+        self.p = None
+        self.restarts = 0
+
+    def start(self):
+        if sys.platform == 'win32':
+            cmd = [sys.executable] + shlex.split(self.exec_cmd) + [SERVER_FLAG]
+        else:
+            cmd = shlex.split(self.exec_cmd) + [SERVER_FLAG]
+        # In a process group of its own, see kill_group(), and limited to
+        # memory_limit before the command starts
+        preexec_fn = memory_limiter(self.memory_limit)
+        self.p = UsagePopen(cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE, start_new_session=sys.platform != 'win32',
+                            preexec_fn=preexec_fn)
+        if self.memory_limit is not None and preexec_fn is None:
+            limit_memory(self.p.pid, self.memory_limit)
+
+        # Responses and stderr are drained by threads so that waiting
+        # on a response can time out and stderr never fills its pipe.
+        self.responses = queue.Queue()
+        self.stderr_lock = threading.Lock()
+        self.stderr_chunks = []
+        threading.Thread(target=self._read_responses, args=(self.p.stdout, self.responses), daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(self.p.stderr,), daemon=True).start()
+
+    def _read_responses(self, stdout, responses):
+        while True:
+            fields = {}
+            payload = read_message(stdout, fields)
+            responses.put((payload, fields))
+            if payload is None:
+                return
+
+    def _read_stderr(self, stderr):
+        for line in iter(stderr.readline, b""):
+            with self.stderr_lock:
+                self.stderr_chunks.append(line)
+
+    def _take_stderr(self):
+        with self.stderr_lock:
+            data = b"".join(self.stderr_chunks)
+            self.stderr_chunks = []
+        return data.decode(errors="replace")
+
+    def solve(self, in_str, timeout=None, cpu=None):
+        '''Sends the instance in_str to the worker, starting it first if
+        needed, optionally pinned to the CPU cpu.  Returns (stdout,
+        stderr, elapsed wall time, usage, timings) where usage holds the
+        worker's CPU time and peak memory while solving (see
+        mmb_resources.py) and timings the phase timings it reported.
+        Raises TimeoutExpired if no answer comes within timeout seconds,
+        with the answer to the worker's SIGTERM as its output,
+        OutOfMemory if the worker runs out of memory and Exception if it
+        dies otherwise; either way it is killed and restarted on the next
+        call.'''
+        if self.p is None or self.p.poll() is not None:
+            if self.p is not None:
+                self.restarts += 1
+            self.start()
+        if cpu is not None:
+            os.sched_setaffinity(self.p.pid, {cpu})
+        usage = ProcUsage(self.p.pid)
+        usage.start()
+
+        # Start the timer
+        start_time = time.perf_counter()
+        try:
+            write_message(self.p.stdin, in_str.encode())
+            (payload, timings) = self.responses.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutExpired(self.exec_cmd, timeout, output=self.interrupt())
+        except OSError as e:
+            self.kill()
+            raise Exception(f"Worker stopped accepting instances: {e}")
+        # Stop the timer
+        elapsed_time = time.perf_counter() - start_time
+
+        if payload is None:
+            self.kill()
+            stderr = self._take_stderr()
+            if is_out_of_memory(self.p.returncode, stderr, self.p.usage, self.memory_limit):
+                raise OutOfMemory(f"Worker ran out of memory: {stderr}", self.p.usage, elapsed_time)
+            raise Exception(f"Worker exited with code {self.p.returncode}: {stderr}")
+        return (payload.decode(), self._take_stderr(), elapsed_time, usage.stop(), timings)
+
+    def interrupt(self):
+        '''Sends the worker a SIGTERM and kills it after FLUSH_GRACE
+        seconds, returning the best matching it answered with by then,
+        or "".'''
+        output = ""
+        if sys.platform != 'win32' and self.p.poll() is None:
+            self.p.send_signal(signal.SIGTERM)
+            try:
+                (payload, _) = self.responses.get(timeout=FLUSH_GRACE)
+                output = payload.decode() if payload is not None else ""
+            except queue.Empty:
+                pass
+        self.kill()
+        return output
+
+    def kill(self):
+        if self.p is not None and self.p.poll() is None:
+            kill_group(self.p)
+        if self.p is not None:
+            self.p.wait()
+
+    def close(self):
+        '''Closes the worker's stdin, letting it exit, then reaps it.'''
+        if self.p is None:
+            return
+        try:
+            self.p.stdin.close()
+            self.p.wait(timeout=5)
+        except (OSError, TimeoutExpired):
+            self.kill()
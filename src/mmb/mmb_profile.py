@@ -0,0 +1,218 @@
+#!/bin/python3
+'''mmb_profile.py
+
+Profiling of Python solvers with cProfile, see mmb.py --profile.
+
+Every test of a profiled sweep leaves a .pstats file, holding all of
+its measured runs, in <profile_dir>/<solver name>/.  A solver command
+such as "python3 solver.py" is run as "python3 -m cProfile -o ...
+solver.py", so its start up and parsing are profiled too, and an
+in-process solver (--in_process) has only its solve() call profiled.
+Solvers that time out are interrupted rather than killed so that their
+profile up to the timeout is still written.
+
+After the sweep the tests' profiles are added up into
+- profile_report.txt, functions ranked by cumulative time, and
+- profile.collapsed, collapsed stacks ("a;b;c microseconds" lines) for
+  flame graph tools such as flamegraph.pl or speedscope.
+cProfile only records caller/callee pairs, not whole stacks, so a
+function's time is split between its callers in proportion to the
+time each spent calling it, and recursion is folded into the outermost
+call.  The stacks are an estimate.
+
+Run directly to aggregate an existing set of profiles:
+
+    ./mmb_profile.py ../benchmarks/profiles/astarSolver
+'''
+
+import argparse
+import glob
+import os
+import pstats
+import re
+import shlex
+import sys
+import threading
+
+PSTATS_EXT = ".pstats"
+REPORT_FILE = "profile_report.txt"
+COLLAPSED_FILE = "profile.collapsed"
+DEFAULT_PROFILE_DIR = "profiles"
+INTERRUPT_GRACE = 5  # seconds a timed out solver gets to write its profile
+REPORT_LIMIT = 50
+MAX_STACK_DEPTH = 64
+MIN_FRAME_TIME = 1e-6  # seconds, cheaper call paths are left out of the stacks
+
+def profile_command(exec_cmd, pstats_path):
+    '''Returns exec_cmd changed to run under cProfile, writing its
+    profile to pstats_path.  Raises ValueError unless exec_cmd runs a
+    Python script, as "python3 solver.py ..." or "solver.py ...".'''
+    tokens = shlex.split(exec_cmd)
+    if tokens and tokens[0].endswith(".py"):
+        tokens = [sys.executable] + tokens
+    if len(tokens) < 2 or not re.fullmatch(r"python[\d.]*(\.exe)?", os.path.basename(tokens[0])) \
+            or not tokens[1].endswith(".py"):
+        raise ValueError(f"--profile needs a Python solver, run as 'python3 solver.py', got: {exec_cmd}")
+    return shlex.join([tokens[0], "-m", "cProfile", "-o", pstats_path] + tokens[1:])
+
+def test_profile_path(profile_dir, solver_name, i, test_path):
+    '''Returns the path of the profile of test number i of a sweep.'''
+    stem = os.path.splitext(os.path.basename(test_path))[0]
+    return os.path.join(profile_dir, solver_name, f"{i:04d}_{stem}{PSTATS_EXT}")
+
+def run_profile_path(pstats_path):
+    '''Returns a path for the profile of a single run, to be merged into
+    the test's profile at pstats_path with merge_profile().'''
+    return f"{pstats_path}.{os.getpid()}.{threading.get_ident()}.run"
+
+def merge_profile(run_path, pstats_path):
+    '''Adds the profile at run_path, if the run wrote one, into the one
+    at pstats_path and removes it.'''
+    if not os.path.exists(run_path):
+        return
+    try:
+        if os.path.exists(pstats_path):
+            stats = pstats.Stats(pstats_path)
+            stats.add(run_path)
+            stats.dump_stats(pstats_path)
+        else:
+            os.replace(run_path, pstats_path)
+    finally:
+        if os.path.exists(run_path):
+            os.remove(run_path)
+
+def load_profiles(pstats_paths):
+    '''Returns the pstats.Stats adding up the profiles at pstats_paths,
+    or None if there are none.'''
+    stats = None
+    for path in pstats_paths:
+        if stats is None:
+            stats = pstats.Stats(path)
+        else:
+            stats.add(path)
+    return stats
+
+def _label(func):
+    '''Returns the flame graph frame name of a pstats function key.'''
+    (file_name, line, name) = func
+    if file_name == "~":  # Built-ins
+        label = name
+    else:
+        label = f"{os.path.basename(file_name)}:{line}({name})"
+    return label.replace(";", ",").replace(" ", "_")
+
+def _components(callees):
+    '''Returns a dict from function to the id of its strongly connected
+    component in the call graph, callees mapping each function to those
+    it calls, so calls within a component are recursion.'''
+    (index, low, component) = ({}, {}, {})
+    (stack, on_stack) = ([], set())
+    for start in callees:
+        if start in index:
+            continue
+        work = [(start, iter(callees.get(start, ())))]
+        index[start] = low[start] = len(index)
+        stack.append(start)
+        on_stack.add(start)
+        while work:
+            (func, children) = work[-1]
+            child = next(children, None)
+            if child is not None:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(callees.get(child, ()))))
+                elif child in on_stack:
+                    low[func] = min(low[func], index[child])
+                continue
+            work.pop()
+            if work:
+                low[work[-1][0]] = min(low[work[-1][0]], low[func])
+            if low[func] == index[func]:
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component[member] = index[func]
+                    if member == func:
+                        break
+    return component
+
+def collapsed_stacks(stats):
+    '''Returns a dict from collapsed stack, frame names joined by ";",
+    to its own time in microseconds, estimated from the caller/callee
+    times of stats.'''
+    entries = stats.stats
+    callees = {func: [] for func in entries}
+    for (func, (_, _, _, _, callers)) in entries.items():
+        for caller in callers:
+            callees.setdefault(caller, []).append(func)
+    component = _components(callees)
+
+    # The roots are the outermost call of each top level recursion, i.e.
+    # component without callers from outside it
+    called = {component[func] for (func, entry) in entries.items()
+              if any(component.get(caller) != component[func] for caller in entry[4])}
+    tops = {}
+    for func in entries:
+        if component[func] not in called:
+            top = tops.get(component[func])
+            if top is None or entries[func][3] > entries[top][3]:
+                tops[component[func]] = func
+    roots = list(tops.values())
+
+    # Time spent in each function through calls from other functions, what
+    # a caller's share of the function's time is measured against
+    called_time = {func: sum(edge[3] for (caller, edge) in entry[4].items() if caller != func) or entry[3]
+                   for (func, entry) in entries.items()}
+
+    stacks = {}
+    def walk(func, share, stack):
+        # share is the part of func's time spent on this call path
+        if entries[func][3] * share < MIN_FRAME_TIME or len(stack) >= MAX_STACK_DEPTH:
+            return
+        stack = stack + [_label(func)]
+        key = ";".join(stack)
+        stacks[key] = stacks.get(key, 0) + entries[func][2] * share * 1e6
+        for callee in callees.get(func, []):
+            if callee == func or _label(callee) in stack:
+                continue  # Recursion is folded into the outermost call
+            walk(callee, share * entries[callee][4][func][3] / called_time[callee], stack)
+
+    for root in roots:
+        walk(root, 1.0, [])
+    return {stack: round(us) for (stack, us) in stacks.items() if round(us) > 0}
+
+def write_profile_reports(out_dir, pstats_paths, limit=REPORT_LIMIT):
+    '''Adds up the profiles at pstats_paths and writes REPORT_FILE and
+    COLLAPSED_FILE to out_dir.  Returns their paths, or None if there
+    were no profiles.'''
+    stats = load_profiles(pstats_paths)
+    if stats is None:
+        return None
+    report_path = os.path.join(out_dir, REPORT_FILE)
+    with open(report_path, "w") as f:
+        f.write(f"Aggregated profile of {len(pstats_paths)} tests\n\n")
+        stats.stream = f
+        stats.files = []  # Rather than listing every test's file
+        stats.sort_stats(pstats.SortKey.CUMULATIVE, pstats.SortKey.TIME).print_stats(limit)
+    collapsed_path = os.path.join(out_dir, COLLAPSED_FILE)
+    with open(collapsed_path, "w") as f:
+        for (stack, us) in sorted(collapsed_stacks(stats).items()):
+            f.write(f"{stack} {us}\n")
+    return (report_path, collapsed_path)
+
+# ================== Main ====================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregates the .pstats profiles of a profiled sweep.")
+    parser.add_argument("profile_dir", type=str, help="Directory holding the .pstats files.")
+    parser.add_argument("-l", "--limit", type=int, default=REPORT_LIMIT,
+                        help="number of functions listed in the report")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.profile_dir, "*" + PSTATS_EXT)))
+    reports = write_profile_reports(args.profile_dir, paths, args.limit)
+    if reports is None:
+        print(f"Error: no {PSTATS_EXT} files in {args.profile_dir}", file=sys.stderr)
+        exit(2)
+    print(f"Profile of {len(paths)} tests: report in {reports[0]}, collapsed stacks in {reports[1]}")
@@ -0,0 +1,294 @@
+#!/bin/python3
+'''mmb_race.py
+
+Races several solvers over the tests of one .mmb file in a single run.
+Each instance is parsed once and shared by all solvers, (solver,
+instance) jobs are spread over a pool of --jobs workers, and all
+results go to one consolidated results file.
+
+A race is defined by an INI style race file:
+
+    [race]
+    benchmark = ../benchmarks/benchmarkd2.mmb
+    output = ../analysis/data/d2Race.csv
+    timeout = 2
+    jobs = 4
+
+    [astarSolver]
+    command = python3 ../solvers/astar/astarSolver.py
+    persistent = yes
+
+    [HSApproxSolver]
+    command = python3 ../solvers/approximate/hypergraph/HSApproxSolver.py
+    timeout = 10
+
+Every solver gets its own section, named by the name recorded for it in
+the results, holding its command.  Any mmb.py option can be set by its
+long name, without the dashes, in [race] for all solvers or in a
+solver's section for just that solver; flags take yes / no.  The
+options benchmark, output, jobs, pin_cpus, query, catalog, resume and
+the cache options apply to the whole race and are only read from
+[race].  Paths, including those in commands, are relative to the race
+file's directory.
+'''
+
+import argparse
+import configparser
+import os
+import shlex
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from mmb import (make_parser, check_args, read_test_list, open_cache, cpu_queue, load_instance,
+                 run_test, report_profiles, supported_d, CSV_HEADER)
+from mmb_profile import DEFAULT_PROFILE_DIR
+from mmb_inprocess import load_solver_class, split_solver_spec
+from mmb_persistent import PersistentWorker
+from mmb_results import open_results
+from mmb_resume import solver_id
+from mmb_schedule import AdaptiveScheduler, instance_sizes, order_tests, is_skipped
+
+RACE_SECTION = "race"
+RACE_OPTIONS = {"benchmark", "output", "jobs", "pin_cpus", "no_cache", "cache_dir", "cache_size",
+                "query", "catalog", "resume"}
+
+class RaceSolver:
+    '''One solver of a race: its mmb.py options, identity, adaptive
+    scheduler if it has one, and, depending on its mode, its imported
+    Solver class or one persistent worker per pool thread.'''
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.key = solver_id(args.exec_cmd, args.in_process)
+        self.solver_class = load_solver_class(args.exec_cmd) if args.in_process else None
+        self.scheduler = None
+        self.workers = []
+        self.local = threading.local()
+
+    def thread_worker(self):
+        if not self.args.persistent:
+            return None
+        if not hasattr(self.local, "worker"):
+            self.local.worker = PersistentWorker(self.args.exec_cmd, self.args.memory_limit)
+            self.workers.append(self.local.worker)
+        return self.local.worker
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+def read_race(race_file_name):
+    '''Reads a race file, returning (race options, [(solver name, solver
+    options)]) as dicts of strings.  Raises ValueError if it is
+    malformed.'''
+    config = configparser.ConfigParser(interpolation=None)
+    config.optionxform = str  # Option names are mmb.py's, case and all
+    if not config.read(race_file_name):
+        raise ValueError(f"Unable to read race file {race_file_name}.")
+    if not config.has_section(RACE_SECTION):
+        raise ValueError(f"{race_file_name} has no [{RACE_SECTION}] section.")
+    race = dict(config[RACE_SECTION])
+    if "benchmark" not in race:
+        raise ValueError(f"[{RACE_SECTION}] of {race_file_name} doesn't name a benchmark .mmb file.")
+
+    solvers = []
+    for name in config.sections():
+        if name == RACE_SECTION:
+            continue
+        options = dict(config[name])
+        if "command" not in options:
+            raise ValueError(f"Solver [{name}] of {race_file_name} has no command.")
+        shared = RACE_OPTIONS & set(options)
+        if shared:
+            raise ValueError(f"Solver [{name}] sets race wide options: {', '.join(sorted(shared))}.")
+        solvers.append((name, options))
+    if not solvers:
+        raise ValueError(f"{race_file_name} has no solvers.")
+    return (race, solvers)
+
+def race_args(parser, benchmark, command, options):
+    '''Returns the mmb.py options for running command on benchmark, with
+    options, a dict from long option name to value, applied as if given
+    on the command line.'''
+    actions = {action.dest: action for action in parser._actions}
+    argv = [benchmark, command]
+    for (key, value) in options.items():
+        if key not in actions or key in ("mmb_file_name", "exec_cmd", "help"):
+            raise ValueError(f"Unknown option {key}.")
+        flag = "--" + key
+        if actions[key].nargs == 0:
+            if value.lower() not in configparser.ConfigParser.BOOLEAN_STATES:
+                raise ValueError(f"Option {key} takes yes or no, not {value}.")
+            if configparser.ConfigParser.BOOLEAN_STATES[value.lower()]:
+                argv.append(flag)
+        else:
+            argv += [flag, value]
+    return parser.parse_args(argv)
+
+def missing_source(command, in_process):
+    '''Returns the path of a Python file named in command that doesn't
+    exist, or None.'''
+    paths = [split_solver_spec(command)[0]] if in_process else shlex.split(command)
+    for path in paths:
+        if path.endswith(".py") and not os.path.isfile(path):
+            return path
+    return None
+
+# ================== Main ====================
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Race several maximum matching solvers over one benchmark.")
+    cli.add_argument("race_file", type=str, help="Path to the race definition file.")
+    cli.add_argument("-j", "--jobs", type=int, default=None, help="Override the race's number of concurrent jobs.")
+    cli.add_argument("--output", type=str, default=None, help="Override the race's results file.")
+    cli.add_argument("--resume", action="store_true", help="Skip (solver, instance) pairs already in the results.")
+    cli.add_argument("-v", "--verbose", action="store_true", help="Show debugging output and all stdout/stderr.")
+    cli_args = cli.parse_args()
+
+    try:
+        (race, solver_options) = read_race(cli_args.race_file)
+    except (ValueError, configparser.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        exit(2)
+
+    # Paths are relative to the race file, overrides to where we were started
+    output = os.path.abspath(cli_args.output) if cli_args.output else None
+    os.chdir(os.path.dirname(os.path.abspath(cli_args.race_file)))
+    race = dict(race)
+    benchmark = race.pop("benchmark")
+    output = output or race.pop("output", "race_results.csv")
+    race.pop("output", None)
+    if cli_args.jobs is not None:
+        race["jobs"] = str(cli_args.jobs)
+    if cli_args.resume:
+        race["resume"] = "yes"
+    if cli_args.verbose:
+        race["verbose"] = "yes"
+
+    parser = make_parser()
+    solvers = []
+    try:
+        # Race wide options, as parsed for a stand-in solver
+        args = race_args(parser, benchmark, "", race)
+        check_args(args)
+        for (name, options) in solver_options:
+            command = options.pop("command")
+            solver_args = race_args(parser, benchmark, command, {**race, **options, "solver_name": name})
+            check_args(solver_args)
+            if solver_args.profile and solver_args.profile_dir is None:
+                solver_args.profile_dir = os.path.join(os.path.dirname(benchmark), DEFAULT_PROFILE_DIR)
+            missing = missing_source(command, solver_args.in_process)
+            if missing is not None:
+                print(f"Warning: skipping {name}, {missing} doesn't exist.", file=sys.stderr)
+                continue
+            solvers.append(RaceSolver(name, solver_args))
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(3)
+    except Exception as e:
+        print(f"Error: Unable to load solver: {e}", file=sys.stderr)
+        exit(2)
+    if not solvers:
+        print("Error: none of the race's solvers exist.", file=sys.stderr)
+        exit(2)
+
+    # Read the .mmb file and extract test cases
+    try:
+        test_list = read_test_list(benchmark, args.query, args.catalog)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        exit(2)
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(3)
+
+    cache = open_cache(args, os.path.dirname(benchmark))
+    cpus = None
+    if args.pin_cpus:
+        try:
+            cpus = cpu_queue(args.jobs)
+        except ValueError as e:
+            print(f"Error: {e}")
+            exit(3)
+
+    run_info = {"course": os.path.splitext(os.path.basename(benchmark))[0],
+                "mmb_file": benchmark, "command_line": shlex.join(sys.argv)}
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    results = open_results(output, CSV_HEADER, run_info)
+    done = frozenset()
+    if args.resume:
+        if not results.resumable:
+            print(f"Warning: {output} predates --resume, nothing will be skipped.", file=sys.stderr)
+        done = frozenset(results.measured_pairs())
+
+    def run_job(solver, i, test_path, instance):
+        return run_test(i, test_path, solver.args, cache, cpus, solver.solver_class, solver.thread_worker(),
+                        solver.key, done, instance, solver.scheduler)
+
+    # Sizes order each family smallest first, if any solver skips predicted
+    # timeouts, and tell which instances have a d a solver doesn't solve
+    supports = {solver.name: supported_d(solver.args, solver.solver_class) for solver in solvers}
+    scheduled = [solver for solver in solvers if solver.args.skip_after is not None
+                 or solver.args.time_budget is not None or supports[solver.name] is not None]
+    if scheduled:
+        sizes = instance_sizes(test_list, log=lambda line: print(line, file=sys.stderr))
+        if any(s.args.skip_after is not None for s in solvers):
+            test_list = order_tests(test_list, sizes)
+        for solver in scheduled:
+            solver.scheduler = AdaptiveScheduler(sizes, solver.args.skip_after, solver.args.time_budget,
+                                                 supports[solver.name])
+
+    # Per solver: [tests solved, timed out, out of memory, failed, skipped, summed time]
+    totals = {solver.name: [0, 0, 0, 0, 0, 0.0] for solver in solvers}
+
+    def report(jobs):
+        '''Waits for the jobs of one instance, logging and writing their
+        results in race order.'''
+        for (solver, future) in jobs:
+            (row, log, elapsed_time) = future.result()
+            for line in log:
+                print(f"[{solver.name}] {line}")
+            if row is None:
+                continue
+            results.write({**row, 'Command': solver.args.exec_cmd})
+            outcome = 4 if is_skipped(row['Success']) else \
+                {True: 0, "Timed Out": 1, "Out of Memory": 2}.get(row['Success'], 3)
+            totals[solver.name][outcome] += 1
+            totals[solver.name][5] += elapsed_time
+
+    # Instances are parsed once, here, while earlier ones are being solved;
+    # at most jobs + 1 parsed instances are kept waiting for results.
+    race_start = time.perf_counter()
+    with results, ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        pending = deque()
+        for (i, test_path) in test_list:
+            try:
+                instance = load_instance(test_path, cache, args.fast_parse)
+            except Exception as e:
+                print(f"Error parsing {test_path}: {e}")
+                continue
+            pending.append([(solver, pool.submit(run_job, solver, i, test_path, instance))
+                            for solver in solvers])
+            while len(pending) > args.jobs:
+                report(pending.popleft())
+        while pending:
+            report(pending.popleft())
+    race_time = time.perf_counter() - race_start
+
+    for solver in solvers:
+        solver.close()
+        if solver.args.profile:
+            report_profiles(solver.args, solver.name, test_list)
+
+    print(f"\n{'Solver':<30} {'Solved':>8} {'Timed Out':>10} {'Out of Mem':>10} {'Failed':>8} {'Skipped':>8} "
+          f"{'Time (s)':>10}")
+    for solver in solvers:
+        (solved, timed_out, out_of_memory, failed, skipped, total_time) = totals[solver.name]
+        print(f"{solver.name:<30} {solved:>8} {timed_out:>10} {out_of_memory:>10} {failed:>8} {skipped:>8} "
+              f"{total_time:>10.3f}")
+    print(f"Race wall time: {race_time:.3f} seconds, results in {output}")
+    if cache is not None:
+        print(cache.report())
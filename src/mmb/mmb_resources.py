@@ -0,0 +1,252 @@
+'''mmb_resources.py
+
+Resource accounting for benchmark tests: user and system CPU time and
+peak resident memory of the solver process.  One shot commands are
+measured through wait4() when they are reaped, persistent workers
+through /proc on Linux.  Every helper returns a dict with the keys
+"user", "system" (seconds) and "peak_rss" (MB), or an empty dict where
+the platform can't tell.
+
+Memory limits are applied to solver processes as RLIMIT_AS, set in the
+child before the solver is exec'd, and
+solvers that run out of memory are recognized by how they fail, see
+is_out_of_memory().
+
+Solver processes lead process groups of their own, so that killing one
+with kill_group() also kills the worker processes it started.
+'''
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MEMORY_LIMITS_SUPPORTED = resource is not None and hasattr(resource, "prlimit")
+
+# Signs of an allocation failure in a solver's stderr: Python, C++,
+# Java and C respectively.
+OOM_MARKERS = ("MemoryError", "std::bad_alloc", "java.lang.OutOfMemoryError", "Cannot allocate memory")
+# Fraction of the memory limit a solver killed by SIGKILL must have
+# reached to count as out of memory
+OOM_LIMIT_FRACTION = 0.9
+
+class OutOfMemory(Exception):
+    '''Raised when a solver fails for lack of memory, carrying its usage
+    dict and the elapsed time up to that point.'''
+
+    def __init__(self, message, usage=None, elapsed=None):
+        super().__init__(message)
+        self.usage = usage or {}
+        self.elapsed = elapsed
+
+def limit_memory(pid, limit_mb):
+    '''Limits the address space of the process pid, 0 being the calling
+    process, to limit_mb MB.  Raises OSError where that isn't
+    supported.  A process limited this way after it started may already
+    have allocated more, so solver commands get memory_limiter() instead
+    where they can.'''
+    if not MEMORY_LIMITS_SUPPORTED:
+        raise OSError("memory limits are not supported on this platform")
+    limit = int(limit_mb) << 20
+    if pid == 0:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    else:
+        resource.prlimit(pid, resource.RLIMIT_AS, (limit, limit))
+
+def memory_limiter(limit_mb):
+    '''Returns a preexec_fn for Popen limiting the address space of the
+    child to limit_mb MB before it execs the solver, so the limit holds
+    from the solver's first allocation, or None if there is no limit or
+    the platform doesn't support one, see limit_memory().'''
+    if limit_mb is None or not MEMORY_LIMITS_SUPPORTED:
+        return None
+    return lambda: limit_memory(0, limit_mb)
+
+def is_out_of_memory(returncode, stderr, usage=None, memory_limit=None):
+    '''Returns whether a solver that exited with returncode and wrote
+    stderr failed for lack of memory: it reported an allocation failure,
+    or, run with a memory_limit in MB, it was killed by SIGKILL with the
+    peak RSS of its usage dict near that limit, as by the kernel's OOM
+    killer.  Other SIGKILLs, e.g. by the user, are plain failures.'''
+    if returncode == 0:
+        return False
+    if any(marker in stderr for marker in OOM_MARKERS):
+        return True
+    if returncode != -signal.SIGKILL or memory_limit is None:
+        return False
+    peak_rss = (usage or {}).get("peak_rss")
+    return peak_rss is not None and peak_rss >= OOM_LIMIT_FRACTION * memory_limit
+
+def kill_group(p):
+    '''Kills p, a subprocess.Popen or multiprocessing.Process leading its
+    own process group, along with the processes it started that are still
+    in the group.  Once p is reaped its id may be reused, so then only p
+    itself is killed, if at all.'''
+    running = p.poll() is None if hasattr(p, "poll") else p.exitcode is None
+    if running and hasattr(os, "killpg"):
+        try:
+            os.killpg(p.pid, signal.SIGKILL)
+        except OSError:
+            pass  # Not leading a group yet
+    p.kill()
+
+def rusage_usage(rusage):
+    '''Converts a resource.struct_rusage into a usage dict.'''
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS.
+    scale = 1 << 20 if sys.platform == "darwin" else 1 << 10
+    return {"user": rusage.ru_utime,
+            "system": rusage.ru_stime,
+            "peak_rss": rusage.ru_maxrss / scale}
+
+def self_usage():
+    '''Returns the usage of the calling process, e.g. a forked worker.'''
+    if resource is None:
+        return {}
+    return rusage_usage(resource.getrusage(resource.RUSAGE_SELF))
+
+def read_peak_rss(pid):
+    '''Returns the peak RSS (VmHWM) of the running process pid in MB from
+    /proc, or None if it isn't available.'''
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def exit_code(status):
+    '''Returns the returncode Popen reports for the wait status status:
+    the exit code, or minus the signal that killed the process.'''
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    if os.WIFEXITED(status):
+        return os.WEXITSTATUS(status)
+    return status
+
+class UsagePopen(subprocess.Popen):
+    '''Popen that keeps the resource usage of the child when reaping it,
+    available as a usage dict in the attribute usage afterwards.
+
+    Linux carries the peak RSS of the forking process over into the
+    child's ru_maxrss, so a child whose ru_maxrss doesn't exceed the
+    benchmarker's own peak is reported with the peak sampled from /proc
+    while it ran instead, which can miss growth in its last moments.'''
+
+    usage = {}
+    SAMPLE_INTERVAL = 0.01
+
+    def __init__(self, *args, **kwargs):
+        own = self_usage()
+        self.rss_floor = own.get("peak_rss", 0)
+        self.sampled_rss = None
+        self.reap_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+        if os.path.exists(f"/proc/{self.pid}/status"):
+            threading.Thread(target=self._sample_peak_rss, daemon=True).start()
+
+    def _sample_peak_rss(self):
+        while self.returncode is None:
+            peak_rss = read_peak_rss(self.pid)
+            if peak_rss is None:
+                return
+            self.sampled_rss = peak_rss
+            time.sleep(self.SAMPLE_INTERVAL)
+
+    def _record_usage(self, rusage):
+        self.usage = rusage_usage(rusage)
+        if self.usage["peak_rss"] <= self.rss_floor and self.sampled_rss is not None:
+            self.usage["peak_rss"] = self.sampled_rss
+
+    if hasattr(os, "wait4"):
+        # poll() and wait() reap the child through wait4() themselves, so
+        # its usage comes along; Popen then sees the returncode set.
+        # communicate(), kill() and the context manager go through them.
+        def _reap(self, wait_flags, blocking=True):
+            '''Reaps the child if it exited, or waits for it without
+            os.WNOHANG, returning whether there is nothing left to wait
+            for.  Without blocking it gives up if another thread is
+            reaping it.'''
+            if not self.reap_lock.acquire(blocking):
+                return False
+            try:
+                if self.returncode is not None:
+                    return True
+                try:
+                    (pid, sts, rusage) = os.wait4(self.pid, wait_flags)
+                except ChildProcessError:
+                    # Reaped elsewhere, Popen's wait() settles the returncode
+                    return True
+                if pid != self.pid:
+                    return False
+                self._record_usage(rusage)
+                self.returncode = exit_code(sts)
+                return True
+            finally:
+                self.reap_lock.release()
+
+        def poll(self):
+            self._reap(os.WNOHANG, blocking=False)
+            return super().poll()
+
+        def wait(self, timeout=None):
+            if timeout is None:
+                self._reap(0)
+                return super().wait()
+            endtime = time.monotonic() + timeout
+            delay = 0.0005
+            while not self._reap(os.WNOHANG):
+                remaining = endtime - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(self.args, timeout)
+                delay = min(delay * 2, remaining, 0.05)
+                time.sleep(delay)
+            return super().wait()
+
+class ProcUsage:
+    '''Measures the usage of a long running process between calls to
+    start() and stop() from /proc, resetting its peak memory at start().
+    Does nothing where /proc isn't available.'''
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self.start_times = None
+
+    def _cpu_times(self):
+        with open(f"/proc/{self.pid}/stat") as f:
+            # Fields after the parenthesised command name, utime and stime
+            # are the 14th and 15th fields of the whole line.
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) / self.ticks, int(fields[12]) / self.ticks)
+
+    def start(self):
+        try:
+            # Writing 5 to clear_refs resets the peak RSS (VmHWM).
+            with open(f"/proc/{self.pid}/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            pass
+        try:
+            self.start_times = self._cpu_times()
+        except OSError:
+            self.start_times = None
+
+    def stop(self):
+        if self.start_times is None:
+            return {}
+        try:
+            (user, system) = self._cpu_times()
+        except OSError:
+            return {}
+        return {"user": user - self.start_times[0],
+                "system": system - self.start_times[1],
+                "peak_rss": read_peak_rss(self.pid)}
@@ -0,0 +1,233 @@
+'''mmb_results.py
+
+Results backends for the benchmarker.  mmb.py hands every test's row,
+a dict keyed by CSV column name, to a results writer which buffers rows
+and writes them out in batches:
+
+- CSVResults appends to a .csv file, as mmb.py always has.
+- SQLiteResults stores runs, solvers, instances and measurements in
+  indexed tables of an SQLite database, picked for .db, .sqlite and
+  .sqlite3 output files.  The view "results" joins them back into the
+  CSV columns, so subsets (course, d, solver) can be queried without
+  loading everything, see query_results().
+'''
+
+import csv
+import os
+import sqlite3
+import time
+
+from mmb_resume import measured_pairs, SOLVER_ID_CN, INSTANCE_HASH_CN
+from mmb_schedule import SKIPPED
+
+SQLITE_EXTS = (".db", ".sqlite", ".sqlite3")
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_FLUSH_INTERVAL = 5  # seconds
+
+# (SQL column, CSV column, SQL type) of the values stored per table
+INSTANCE_COLUMNS = [
+    ('path', 'Test Path', 'TEXT'), ('d', 'd', 'INTEGER'), ('n', 'n', 'INTEGER'),
+    ('m', 'm', 'INTEGER'), ('max_matching', 'Max Matching', 'INTEGER')
+]
+MEASUREMENT_COLUMNS = [
+    ('test_number', 'Test Number', 'INTEGER'), ('test_path', 'Test Path', 'TEXT'),
+    ('elapsed', 'Elapsed Time (s)', 'REAL'), ('success', 'Success', 'TEXT'),
+    ('user_time', 'User Time (s)', 'REAL'), ('system_time', 'System Time (s)', 'REAL'),
+    ('peak_rss', 'Peak RSS (MB)', 'REAL'), ('parse_time', 'Parse Time (s)', 'REAL'),
+    ('solve_time', 'Solve Time (s)', 'REAL'), ('emit_time', 'Emit Time (s)', 'REAL'),
+    ('min_time', 'Min Time (s)', 'REAL'), ('median_time', 'Median Time (s)', 'REAL'),
+    ('iqr_time', 'IQR Time (s)', 'REAL'), ('stddev_time', 'Stddev Time (s)', 'REAL'),
+    ('repeats', 'Repeats', 'INTEGER'), ('samples', 'Samples (s)', 'TEXT'),
+    ('matching_size', 'Matching Size', 'INTEGER'), ('quality', 'Quality', 'REAL')
+]
+
+def open_results(path, header, run_info=None, batch_size=DEFAULT_BATCH_SIZE):
+    '''Returns the results writer for the output file at path: SQLite for
+    the extensions in SQLITE_EXTS, CSV with the columns header otherwise.
+    run_info describes the run for backends that record it.'''
+    if path.endswith(SQLITE_EXTS):
+        return SQLiteResults(path, run_info, batch_size)
+    return CSVResults(path, header, batch_size)
+
+class Results:
+    '''Buffers rows and writes them out every batch_size rows, or when a
+    row arrives more than DEFAULT_FLUSH_INTERVAL seconds after the last
+    write, and on close().  Subclasses implement _write_rows().'''
+
+    # Whether measured_pairs() can tell which tests were already run
+    resumable = True
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.rows = []
+        self.last_flush = time.monotonic()
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size or time.monotonic() - self.last_flush > DEFAULT_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self._write_rows(self.rows)
+            self.rows = []
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class CSVResults(Results):
+    '''Appends rows to a CSV file, creating it with the columns header if
+    it doesn't exist.  Files written before columns were added keep
+    their own header.'''
+
+    def __init__(self, path, header, batch_size=DEFAULT_BATCH_SIZE):
+        super().__init__(batch_size)
+        self.path = path
+        if not os.path.exists(path):
+            with open(path, mode='w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(header)
+        with open(path, newline='') as file:
+            self.header = next(csv.reader(file), None) or header
+        self.resumable = SOLVER_ID_CN in self.header and INSTANCE_HASH_CN in self.header
+
+    def measured_pairs(self):
+        return measured_pairs(self.path)
+
+    def _write_rows(self, rows):
+        with open(self.path, mode='a', newline='') as file:
+            writer = csv.DictWriter(file, self.header, extrasaction='ignore')
+            writer.writerows(rows)
+
+def _sql_value(value, sql_type):
+    '''Converts a CSV cell to the value stored in a column of sql_type.'''
+    if value is None or value == "":
+        return None
+    if sql_type == 'INTEGER':
+        return int(value)
+    if sql_type == 'REAL':
+        return float(value)
+    return str(value)
+
+class SQLiteResults(Results):
+    '''Stores rows in an SQLite database, one transaction per batch.
+    Each writer records a run, the rows it writes become measurements
+    of that run, and solvers and instances are stored once, keyed by
+    their ids from mmb_resume.py.  A solver's command is taken from the
+    row's 'Command' key if it has one, from run_info otherwise.'''
+
+    SCHEMA = f"""
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id INTEGER PRIMARY KEY, started TEXT, course TEXT, mmb_file TEXT, command_line TEXT);
+        CREATE TABLE IF NOT EXISTS solvers (
+            solver_id TEXT PRIMARY KEY, name TEXT, command TEXT);
+        CREATE TABLE IF NOT EXISTS instances (
+            instance_hash TEXT PRIMARY KEY,
+            {", ".join(f"{col} {sql_type}" for (col, _, sql_type) in INSTANCE_COLUMNS)});
+        CREATE TABLE IF NOT EXISTS measurements (
+            measurement_id INTEGER PRIMARY KEY,
+            run_id INTEGER REFERENCES runs,
+            solver_id TEXT REFERENCES solvers,
+            instance_hash TEXT REFERENCES instances,
+            {", ".join(f"{col} {sql_type}" for (col, _, sql_type) in MEASUREMENT_COLUMNS)});
+        CREATE INDEX IF NOT EXISTS measurements_pair ON measurements (solver_id, instance_hash);
+        CREATE INDEX IF NOT EXISTS measurements_run ON measurements (run_id);
+        CREATE INDEX IF NOT EXISTS instances_d ON instances (d);
+        CREATE INDEX IF NOT EXISTS solvers_name ON solvers (name);
+        CREATE INDEX IF NOT EXISTS runs_course ON runs (course);
+        CREATE VIEW IF NOT EXISTS results AS
+            SELECT {", ".join(f'ms.{col} AS "{name}"' for (col, name, _) in MEASUREMENT_COLUMNS[:2])},
+                   {", ".join(f'i.{col} AS "{name}"' for (col, name, _) in INSTANCE_COLUMNS[1:])},
+                   ms.elapsed AS "Elapsed Time (s)", s.name AS "Solver",
+                   {", ".join(f'ms.{col} AS "{name}"' for (col, name, _) in MEASUREMENT_COLUMNS[3:])},
+                   ms.solver_id AS "{SOLVER_ID_CN}", ms.instance_hash AS "{INSTANCE_HASH_CN}",
+                   r.course AS "Course", ms.run_id AS "Run"
+            FROM measurements ms
+            JOIN solvers s USING (solver_id)
+            JOIN instances i USING (instance_hash)
+            JOIN runs r USING (run_id);
+    """
+
+    def __init__(self, path, run_info=None, batch_size=DEFAULT_BATCH_SIZE):
+        super().__init__(batch_size)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(self.SCHEMA)
+        self._add_missing_columns()
+        run_info = run_info or {}
+        with self.conn:
+            self.run_id = self.conn.execute(
+                "INSERT INTO runs (started, course, mmb_file, command_line) VALUES (?, ?, ?, ?)",
+                (time.strftime("%Y-%m-%d %H:%M:%S"), run_info.get("course"),
+                 run_info.get("mmb_file"), run_info.get("command_line"))).lastrowid
+        self.command = run_info.get("command")
+
+    def _add_missing_columns(self):
+        '''Adds the measurement columns databases written by older versions
+        lack, and rebuilds the results view over them.'''
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(measurements)")}
+        missing = [(col, sql_type) for (col, _, sql_type) in MEASUREMENT_COLUMNS if col not in columns]
+        if not missing:
+            return
+        with self.conn:
+            for (col, sql_type) in missing:
+                self.conn.execute(f"ALTER TABLE measurements ADD COLUMN {col} {sql_type}")
+            self.conn.execute("DROP VIEW IF EXISTS results")
+        self.conn.executescript(self.SCHEMA)
+
+    def measured_pairs(self):
+        return set(self.conn.execute("SELECT DISTINCT solver_id, instance_hash FROM measurements "
+                                     "WHERE success IS NULL OR success NOT LIKE ?", (SKIPPED + "%",)))
+
+    def _write_rows(self, rows):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO solvers (solver_id, name, command) VALUES (?, ?, ?)",
+                [(row[SOLVER_ID_CN], row['Solver'], row.get('Command', self.command)) for row in rows])
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO instances (instance_hash, {', '.join(c for (c, _, _) in INSTANCE_COLUMNS)}) "
+                f"VALUES (?{', ?' * len(INSTANCE_COLUMNS)})",
+                [[row[INSTANCE_HASH_CN]] + [_sql_value(row.get(name), t) for (_, name, t) in INSTANCE_COLUMNS]
+                 for row in rows])
+            self.conn.executemany(
+                f"INSERT INTO measurements (run_id, solver_id, instance_hash, "
+                f"{', '.join(c for (c, _, _) in MEASUREMENT_COLUMNS)}) "
+                f"VALUES (?, ?, ?{', ?' * len(MEASUREMENT_COLUMNS)})",
+                [[self.run_id, row[SOLVER_ID_CN], row[INSTANCE_HASH_CN]]
+                 + [_sql_value(row.get(name), t) for (_, name, t) in MEASUREMENT_COLUMNS]
+                 for row in rows])
+
+    def close(self):
+        super().close()
+        self.conn.close()
+
+def query_results(path, course=None, d=None, solvers=None):
+    '''Returns (columns, rows) of the results stored in the SQLite
+    database at path, optionally only those of the given course (.mmb
+    file name without extension), number of partitions d and list of
+    solver names.  Columns are named as in the CSV results.'''
+    (clauses, params) = ([], [])
+    if course is not None:
+        clauses.append('"Course" = ?')
+        params.append(course)
+    if d is not None:
+        clauses.append('"d" = ?')
+        params.append(d)
+    if solvers:
+        clauses.append(f'"Solver" IN ({", ".join("?" * len(solvers))})')
+        params += solvers
+    sql = "SELECT * FROM results" + (" WHERE " + " AND ".join(clauses) if clauses else "")
+
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(sql, params)
+        return ([c[0] for c in cursor.description], cursor.fetchall())
+    finally:
+        conn.close()
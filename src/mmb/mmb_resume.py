@@ -0,0 +1,127 @@
+'''mmb_resume.py
+
+Identifies what a benchmark result was measured on, so that an
+interrupted or repeated run can skip the (solver, instance) pairs a
+results file already holds.
+
+- A solver is identified by its command together with a hash of its
+  source: every file named in the command and, for Python files, the
+  other .py files next to them, which they import their helpers from,
+  and every module of the tree they import, found statically, such as
+  the Solver base class in src/solvers/solver.py.  Editing a solver or
+  anything it builds on therefore makes all of its tests run again.
+- An instance is identified by a hash of its file's contents, so moved
+  or renamed instances are still recognized.
+'''
+
+import ast
+import csv
+import glob
+import hashlib
+import os
+import shlex
+
+from mmb_inprocess import split_solver_spec
+from mmb_schedule import is_skipped
+
+SOLVER_ID_CN = 'Solver ID'
+INSTANCE_HASH_CN = 'Instance Hash'
+
+def file_hash(path):
+    '''Returns the hex hash of the contents of the file at path.'''
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+def solver_sources(exec_cmd, in_process=False):
+    '''Returns the sorted paths of the source files of the solver run by
+    exec_cmd, or given by a path/to/solver.py[:ClassName] spec if
+    in_process is set.'''
+    if in_process:
+        paths = [split_solver_spec(exec_cmd)[0]]
+    else:
+        paths = [tok for tok in shlex.split(exec_cmd) if os.path.isfile(tok)]
+
+    sources = set()
+    for path in paths:
+        sources.add(os.path.abspath(path))
+        if path.endswith(".py"):
+            sources.update(os.path.abspath(p) for p in glob.glob(os.path.join(os.path.dirname(path), "*.py")))
+
+    # Along with the modules they import, and those import, and so on
+    pending = [path for path in sources if path.endswith(".py")]
+    while pending:
+        for module in imported_sources(pending.pop()):
+            if module not in sources:
+                sources.add(module)
+                pending.append(module)
+    return sorted(sources)
+
+def dotted_name(node):
+    '''Returns the name an expression such as os.path.join stands for, or
+    None if it isn't a plain name.'''
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = dotted_name(node.value)
+        return base + "." + node.attr if base is not None else None
+    return None
+
+def imported_sources(path):
+    '''Returns the absolute paths of the modules the Python file at path
+    imports that are .py files next to it or in the directories it adds
+    to sys.path relative to itself, as in
+
+        sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+
+    The file is parsed, not run, and imports of other modules, e.g.
+    installed packages, are left out, as is anything it can't parse.'''
+    try:
+        with open(path, "rb") as f:
+            tree = ast.parse(f.read(), path)
+    except (OSError, SyntaxError, ValueError):
+        return []
+
+    here = os.path.dirname(os.path.abspath(path))
+    dirs = [here]
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split(".")[0])
+        elif isinstance(node, ast.Call) and dotted_name(node.func) in ("sys.path.append", "sys.path.insert"):
+            rel = node.args[-1] if node.args else None
+            if (isinstance(rel, ast.Call) and dotted_name(rel.func) == "os.path.join" and len(rel.args) == 2
+                    and isinstance(rel.args[0], ast.Call) and dotted_name(rel.args[0].func) == "os.path.dirname"
+                    and [dotted_name(arg) for arg in rel.args[0].args] == ["__file__"]
+                    and isinstance(rel.args[1], ast.Constant) and isinstance(rel.args[1].value, str)):
+                dirs.append(os.path.normpath(os.path.join(here, rel.args[1].value)))
+
+    modules = []
+    for name in names:
+        for d in dirs:
+            module = os.path.join(d, name + ".py")
+            if os.path.isfile(module):
+                modules.append(module)
+                break
+    return modules
+
+def solver_id(exec_cmd, in_process=False):
+    '''Returns the identity of a solver as the hex hash of its command
+    and source files.'''
+    h = hashlib.blake2b(exec_cmd.encode(), digest_size=16)
+    for path in solver_sources(exec_cmd, in_process):
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def measured_pairs(csv_file_path):
+    '''Returns the set of (solver id, instance hash) pairs with a result in
+    the CSV file at csv_file_path.  Rows written before these columns
+    existed can't be matched and are ignored, as are tests that were
+    skipped rather than run.'''
+    if not os.path.exists(csv_file_path):
+        return set()
+    with open(csv_file_path, newline='') as file:
+        return {(row[SOLVER_ID_CN], row[INSTANCE_HASH_CN]) for row in csv.DictReader(file)
+                if row.get(SOLVER_ID_CN) and row.get(INSTANCE_HASH_CN) and not is_skipped(row.get('Success'))}
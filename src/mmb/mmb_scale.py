@@ -0,0 +1,207 @@
+#!/bin/python3
+'''mmb_scale.py
+
+Measures how solvers scale.  A series of instances is generated with
+dgt2testgenerator.make_graph(), n or m growing geometrically at fixed
+d and density m / n^d, and each solver is run up the series until it
+times out (on any instance of a size) or spends its time budget.  A
+power law t = c * size^k is then fitted to each solver's median times
+by least squares on a log-log scale, and the estimated exponent k is
+reported with the largest size the solver solved within the timeout.
+
+Each size gets --instances instances with a maximum matching of
+--matching * n edges, written to --tests_dir as
+d<d>n<n>m<m>M<M>test<k>.mmi and reused by later runs.  Results go to
+--output like mmb.py's.  Times are the solvers' own solve times where
+they report them (see src/solvers/solver.py), so interpreter start up
+doesn't flatten the curve, and the elapsed times otherwise.
+
+    ./mmb_scale.py "python3 ../solvers/astar/astarSolver.py" "python3 ../solvers/imprecise/primeSolver.py" -d 3 -t 5
+'''
+
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from dgt2testgenerator import make_graph
+from mmb import make_parser, check_args, open_cache, get_solver_name, run_test, CSV_HEADER
+from mmb_race import RaceSolver
+from mmb_results import open_results
+
+DEFAULT_TESTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks", "scale")
+
+def series_sizes(d, vary, start, factor, steps, density, matching):
+    '''Returns the (n, m, M) of each step of the series: the varied n or
+    m starts at start and grows by factor, the other follows from the
+    density, and M = matching * n.  Steps that would repeat a size are
+    left out.'''
+    sizes = []
+    for k in range(steps):
+        value = round(start * factor ** k)
+        if vary == "n":
+            n = value
+            m = max(1, round(density * n ** d))
+        else:
+            m = value
+            n = max(1, math.ceil((m / density) ** (1 / d)))
+        M = max(1, min(round(matching * n), m))
+        m = min(m, M * n ** (d - 1))  # make_graph can't place more edges
+        if not sizes or (n, m) != sizes[-1][:2]:
+            sizes.append((n, m, M))
+    return sizes
+
+def series_tests(tests_dir, d, sizes, instances, seed):
+    '''Generates any missing instances of the series into tests_dir and
+    returns a list, per size, of their paths.'''
+    os.makedirs(tests_dir, exist_ok=True)
+    tests = []
+    for (n, m, M) in sizes:
+        paths = []
+        for k in range(instances):
+            path = os.path.join(tests_dir, f"d{d}n{n}m{m}M{M}test{k}.mmi")
+            if not os.path.exists(path):
+                random.seed(f"{seed}:{d}:{n}:{m}:{M}:{k}")
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                make_graph(d, n, m, M, tmp_path)
+                os.replace(tmp_path, path)
+            paths.append(path)
+        tests.append(paths)
+    return tests
+
+def test_time(row):
+    '''Returns the time of a successful test's row: the solver's own solve
+    time if it reported one, its elapsed time otherwise.'''
+    return float(row['Solve Time (s)'] or row['Elapsed Time (s)'])
+
+def fit_power_law(sizes, times):
+    '''Fits times = c * sizes^k by least squares on log-log scale,
+    returning (k, c, r squared), or None with fewer than two distinct
+    sizes.  Times of zero are left out.'''
+    points = [(s, t) for (s, t) in zip(sizes, times) if s > 0 and t > 0]
+    if len({s for (s, _) in points}) < 2:
+        return None
+    x = np.log([s for (s, _) in points])
+    y = np.log([t for (_, t) in points])
+    (k, log_c) = np.polyfit(x, y, 1)
+    residual = np.sum((y - (k * x + log_c)) ** 2)
+    total = np.sum((y - y.mean()) ** 2)
+    return (float(k), float(math.exp(log_c)), float(1 - residual / total) if total > 0 else 1.0)
+
+# ================== Main ====================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fits how maximum matching solvers scale on generated instances.")
+    parser.add_argument("solvers", type=str, nargs="+", help="Executable commands of the solvers to measure.")
+    parser.add_argument("-d", type=int, default=3, help="number of partitions of the instances, default 3")
+    parser.add_argument("--vary", choices=["n", "m"], default="n", help="size that grows geometrically, default n")
+    parser.add_argument("--start", type=int, default=4, help="first value of the varied size, default 4")
+    parser.add_argument("--factor", type=float, default=2, help="growth factor between steps, default 2")
+    parser.add_argument("--steps", type=int, default=8, help="number of sizes in the series, default 8")
+    parser.add_argument("--density", type=float, default=0.01, help="m / n^d of the instances, default 0.01")
+    parser.add_argument("--matching", type=float, default=0.5,
+                        help="maximum matching size as a fraction of n, default 0.5")
+    parser.add_argument("--instances", type=int, default=3, help="instances per size, default 3")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the instance generator")
+    parser.add_argument("--tests_dir", type=str, default=DEFAULT_TESTS_DIR,
+                        help="directory for the generated instances, default benchmarks/scale")
+    parser.add_argument("-t", "--timeout", type=int, default=10, help="Time limit on each test in seconds.")
+    parser.add_argument("-tb", "--time_budget", type=float, default=None,
+                        help="stop a solver once its runs add up to this many seconds")
+    parser.add_argument("--output", type=str, default="scale_results.csv",
+                        help="Path to the results file, CSV or SQLite.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of instances of a size run at once.")
+    parser.add_argument("-ip", "--in_process", action="store_true",
+                        help="run the solvers, given as path/to/solver.py[:ClassName], in-process")
+    parser.add_argument("-ps", "--persistent", action="store_true",
+                        help="keep each solver running between tests, see mmb.py --persistent")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show debugging output and all stdout/stderr.")
+    args = parser.parse_args()
+
+    if args.d < 1 or args.start < 1 or args.factor <= 1 or args.steps < 1 or args.instances < 1:
+        print("Error: d, start, steps and instances must be positive and factor greater than 1.")
+        exit(3)
+    if not 0 < args.matching <= 1 or not 0 < args.density <= args.matching:
+        print("Error: matching must be in (0, 1] and density in (0, matching], "
+              "as every edge goes through a matched vertex.")
+        exit(3)
+
+    # Each solver runs with mmb.py's options, as the benchmarker would run it
+    mmb_parser = make_parser()
+    solvers = []
+    try:
+        for command in args.solvers:
+            argv = [args.tests_dir, command, "--timeout", str(args.timeout), "--jobs", str(args.jobs)]
+            argv += [flag for (flag, on) in (("--in_process", args.in_process), ("--persistent", args.persistent),
+                                             ("--verbose", args.verbose)) if on]
+            solver_args = mmb_parser.parse_args(argv)
+            check_args(solver_args)
+            solvers.append(RaceSolver(get_solver_name(solver_args), solver_args))
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(3)
+    except Exception as e:
+        print(f"Error: Unable to load solver: {e}", file=sys.stderr)
+        exit(2)
+
+    sizes = series_sizes(args.d, args.vary, args.start, args.factor, args.steps, args.density, args.matching)
+    print(f"Generating {len(sizes)} sizes x {args.instances} instances in {args.tests_dir}")
+    series = series_tests(args.tests_dir, args.d, sizes, args.instances, args.seed)
+    cache = open_cache(solvers[0].args, args.tests_dir)
+
+    run_info = {"course": f"scale_d{args.d}_{args.vary}", "mmb_file": args.tests_dir,
+                "command_line": " ".join(sys.argv)}
+    results = open_results(args.output, CSV_HEADER, run_info)
+
+    # Per solver: [(varied size, median time)], the largest size solved and the time spent
+    measured = {solver.name: [] for solver in solvers}
+    largest = {solver.name: None for solver in solvers}
+    spent = {solver.name: 0.0 for solver in solvers}
+    scale_start = time.perf_counter()
+    with results, ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        for solver in solvers:
+            i = 0
+            for ((n, m, M), paths) in zip(sizes, series):
+                if args.time_budget is not None and spent[solver.name] >= args.time_budget:
+                    print(f"[{solver.name}] Time budget of {args.time_budget} seconds spent.")
+                    break
+                tests = list(enumerate(paths, i + 1))
+                i += len(tests)
+                runs = pool.map(lambda test: run_test(*test, solver.args, cache, None, solver.solver_class,
+                                                      solver.thread_worker(), solver.key), tests)
+                times = []
+                for (row, log, elapsed_time) in runs:
+                    for line in log:
+                        print(f"[{solver.name}] {line}")
+                    spent[solver.name] += elapsed_time
+                    if row is not None:
+                        results.write({**row, 'Command': solver.args.exec_cmd})
+                        if row['Success'] is True:
+                            times.append(test_time(row))
+                if len(times) < len(paths):
+                    print(f"[{solver.name}] Stopping at n = {n}, m = {m}: "
+                          f"{len(paths) - len(times)} of {len(paths)} instances not solved.")
+                    break
+                measured[solver.name].append((n if args.vary == "n" else m, statistics.median(times)))
+                largest[solver.name] = (n, m)
+            solver.close()
+    scale_time = time.perf_counter() - scale_start
+
+    print(f"\n{'Solver':<30} {'Exponent':>9} {'R^2':>6} {'Sizes':>6} {'Largest solved':>20} "
+          f"{f'Predicted {args.vary} at {args.timeout}s':>20}")
+    for solver in solvers:
+        points = measured[solver.name]
+        fit = fit_power_law([s for (s, _) in points], [t for (_, t) in points])
+        solved = "n={}, m={}".format(*largest[solver.name]) if largest[solver.name] else "none"
+        if fit is None:
+            print(f"{solver.name:<30} {'-':>9} {'-':>6} {len(points):>6} {solved:>20} {'-':>20}")
+            continue
+        (k, c, r2) = fit
+        predicted = f"{(args.timeout / c) ** (1 / k):.0f}" if k > 0 else "-"
+        print(f"{solver.name:<30} {k:>9.2f} {r2:>6.3f} {len(points):>6} {solved:>20} {predicted:>20}")
+    print(f"Scaling wall time: {scale_time:.3f} seconds, results in {args.output}")
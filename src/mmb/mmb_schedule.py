@@ -0,0 +1,125 @@
+'''mmb_schedule.py
+
+Adaptive scheduling of a sweep, so exponential solvers don't spend the
+full timeout on every instance they have no chance of solving.
+
+Tests are grouped into families, the instances with the same d in the
+same directory (e.g. the d3 instances of Race/course 3), and run in
+order of m, then n, within each family, as running times grow with m.
+Once a solver has timed out on skip_after consecutive instances of a
+family, the instances of that family at least as large in both n and
+m as the last one are not run but recorded as SKIPPED_PREDICTED.  With a
+time_budget, once the solver's timed runs add up to that many seconds
+every remaining test is recorded as SKIPPED_BUDGET.  Given the d a
+solver supports, as its Solver subclass declares them, tests of any
+other d are recorded as SKIPPED_UNSUPPORTED.
+
+Sizes are read from the instances' headers, without parsing them.  When
+tests run concurrently, "consecutive" is in order of completion.
+'''
+
+import os
+import threading
+
+from mmb_arrays import read_header
+
+SKIPPED = "Skipped"
+SKIPPED_PREDICTED = "Skipped (predicted timeout)"
+SKIPPED_BUDGET = "Skipped (time budget)"
+SKIPPED_UNSUPPORTED = "Skipped (unsupported d)"
+
+def is_skipped(success):
+    '''Returns whether the Success value of a result is a skip, not a
+    measurement.'''
+    return str(success).startswith(SKIPPED)
+
+def instance_sizes(test_list, log=print):
+    '''Returns a dict from test path to (d, n, m) for the tests of
+    test_list, as collect_tests() returns them.  Tests whose header
+    can't be read are reported through log and left out.'''
+    sizes = {}
+    for (_, test_path) in test_list:
+        try:
+            sizes[test_path] = read_header(test_path)
+        except Exception as e:
+            log(f"Warning: unable to read the size of {test_path}: {e}")
+    return sizes
+
+def family(test_path, sizes):
+    '''Returns the family of the test at test_path: its directory and d.'''
+    d = sizes[test_path][0] if test_path in sizes else None
+    return (os.path.dirname(test_path), d)
+
+def size_key(test_path, sizes):
+    '''Returns the key tests are ordered by within their family: (m, n)
+    of the test at test_path, tests of unknown size last.'''
+    (_, n, m) = sizes.get(test_path, (None, float("inf"), float("inf")))
+    return (m, n)
+
+def dominates(size, cutoff):
+    '''Returns whether an instance of size (n, m) is at least as large as
+    cutoff in both n and m.'''
+    return size[0] >= cutoff[0] and size[1] >= cutoff[1]
+
+def order_tests(test_list, sizes):
+    '''Returns test_list with the tests of each family, in order of the
+    family's first test, sorted by size.  Tests of unknown size keep
+    their place after the others of their directory.'''
+    families = {}
+    for test in test_list:
+        families.setdefault(family(test[1], sizes), []).append(test)
+    ordered = []
+    for tests in families.values():
+        ordered += sorted(tests, key=lambda test: size_key(test[1], sizes))
+    return ordered
+
+class AdaptiveScheduler:
+    '''Decides, for one solver, which tests to skip.  run_test() asks
+    skip_reason() before running a test and reports its outcome to
+    record() afterwards.  Thread safe.'''
+
+    def __init__(self, sizes, skip_after=None, time_budget=None, supports=None):
+        self.sizes = sizes
+        self.skip_after = skip_after
+        self.time_budget = time_budget
+        self.supports = supports  # d -> whether the solver solves it
+        self.lock = threading.Lock()
+        self.streaks = {}  # family -> consecutive timeouts
+        self.cutoffs = {}  # family -> (n, m) of the last timeout before skipping
+        self.spent = 0.0
+        self.skipped = 0
+
+    def skip_reason(self, test_path):
+        '''Returns why the test at test_path should be skipped, or None
+        to run it.'''
+        with self.lock:
+            reason = None
+            if self.time_budget is not None and self.spent >= self.time_budget:
+                reason = SKIPPED_BUDGET
+            elif self.supports is not None and test_path in self.sizes \
+                    and not self.supports(self.sizes[test_path][0]):
+                reason = SKIPPED_UNSUPPORTED
+            elif test_path in self.sizes:
+                cutoff = self.cutoffs.get(family(test_path, self.sizes))
+                if cutoff is not None and dominates(self.sizes[test_path][1:], cutoff):
+                    reason = SKIPPED_PREDICTED
+            if reason is not None:
+                self.skipped += 1
+            return reason
+
+    def record(self, test_path, success, elapsed_time):
+        '''Records the outcome of a test that was run: its Success value
+        and the time its timed runs took.'''
+        with self.lock:
+            self.spent += elapsed_time
+            if self.skip_after is None or test_path not in self.sizes:
+                return
+            key = family(test_path, self.sizes)
+            if key in self.cutoffs:
+                return
+            if success == "Timed Out":
+                self.streaks[key] = self.streaks.get(key, 0) + 1
+                if self.streaks[key] >= self.skip_after:
+                    self.cutoffs[key] = self.sizes[test_path][1:]
+            else:
+                self.streaks[key] = 0
@@ -74,6 +74,194 @@ def parse_mmi(lines):
                      
     return (d, n, m, E, result)
 
+class MMIStream:
+    '''Incremental parser for .mmi files.  Takes a file object, or any
+    iterator over the lines of an .mmi file, and reads the d, n and m
+    header lines on construction.  The edges are then produced lazily
+    by chunks() or by iterating the stream, so a solver can consume
+    them in a single pass without the whole file held in memory.
+
+    Validation mirrors parse_mmi(): edge width, integer tokens,
+    duplicate edges and the optional trailing result line are checked
+    as the lines are read, raising the same exceptions (though a short
+    file is reported at the first line that gives it away, as the line
+    count isn't known up front).  Every edge
+    read so far is kept in the dict E, which is needed for duplicate
+    detection and, once the stream is exhausted, holds the instance
+    exactly as parse_mmi() returns it.  result is set once the stream
+    is exhausted.
+    '''
+
+    CHUNK_SIZE = 4096
+
+    def __init__(self, f):
+        self.lines = iter(f)
+        self.line_no = 0
+        self.E = {}
+        self.result = None
+        self.done = False
+
+        # Parse first three lines.
+        header = []
+        for (i, c) in [(0, "d"), (1, "n"), (2, "m")]:
+            line = self._next_line()
+            if line is None:
+                raise Exception("Insufficient lines to parse.")
+            if not str_is_int(line.strip()):
+                raise TypeError(f"Line {i}: Expected {c} is int, got: {line.strip()}")
+            header.append(int(line))
+        (self.d, self.n, self.m) = header
+
+    def _next_line(self):
+        '''Returns the next line, or None at the end of the input.'''
+        line = next(self.lines, None)
+        if line is not None:
+            self.line_no += 1
+        return line
+
+    def chunks(self, size=CHUNK_SIZE):
+        '''Yields the remaining edges as lists of at most size d-tuples,
+        then checks the optional result line.'''
+        d, m, E = self.d, self.m, self.E
+        chunk = []
+        while len(E) < m:
+            i = self.line_no
+            line = self._next_line()
+            if line is None:
+                raise Exception(f"Line {i}: Expected {m} {d}-edges, got {i - 3}")
+            toks = line.strip().split(",")
+            e = []
+            if len(toks) != d:
+                raise Exception(f"Line {i}: Expected {d}-edge, got {line.strip()}")
+            for j in range(d):
+                if not str_is_int(toks[j]):
+                    raise TypeError(f"Line {i}: Expected int, got {toks[j]}")
+                e.append(int(toks[j]))
+
+            e = tuple(e)
+            if e in E:
+                raise Exception(f"Line {i}: Duplicate edge detected, {line.strip()}")
+            E[e] = True
+            chunk.append(e)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+        if not self.done:
+            self._parse_result()
+            self.done = True
+
+    def _parse_result(self):
+        '''Parses the optional result line and rejects anything after it.'''
+        m = self.m
+        line = self._next_line()
+        if line is not None and line.strip() != "":
+            if not str_is_int(line.strip()):
+                raise TypeError(f"Line {m+3}: Expected int, got: {line.strip()}")
+            self.result = int(line)
+
+        line = self._next_line()
+        if line is not None:
+            raise Exception(f"Line {m+4}: Unexpected lines, {line.strip()}")
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk
+
+def parse_mmi_file(f):
+    '''Parses an .mmi instance from a file object or line iterator
+    with an MMIStream, returning (d, n, m, E, result) like parse_mmi()
+    without first reading the whole file into a list of lines.
+    '''
+    stream = MMIStream(f)
+    for _ in stream.chunks():
+        pass
+    return (stream.d, stream.n, stream.m, stream.E, stream.result)
+
+# ---- Persistent worker protocol, see mmb_persistent.py ----
+
+SERVER_FLAG = "--server"
+# Solvers only dump their instance and check their matching on stderr
+# when run with this flag, see Solver.do_main()
+DEBUG_FLAG = "--debug"
+# Solvers stop at the first matching found this many seconds in when
+# given this flag, see Solver.solve_until()
+DEADLINE_FLAG = "--deadline"
+# Solvers kernelize their instances first when given these flags, see
+# solvers/preprocess.py
+PREPROCESS_FLAG = "--preprocess"
+PREPROCESS_JOBS_FLAG = "--preprocess_jobs"
+# Solvers given this flag only print the d they solve on a line
+# "CAPABILITIES: min_d=<d> max_d=<d>", max_d left out if unbounded, see
+# Solver.do_main(), so mmb.py needn't import them
+CAPABILITIES_FLAG = "--capabilities"
+CAPABILITIES_PREFIX = "CAPABILITIES:"
+# Seconds a solver that timed out gets, after a SIGTERM, to write the
+# best matching it found
+FLUSH_GRACE = 1
+
+def write_message(f, payload, fields=None):
+    '''Writes the bytes payload to f with its length prefix.  The
+    optional dict fields is appended to the length line as key=value
+    pairs, e.g. a solver's phase timings.'''
+    header = b"%d" % len(payload)
+    if fields:
+        header += b" " + format_fields(fields).encode()
+    f.write(header + b"\n")
+    f.write(payload)
+    f.flush()
+
+def read_message(f, fields=None):
+    '''Reads one length prefixed message from f, returning its payload
+    as bytes, or None at the end of the stream.  Any key=value pairs on
+    the length line are added to the dict fields, if given.'''
+    header = f.readline()
+    if not header:
+        return None
+    toks = header.split(maxsplit=1)
+    size = int(toks[0])
+    if fields is not None and len(toks) > 1:
+        fields.update(parse_fields(toks[1].decode()))
+    payload = f.read(size)
+    if len(payload) != size:
+        return None
+    return payload
+
+# ---- Solver reported timings ----
+#
+# Solvers report how long they spent parsing, solving and emitting as
+# a line "TIMINGS: parse=<s> solve=<s> emit=<s>" on stderr, or on the
+# length line of their answer in persistent worker mode.
+
+TIMINGS_PREFIX = "TIMINGS:"
+
+def format_fields(fields):
+    '''Formats a dict of numbers as space separated key=value pairs.'''
+    return " ".join(f"{k}={v:.7f}" for (k, v) in fields.items())
+
+def parse_fields(text):
+    '''Parses space separated key=value pairs with numeric values into
+    a dict, ignoring anything malformed.'''
+    fields = {}
+    for tok in text.split():
+        (k, _, v) = tok.partition("=")
+        try:
+            fields[k] = float(v)
+        except ValueError:
+            pass
+    return fields
+
+def parse_timings(stderr):
+    '''Returns the timings of the last TIMINGS line in a solver's stderr
+    output as a dict, empty if there is none.'''
+    timings = {}
+    for line in stderr.splitlines():
+        if line.startswith(TIMINGS_PREFIX):
+            timings = parse_fields(line[len(TIMINGS_PREFIX):])
+    return timings
+
 def parse_check_is_matching(G, lines):
     '''Takes the parameters (d, n, m, E) as returned by parse_mmi()
     specifying a maximum matching instance graph G, and a list of
@@ -88,7 +276,12 @@ def parse_check_is_matching(G, lines):
 
     (d, n, m, E) = G
     M = {}
-    
+
+    # For each coordinate, maps a used vertex to the position in M of
+    # the edge using it, so conflicts are found in O(d) per edge.
+    used = [{} for _ in range(d)]
+    order = []
+
     for i in range(len(lines)):
         line = lines[i].strip()
         toks = line.strip().split(",")
@@ -109,13 +302,32 @@ def parse_check_is_matching(G, lines):
         if e in M:
             raise Exception(f"Solution Line {i}: Received duplicate edge {str(e)}")
 
-        # Verify e is coordinate-wise vertex disjoint to ensure M stays a matching of G.
-        for e2 in M:
-            for j in range(d):
-                if e[j] == e2[j]:
-                    raise Exception(f"Solution Line {i}: Edge {str(e)} conflicts with prior edge {str(e2)}")
+        # Verify e is coordinate-wise vertex disjoint to ensure M stays a
+        # matching of G, reporting the earliest prior edge it conflicts with.
+        conflicts = [used[j][e[j]] for j in range(d) if e[j] in used[j]]
+        if conflicts:
+            e2 = order[min(conflicts)]
+            raise Exception(f"Solution Line {i}: Edge {str(e)} conflicts with prior edge {str(e2)}")
 
         # Add e to the matching M. 
+        for j in range(d):
+            used[j][e[j]] = len(order)
+        order.append(e)
         M[e] = True
         
     return len(M)
+
+def parse_check_matchings(pairs):
+    '''Takes an iterable of (G, lines) pairs, each as accepted by
+    parse_check_is_matching(), and checks them all.  Returns a list with
+    one entry per pair, in order: the size of the matching if it is
+    valid, or the exception raised while checking it otherwise.
+    '''
+
+    results = []
+    for (G, lines) in pairs:
+        try:
+            results.append(parse_check_is_matching(G, lines))
+        except Exception as e:
+            results.append(e)
+    return results
@@ -1,5 +1,5 @@
 import igraph as ig
-from mmb_tools import parse_mmi
+from mmb_tools import parse_mmi_file
 import argparse
 
 '''sam_visualizer.py
@@ -25,10 +25,8 @@ def __get_graph(path):
     # If the path is invalid, throws an error
     toReturn = ""
     try:
-        f = open(path, "r")
-        lines = f.readlines()
-        f.close()
-        toReturn = parse_mmi(lines)
+        with open(path, "r") as f:
+            toReturn = parse_mmi_file(f)
     except:
         print("Error: .mmi instance not found: " + path)
         exit()
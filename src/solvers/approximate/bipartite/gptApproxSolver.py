@@ -16,6 +16,15 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../../"))
 from solver import Solver
 
 class Approximate_Solver(Solver):
+    # Only the last sampled graph's matching is returned, so there is no
+    # guarantee on its size
+    min_d = max_d = 2
+    randomized = True
+    complexity = "O(sqrt(n) / eps * n m), 4 sqrt(n) / eps rounds of Kuhn's algorithm"
+
+    @classmethod
+    def cost(cls, d, n, m):
+        return 8 * n ** 0.5 * n * m
 
     def solve(self, G):
         '''Takes an instance G = (d, n, m, E) in the format parse_mmi
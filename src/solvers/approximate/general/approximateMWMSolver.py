@@ -19,7 +19,17 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../../"))
 
 from solver import Solver
 
+EPSILON = 0.9
+
 class Approximate_Solver(Solver):
+    min_d = max_d = 2
+    randomized = True
+    complexity = "exponential, solves sampled subgraphs with A*"
+
+    @classmethod
+    def approximation(cls, d):
+        # Assadi's sample and solve finds a (1 - eps) approximation
+        return 1 / (1 - EPSILON)
 
     def solve(self, G):
         '''Takes an instance G = (d, n, m, E) in the format parse_mmi
@@ -32,9 +42,7 @@ class Approximate_Solver(Solver):
 
         GP = Graph([range(1,n+1)], list(E.keys()), weights)
 
-        epsilon = 0.9
-
-        matching = assadiApproximateAlgorithm(GP, epsilon)    
+        matching = assadiApproximateAlgorithm(GP, EPSILON)    
 
         return matching
     
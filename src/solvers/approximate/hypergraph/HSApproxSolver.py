@@ -19,12 +19,29 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../../"))
 from solver import Solver
 
 class HS_Solver(Solver):
+    anytime = True
+    complexity = "O(n m^2 |M|), at most n improvements each scanning pairs of edges"
+
+    @classmethod
+    def approximation(cls, d):
+        # Local search swapping one set for two is a (k+1)/2 approximation
+        # of k-set packing, k = d here
+        return (d + 1) / 2
+
+    @classmethod
+    def cost(cls, d, n, m):
+        return float(m) ** 2 * n * n
 
     def solve(self, G):
         '''Takes an instance G = (d, n, m, E) in the format parse_mmi
         produces.  Return a list contains d-edges as tuples of a maximum
         matching of G.
         '''
+        return self.solve_until(G)
+
+    def improve(self, G):
+        '''Yields the matching of every packing the local search improves
+        to, see HS_improvements().'''
         (d, n, m, E) = G
 
         S = 1
@@ -60,13 +77,12 @@ class HS_Solver(Solver):
             translatedEdges[edge] = mapping
             reverseTranslation[tuple(sorted(mapping))] = edge
 
-        packings = HS(list(translatedEdges.values()), S)
-        
-        matching = set()
-        for packing in packings:
-            matching.add(reverseTranslation[tuple(sorted(packing))])
+        for packings in HS_improvements(list(translatedEdges.values()), S):
+            matching = set()
+            for packing in packings:
+                matching.add(reverseTranslation[tuple(sorted(packing))])
 
-        return matching
+            yield matching
 
 def is_pairwise_disjoint(a, b):    
     running = set()
@@ -113,6 +129,15 @@ def replacement(sets, packing, p):
     return packing
 
 def HS(sets, s):
+    packing = set()
+    for packing in HS_improvements(sets, s):
+        pass
+
+    return packing
+
+def HS_improvements(sets, s):
+    '''Yields every packing the local search of HS() improves to, the
+    last one being its result.'''
     packing = set()
     sets = [tuple(s) for s in sets]
         
@@ -125,8 +150,7 @@ def HS(sets, s):
         else:
             packing = expandedPacking
             p = 0
-    
-    return packing
+            yield packing
             
     
 if __name__ == "__main__": 
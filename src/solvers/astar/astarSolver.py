@@ -20,6 +20,13 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
 from solver import Solver
 
 class Astar_Solver(Solver):
+    exact = True
+    complexity = "O(2^m) worst case, A* over sets of edges"
+
+    @classmethod
+    def cost(cls, d, n, m):
+        return 2.0 ** min(m, 1000)
+
     def solve(self, G):
         '''Takes an instance G = (d, n, m, E) in the format parse_mmi
         produces.  Return a list contains d-edges as tuples of a maximum
@@ -0,0 +1,202 @@
+#!/bin/python3
+
+'''hopcroftKarpSolver.py
+
+Exact maximum matching of bipartite graphs (d = 2) by Hopcroft-Karp,
+in O(m sqrt(n)).  The adjacency of each side is built from the edge
+array as CSR arrays with numpy, and both the breadth first search
+layering the graph and the depth first searches for augmenting paths
+are iterative, so long augmenting paths can't hit the recursion limit.
+
+The search starts from a Karp-Sipser matching: vertices left with one
+unmatched neighbour are matched to it, which is always safe, and when
+there are none the next unmatched vertex is matched greedily.  On most
+instances that leaves few augmentations to do.
+
+Each phase's larger matching is yielded from improve(), so the solver
+answers with the best matching so far when interrupted.
+'''
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../mmb/"))
+from mmb_arrays import edge_array
+from solver import Solver
+
+UNMATCHED = 0  # Vertices are numbered from 1
+INFINITY = float("inf")
+
+def csr_adjacency(tails, heads, size):
+    '''Returns the adjacency of the vertices 1..size, tails[k] -> heads[k]
+    for each edge k, as CSR lists (indptr, indices): the neighbours of u
+    are indices[indptr[u]:indptr[u + 1]].'''
+    order = np.argsort(tails, kind="stable")
+    indptr = np.zeros(size + 2, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=size + 1), out=indptr[1:])
+    # Python lists index much faster than numpy arrays in the loops below
+    return (indptr.tolist(), heads[order].tolist())
+
+def karp_sipser(left, right, match_l, match_r):
+    '''Extends the matching match_l, match_r of the graph with CSR
+    adjacencies left and right to a maximal one, by the Karp-Sipser
+    rules, see the module docstring.'''
+    ((lptr, ladj), (rptr, radj)) = (left, right)
+    # Unmatched neighbours of each unmatched vertex
+    deg_l = [lptr[u + 1] - lptr[u] for u in range(len(match_l))]
+    deg_r = [rptr[v + 1] - rptr[v] for v in range(len(match_r))]
+    ones = [(0, u) for u in range(1, len(match_l)) if deg_l[u] == 1]
+    ones += [(1, v) for v in range(1, len(match_r)) if deg_r[v] == 1]
+
+    def match(u, v):
+        (match_l[u], match_r[v]) = (v, u)
+        for k in range(lptr[u], lptr[u + 1]):
+            w = ladj[k]
+            if match_r[w] == UNMATCHED:
+                deg_r[w] -= 1
+                if deg_r[w] == 1:
+                    ones.append((1, w))
+        for k in range(rptr[v], rptr[v + 1]):
+            w = radj[k]
+            if match_l[w] == UNMATCHED:
+                deg_l[w] -= 1
+                if deg_l[w] == 1:
+                    ones.append((0, w))
+
+    def unmatched_neighbour(ptr, adj, mate, x):
+        for k in range(ptr[x], ptr[x + 1]):
+            if mate[adj[k]] == UNMATCHED:
+                return adj[k]
+        return UNMATCHED
+
+    u = 1
+    while True:
+        while ones:
+            (side, x) = ones.pop()
+            if side == 0 and match_l[x] == UNMATCHED:
+                v = unmatched_neighbour(lptr, ladj, match_r, x)
+                if v != UNMATCHED:
+                    match(x, v)
+            elif side == 1 and match_r[x] == UNMATCHED:
+                w = unmatched_neighbour(rptr, radj, match_l, x)
+                if w != UNMATCHED:
+                    match(w, x)
+        # No degree one vertex left, match greedily.  A vertex without an
+        # unmatched neighbour never gets one, so the scan only goes forward
+        while u < len(match_l):
+            if match_l[u] == UNMATCHED:
+                v = unmatched_neighbour(lptr, ladj, match_r, u)
+                if v != UNMATCHED:
+                    match(u, v)
+                    break
+            u += 1
+        else:
+            return
+
+def augment_phase(left, match_l, match_r):
+    '''Runs one phase of Hopcroft-Karp on the graph with CSR adjacency
+    left: augments the matching along a maximal set of vertex disjoint
+    shortest augmenting paths.  Returns the number of paths, 0 if the
+    matching is maximum.'''
+    (lptr, ladj) = left
+    n_l = len(match_l)
+
+    # Layer the left vertices by their distance from the unmatched ones,
+    # up to the layer of the shortest augmenting paths
+    dist = [INFINITY] * n_l
+    free = [u for u in range(1, n_l) if match_l[u] == UNMATCHED]
+    for u in free:
+        dist[u] = 0
+    queue = list(free)
+    shortest = INFINITY
+    for u in queue:  # Grows as it goes
+        if dist[u] >= shortest:
+            continue
+        for k in range(lptr[u], lptr[u + 1]):
+            w = match_r[ladj[k]]
+            if w == UNMATCHED:
+                shortest = dist[u]
+            elif dist[w] == INFINITY:
+                dist[w] = dist[u] + 1
+                queue.append(w)
+    if shortest == INFINITY:
+        return 0
+
+    # Depth first search from each unmatched vertex along the layers.
+    # nxt[u] is the edge of u being tried, stack the path so far
+    nxt = lptr[:-1]
+    augmented = 0
+    for root in free:
+        stack = [root]
+        while stack:
+            u = stack[-1]
+            end = lptr[u + 1]
+            while nxt[u] < end:
+                w = match_r[ladj[nxt[u]]]
+                if w == UNMATCHED:
+                    if dist[u] == shortest:
+                        break
+                elif dist[w] == dist[u] + 1:
+                    break
+                nxt[u] += 1
+            if nxt[u] == end:
+                # A dead end for the rest of the phase
+                dist[u] = INFINITY
+                stack.pop()
+                if stack:
+                    nxt[stack[-1]] += 1
+            elif w == UNMATCHED:
+                # Flip the path: each vertex takes the edge it is trying
+                for x in stack:
+                    v = ladj[nxt[x]]
+                    (match_l[x], match_r[v]) = (v, x)
+                    dist[x] = INFINITY
+                augmented += 1
+                break
+            else:
+                stack.append(w)
+    return augmented
+
+class HopcroftKarp_Solver(Solver):
+    min_d = max_d = 2
+    exact = True
+    anytime = True
+    complexity = "O(m sqrt(n)), Hopcroft-Karp from a Karp-Sipser matching"
+
+    @classmethod
+    def cost(cls, d, n, m):
+        return m * n ** 0.5
+
+    def solve(self, G):
+        '''Takes an instance G = (d, n, m, E) in the format parse_mmi
+        produces.  Return a list contains d-edges as tuples of a maximum
+        matching of G.
+        '''
+        return self.solve_until(G)
+
+    def improve(self, G):
+        '''Yields the Karp-Sipser matching, then the matching after each
+        phase of Hopcroft-Karp that grows it.'''
+        (d, n, m, E) = G
+        edges = edge_array(E, 2).astype(np.int64)
+        if len(edges) == 0:
+            yield []
+            return
+        (us, vs) = (edges[:, 0], edges[:, 1])
+        (n_l, n_r) = (max(n, int(us.max())), max(n, int(vs.max())))
+        left = csr_adjacency(us, vs, n_l)
+        right = csr_adjacency(vs, us, n_r)
+
+        match_l = [UNMATCHED] * (n_l + 1)
+        match_r = [UNMATCHED] * (n_r + 1)
+        karp_sipser(left, right, match_l, match_r)
+        yield [(u, v) for (u, v) in enumerate(match_l) if v != UNMATCHED]
+        while augment_phase(left, match_l, match_r):
+            yield [(u, v) for (u, v) in enumerate(match_l) if v != UNMATCHED]
+
+if __name__ == "__main__":
+    s = HopcroftKarp_Solver()
+    s.do_main()
@@ -0,0 +1,49 @@
+#!/bin/python3
+
+'''dispatchSolver.py
+
+Solves each instance with the engine of the solver registry (see
+registry.py) best suited to it: the exact solver with the lowest
+estimated cost for the instance's d, n and m.  Every registered solver
+is imported on start up, so running it with mmb.py's --persistent or
+--in_process avoids paying for that on every test.
+
+Run with --debug to see which engine each instance went to.
+'''
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+from mmb_tools import DEBUG_FLAG
+
+from registry import discover, choose
+from solver import Solver
+
+class Dispatch_Solver(Solver):
+    exact = True
+    delegates = True
+    complexity = "that of the engine chosen"
+
+    def __init__(self):
+        self.engines = discover(exclude=[__file__])
+        self.instances = {}
+
+    def solve(self, G):
+        '''Takes an instance G = (d, n, m, E) in the format parse_mmi
+        produces.  Return a list contains d-edges as tuples of a maximum
+        matching of G.
+        '''
+        engine = choose(self.engines, G, exact=True)
+        if engine is None:
+            raise ValueError(f"No registered exact solver solves instances with d = {G[0]}")
+        if DEBUG_FLAG in sys.argv[1:]:
+            print(f"DEBUG: Dispatching to {engine.name}", file=sys.stderr)
+
+        if engine.name not in self.instances:
+            self.instances[engine.name] = engine.solver_class()
+        return self.instances[engine.name].solve(G)
+
+if __name__ == "__main__":
+    s = Dispatch_Solver()
+    s.do_main()
@@ -33,6 +33,11 @@ class Prime_Solver(Solver):
     3--3--3        7--8--9
 
     """
+    complexity = "exponential, branches on every least conflicting edge"
+
+    @classmethod
+    def cost(cls, d, n, m):
+        return 2.0 ** min(m, 1000)
 
     def solve(self, G):
         '''Takes an instance G = (d, n, m, E) in the format parse_mmi
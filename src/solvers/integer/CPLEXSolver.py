@@ -19,6 +19,13 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
 from solver import Solver
 
 class CPLEXSolver(Solver):
+    exact = True
+    complexity = "NP-hard for d >= 3, a 0-1 program in m variables and dn constraints"
+
+    @classmethod
+    def cost(cls, d, n, m):
+        # Branch and bound rarely branches deep, the LP solves dominate
+        return float(m) ** 2 * d * n
 
     def solve(self, G):
         '''Takes an instance G = (d, n, m, E) in the format parse_mmi
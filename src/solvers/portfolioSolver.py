@@ -0,0 +1,168 @@
+#!/bin/python3
+
+'''portfolioSolver.py
+
+Races a portfolio of engines from the solver registry (see
+registry.py), by default every available one that solves the
+instance's d, each in its own forked worker process on the same parsed
+instance.  Engines send every matching they improve to; the best one so
+far is the portfolio's, and its size a lower bound shared with all
+workers, which only send matchings larger than it.  Upper bounds come
+from the instance itself (see upper_bound()) and from exact engines
+finishing.  The race stops as soon as the best matching meets the upper
+bound, i.e. is proven maximum, when every engine has finished, or at
+the deadline, if one is given with --deadline (see solver.py).
+
+Whether the matching is maximum depends on the engines and on where
+the race stopped, so the portfolio doesn't declare itself exact.  Each
+run reports whether its matching was proven maximum on a PORTFOLIO
+line on stderr, and in the attribute proven.
+
+Pick the engines by registry name with --engines:
+
+    python3 portfolioSolver.py --engines astarSolver,HSApproxSolver < instance.mmi
+'''
+
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+from mmb_tools import DEBUG_FLAG
+
+from registry import discover, applicable
+from solver import Solver, greedy_matching
+
+ENGINES_FLAG = "--engines"
+PORTFOLIO_PREFIX = "PORTFOLIO:"
+POLL_INTERVAL = 1.0  # seconds between checks for workers that died
+
+# Messages from the workers: (engine index, kind, payload)
+IMPROVED = "improved"  # payload: a larger matching
+FINISHED = "finished"  # payload: the size of the engine's final matching
+FAILED = "failed"  # payload: the error
+
+def upper_bound(G, M):
+    '''Returns an upper bound on the size of a maximum matching of G =
+    (d, n, m, E), given a maximal matching M of it: no more than the
+    vertices of any part that have edges, nor d |M|, as every edge of a
+    maximum matching meets one of the d |M| vertices of M in a vertex
+    no other edge of it does.'''
+    (d, n, m, E) = G
+    parts = [set() for _ in range(d)]
+    for e in E:
+        for (j, v) in enumerate(e):
+            parts[j].add(v)
+    return min([len(part) for part in parts] + [d * len(M)])
+
+def _run_engine(solver_class, G, i, results, lower):
+    '''Body of an engine's worker: sends each matching larger than the
+    shared lower bound that the engine finds, then its final size.'''
+    # Only the portfolio answers SIGINT, and terminate() stops a worker
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        size = 0
+        for M in solver_class().improve(G):
+            size = len(M)
+            with lower.get_lock():
+                if size <= lower.value:
+                    continue
+                lower.value = size
+            results.put((i, IMPROVED, list(M)))
+        results.put((i, FINISHED, size))
+    except Exception as e:
+        results.put((i, FAILED, f"{type(e).__name__}: {e}"))
+
+class Portfolio_Solver(Solver):
+    anytime = True
+    delegates = True
+    complexity = "that of the first engine to prove its matching maximum"
+
+    def __init__(self, engines=None):
+        '''engines are the registry names of the engines to race, all
+        available ones if None.'''
+        self.engines = [engine for engine in discover(exclude=[__file__])
+                        if engines is None or engine.name in engines]
+        if engines is not None:
+            missing = set(engines) - {engine.name for engine in self.engines if engine.available}
+            if missing:
+                raise ValueError(f"Unknown or unavailable engines: {', '.join(sorted(missing))}")
+        self.proven = False
+
+    def solve(self, G):
+        '''Takes an instance G = (d, n, m, E) in the format parse_mmi
+        produces.  Return a list contains d-edges as tuples of a maximum
+        matching of G, if self.proven is set afterwards.
+        '''
+        return self.solve_until(G)
+
+    def improve(self, G):
+        '''Yields a greedy matching, then every larger one an engine
+        finds, until one is proven maximum, see the module docstring.'''
+        (d, n, m, E) = G
+        debug = DEBUG_FLAG in sys.argv[1:]
+
+        self.proven = False
+        best = greedy_matching(E)
+        upper = upper_bound(G, best)
+        engines = applicable(self.engines, d)
+        workers = []
+        try:
+            yield best
+            if len(best) >= upper or not engines:
+                return
+
+            ctx = multiprocessing.get_context("fork")
+            results = ctx.Queue()
+            lower = ctx.Value('i', len(best))
+            workers = [ctx.Process(target=_run_engine, args=(engine.solver_class, G, i, results, lower), daemon=True)
+                       for (i, engine) in enumerate(engines)]
+            for worker in workers:
+                worker.start()
+            running = len(workers)
+            while running and len(best) < upper:
+                timeout = POLL_INTERVAL
+                if self.deadline is not None:
+                    timeout = min(timeout, self.deadline - time.perf_counter())
+                    if timeout <= 0:
+                        break
+                try:
+                    (i, kind, payload) = results.get(timeout=timeout)
+                except queue.Empty:
+                    # Workers that died without a word, e.g. killed for
+                    # lack of memory, won't finish
+                    if not any(worker.is_alive() for worker in workers):
+                        break
+                    continue
+
+                if kind == IMPROVED and len(payload) > len(best):
+                    best = payload
+                    if debug:
+                        print(f"DEBUG: {engines[i].name} found {len(best)} edges, at most {upper}",
+                              file=sys.stderr)
+                    yield best
+                elif kind == FINISHED:
+                    running -= 1
+                    if engines[i].solver_class.exact:
+                        upper = min(upper, payload)
+                elif kind == FAILED:
+                    running -= 1
+                    print(f"Warning: {engines[i].name} failed: {payload}", file=sys.stderr)
+        finally:
+            for worker in workers:
+                if worker.pid is not None:
+                    worker.kill()
+                    worker.join()
+            self.proven = len(best) >= upper
+            print(PORTFOLIO_PREFIX, f"size={len(best)} upper={upper} proven={int(self.proven)}", file=sys.stderr)
+
+if __name__ == "__main__":
+    engines = None
+    if ENGINES_FLAG in sys.argv[1:]:
+        engines = sys.argv[sys.argv.index(ENGINES_FLAG) + 1].split(",")
+    s = Portfolio_Solver(engines)
+    s.do_main()
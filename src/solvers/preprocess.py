@@ -0,0 +1,222 @@
+#!/bin/python3
+
+'''preprocess.py
+
+Kernelization of instances before they are solved.  kernelize() applies
+safe reductions, each leaving a maximum matching of what remains that
+extends to one of the whole instance, until none applies:
+
+- isolated: an edge that shares no vertex with another is in some
+  maximum matching, so it is taken.
+- dominated: if every vertex of an edge e that an edge f lacks is in
+  no other edge, any matching using f can use e instead, so f is
+  dropped.  This leaves e isolated once all such f are gone.
+- degree1: for d = 2, the case of a vertex in only one edge e: e is
+  taken and the other edges at e's second vertex are dropped.
+
+The edges left are split into the connected components of the conflict
+structure, edges conflicting when they share a vertex, and each
+component is relabeled to vertices 1..n_i per part, so it is an
+instance of its own.  Kernelized_Solver solves the components with any
+solver, one after the other or in a process pool, and maps their
+matchings back.  Solvers built on Solver.do_main do this when run with
+--preprocess, and --preprocess_jobs N solves N components at once:
+
+    python3 astar/astarSolver.py --preprocess < instance.mmi
+
+How much each rule shrank the instance goes to stderr on a PREPROCESS
+line.  Run directly to see that for an instance without solving it:
+
+    python3 preprocess.py ../benchmarks/tests/d3/Brute_Force/test1.mmi
+'''
+
+import argparse
+import multiprocessing
+import signal
+import sys
+from collections import deque
+
+from solver import Solver, parse_instance
+
+PREPROCESS_PREFIX = "PREPROCESS:"
+
+class Kernel:
+    '''What kernelize() leaves of an instance: the edges taken, the
+    components still to solve, each an instance (d, n_i, m_i, E_i) with
+    the vertex labels of each part in labels[i][j], and how many edges
+    each rule removed in stats.'''
+
+    def __init__(self, d, forced, components, labels, stats):
+        self.d = d
+        self.forced = forced
+        self.components = components
+        self.labels = labels
+        self.stats = stats
+
+    def lift(self, i, M):
+        '''Returns the matching M of component i in the vertex labels of
+        the whole instance.'''
+        labels = self.labels[i]
+        return [tuple(labels[j][v - 1] for (j, v) in enumerate(e)) for e in M]
+
+def kernelize(G):
+    '''Reduces the instance G = (d, n, m, E) as described in the module
+    docstring and returns the Kernel.'''
+    (d, n, m, E) = G
+    stats = {"edges": m, "isolated": 0, "dominated": 0, "degree1": 0}
+
+    # The edges at each vertex (j, v), v of part j
+    edges = list(dict.fromkeys(E))
+    incident = {}
+    for e in edges:
+        for vertex in enumerate(e):
+            incident.setdefault(vertex, set()).add(e)
+
+    alive = set(edges)
+    forced = []
+    queue = deque(edges)
+    queued = set(edges)
+
+    def remove(f, rule):
+        alive.discard(f)
+        stats[rule] += 1
+        for vertex in enumerate(f):
+            incident[vertex].discard(f)
+            # Edges at f's vertices may have become isolated or dominating
+            for g in incident[vertex]:
+                if g not in queued:
+                    queued.add(g)
+                    queue.append(g)
+
+    while queue:
+        e = queue.popleft()
+        queued.discard(e)
+        if e not in alive:
+            continue
+        shared = [vertex for vertex in enumerate(e) if len(incident[vertex]) > 1]
+        if not shared:
+            forced.append(e)
+            remove(e, "isolated")
+        elif d == 2 and len(shared) == 1:
+            for f in list(incident[shared[0]] - {e}):
+                remove(f, "degree1")
+            forced.append(e)
+            remove(e, "degree1")
+        elif len(shared) < d:
+            dominated = set.intersection(*[incident[vertex] for vertex in shared]) - {e}
+            for f in dominated:
+                remove(f, "dominated")
+
+    # Connected components of what is left, by union-find on the vertices
+    parent = {}
+    def find(vertex):
+        root = vertex
+        while parent.setdefault(root, root) != root:
+            root = parent[root]
+        while parent[vertex] != root:
+            (parent[vertex], vertex) = (root, parent[vertex])
+        return root
+
+    kernel = [e for e in edges if e in alive]
+    for e in kernel:
+        root = find((0, e[0]))
+        for vertex in enumerate(e[1:], 1):
+            other = find(vertex)
+            if other != root:
+                parent[other] = root
+
+    grouped = {}
+    for e in kernel:
+        grouped.setdefault(find((0, e[0])), []).append(e)
+
+    # Largest components first, relabeling each part's vertices to 1..n_i
+    components = []
+    labels = []
+    for group in sorted(grouped.values(), key=len, reverse=True):
+        part_labels = [sorted({e[j] for e in group}) for j in range(d)]
+        relabel = [{v: k for (k, v) in enumerate(part, 1)} for part in part_labels]
+        E_i = {tuple(relabel[j][v] for (j, v) in enumerate(e)): True for e in group}
+        components.append((d, max(len(part) for part in part_labels), len(E_i), E_i))
+        labels.append(part_labels)
+
+    stats["kernel"] = len(kernel)
+    stats["components"] = len(components)
+    stats["largest"] = components[0][2] if components else 0
+    return Kernel(d, forced, components, labels, stats)
+
+def format_stats(stats):
+    '''Formats the stats of a Kernel as space separated key=value pairs.'''
+    return " ".join(f"{k}={v}" for (k, v) in stats.items())
+
+def _init_worker():
+    # Only the solver driving the pool answers SIGINT, and terminate()
+    # stops a worker
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+def _solve_component(task):
+    '''Body of a pool worker: solves component i with a new instance of
+    solver_class, returning (i, matching).'''
+    (solver_class, i, C) = task
+    return (i, list(solver_class().solve(C)))
+
+class Kernelized_Solver(Solver):
+    '''Solves instances with another solver, engine, after kernelize(),
+    solving the components with up to jobs worker processes.  Solvers
+    that start processes of their own, such as portfolioSolver.py, need
+    jobs = 1, as pool workers can't have children.'''
+    anytime = True
+    delegates = True
+
+    def __init__(self, engine, jobs=1):
+        self.engine = engine
+        self.jobs = jobs
+        self.stats = None
+
+    def solve(self, G):
+        '''Takes an instance G = (d, n, m, E) in the format parse_mmi
+        produces.  Return a list contains d-edges as tuples of a maximum
+        matching of G, if the engine finds maximum ones.
+        '''
+        return self.solve_until(G)
+
+    def improve(self, G):
+        '''Yields the edges the reductions take, then the matching grown
+        by each component solved, or, solving one component at a time,
+        by each improvement the engine yields for it.'''
+        kernel = kernelize(G)
+        self.stats = kernel.stats
+        print(PREPROCESS_PREFIX, format_stats(kernel.stats), file=sys.stderr)
+
+        M = list(kernel.forced)
+        yield M
+        if self.jobs > 1 and len(kernel.components) > 1:
+            ctx = multiprocessing.get_context("fork")
+            tasks = [(type(self.engine), i, C) for (i, C) in enumerate(kernel.components)]
+            with ctx.Pool(min(self.jobs, len(tasks)), initializer=_init_worker) as pool:
+                for (i, M_i) in pool.imap_unordered(_solve_component, tasks):
+                    M = M + kernel.lift(i, M_i)
+                    yield M
+            return
+
+        self.engine.deadline = self.deadline
+        for (i, C) in enumerate(kernel.components):
+            done = M
+            improvements = self.engine.improve(C)
+            try:
+                for M_i in improvements:
+                    M = done + kernel.lift(i, M_i)
+                    yield M
+            finally:
+                improvements.close()
+
+# ================== Main ====================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shows how much preprocessing shrinks instances.")
+    parser.add_argument("instances", type=str, nargs="+", help="paths to .mmi files")
+    args = parser.parse_args()
+
+    for path in args.instances:
+        with open(path, "rb") as f:
+            kernel = kernelize(parse_instance(f.read()))
+        print(path, format_stats(kernel.stats))
@@ -0,0 +1,121 @@
+#!/bin/python3
+
+'''registry.py
+
+Registry of the solvers in this directory and the capabilities they
+declare (see the class attributes of Solver in solver.py): the d they
+solve, whether they are exact or else their approximation guarantee,
+whether they are randomized or anytime and their complexity.
+
+Solvers are found by their file names, *Solver.py anywhere below this
+directory, each defining one concrete Solver subclass, and registered
+under the file name without .py, e.g. astarSolver.  Solvers that can't
+be imported, e.g. for lack of a licensed module, are listed as
+unavailable with the reason.
+
+choose() picks the engine for an instance, see dispatchSolver.py.  Run
+directly to list the registry:
+
+    python3 registry.py -d 2
+'''
+
+import argparse
+import glob
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+from mmb_inprocess import load_solver_class
+
+SOLVERS_DIR = os.path.dirname(os.path.abspath(__file__))
+SOLVER_PATTERN = "*Solver.py"
+
+class RegisteredSolver:
+    '''A solver of the registry: its name, source path and Solver
+    subclass, or, if it couldn't be imported, the error why not.'''
+
+    def __init__(self, name, path, solver_class=None, error=None):
+        self.name = name
+        self.path = path
+        self.solver_class = solver_class
+        self.error = error
+
+    @property
+    def available(self):
+        return self.solver_class is not None
+
+    def describe(self, d=None):
+        '''Returns the solver's guarantee as text, with its ratio on
+        instances with d parts if d is given.'''
+        cls = self.solver_class
+        if cls.exact:
+            return "exact"
+        ratio = cls.approximation(d if d is not None else cls.min_d)
+        if ratio is None:
+            return "heuristic"
+        return f"{ratio:g}-approximate" if d is not None else "approximate"
+
+def discover(root=SOLVERS_DIR, exclude=()):
+    '''Imports the solvers below root, leaving out the paths in exclude,
+    and returns them as RegisteredSolvers sorted by name.'''
+    exclude = {os.path.abspath(path) for path in exclude}
+    solvers = []
+    for path in sorted(glob.glob(os.path.join(root, "**", SOLVER_PATTERN), recursive=True)):
+        if os.path.abspath(path) in exclude:
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            solvers.append(RegisteredSolver(name, path, load_solver_class(path)))
+        except Exception as e:
+            solvers.append(RegisteredSolver(name, path, error=f"{type(e).__name__}: {e}"))
+    return sorted(solvers, key=lambda solver: solver.name)
+
+def applicable(solvers, d, exact=False):
+    '''Returns the available solvers that solve instances with d parts,
+    only the exact ones if exact is set, leaving out those that delegate
+    to other solvers.'''
+    return [solver for solver in solvers if solver.available and not solver.solver_class.delegates
+            and solver.solver_class.supports(d) and (solver.solver_class.exact or not exact)]
+
+def rank(solver, d, n, m):
+    '''Sort key of a solver for an instance: exact solvers first, then by
+    approximation ratio, estimated cost and name.  Solvers without a
+    guarantee or cost estimate come after those with one.'''
+    cls = solver.solver_class
+    ratio = cls.approximation(d)
+    cost = cls.cost(d, n, m)
+    return (not cls.exact, ratio is None, ratio or 0, cost is None, cost or 0, solver.name)
+
+def choose(solvers, G, exact=False):
+    '''Returns the solver of solvers to run on the instance G = (d, n, m,
+    E): the cheapest exact one, or, if none applies and exact isn't
+    set, the applicable one with the best guarantee.  Returns None if
+    none applies.'''
+    (d, n, m, _) = G
+    candidates = applicable(solvers, d, exact)
+    if not candidates:
+        return None
+    return min(candidates, key=lambda solver: rank(solver, d, n, m))
+
+# ================== Main ====================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lists the registered solvers and their capabilities.")
+    parser.add_argument("-d", type=int, default=None, help="only list the solvers of instances with d parts")
+    args = parser.parse_args()
+
+    solvers = discover()
+    print(f"{'Solver':<24} {'d':>6} {'Guarantee':>22} {'Random':>7} {'Anytime':>8}  Complexity")
+    for solver in solvers:
+        if not solver.available:
+            if args.d is None:
+                print(f"{solver.name:<24} unavailable, {solver.error}")
+            continue
+        cls = solver.solver_class
+        if args.d is not None and not cls.supports(args.d):
+            continue
+        if cls.max_d is None:
+            ds = "any" if cls.min_d == 1 else f">= {cls.min_d}"
+        else:
+            ds = str(cls.min_d) if cls.min_d == cls.max_d else f"{cls.min_d}-{cls.max_d}"
+        print(f"{solver.name:<24} {ds:>6} {solver.describe(args.d):>22} {'yes' if cls.randomized else 'no':>7} "
+              f"{'yes' if cls.anytime else 'no':>8}  {cls.complexity or '-'}")
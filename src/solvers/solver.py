@@ -12,14 +12,87 @@ this is provided by Identity_Solver which returns the edge set of the
 graph as the "matching", which is unlikely to be correct.
 '''
 
-import sys, os
+import sys, os, time, signal
 from abc import ABC, abstractmethod
 
 # Finds path to mmb_tools, better done by updating PATH in environment.
 sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
 from mmb_tools import parse_mmi, parse_check_is_matching
+from mmb_tools import SERVER_FLAG, DEBUG_FLAG, DEADLINE_FLAG, PREPROCESS_FLAG, PREPROCESS_JOBS_FLAG
+from mmb_tools import CAPABILITIES_FLAG, CAPABILITIES_PREFIX
+from mmb_tools import TIMINGS_PREFIX, read_message, write_message, format_fields
+
+# Instances of at least this many bytes are parsed with parse_mmi_array()
+# even without fast_parse, where numpy's import time is made up for.
+FAST_PARSE_BYTES = 1 << 20
+
+def parse_instance(data, fast_parse=False):
+    '''Parses the bytes of an .mmi instance, returning (d, n, m, E).  If
+    fast_parse is set, or the instance is large, E is an EdgeView over
+    the edge array of parse_mmi_array(), otherwise the dict of
+    parse_mmi().'''
+    if fast_parse or len(data) >= FAST_PARSE_BYTES:
+        # Imported here so numpy is only loaded when it pays off
+        from mmb_arrays import parse_mmi_array, EdgeView
+        (d, n, m, E, _) = parse_mmi_array(data)
+        return (d, n, m, EdgeView(E))
+    (d, n, m, E, _) = parse_mmi(data.decode().splitlines())
+    return (d, n, m, E)
+
+def greedy_matching(edges):
+    '''Returns a maximal matching of the d-edges in edges, taken in order,
+    as a list.  It has at least 1 / d of the edges of a maximum one.'''
+    used = set()
+    M = []
+    for e in edges:
+        if all((j, v) not in used for (j, v) in enumerate(e)):
+            used.update(enumerate(e))
+            M.append(e)
+    return M
+
+def format_matching(M):
+    '''Returns the edges of the matching M as the lines of an .mmi file,
+    each ending in a newline.'''
+    return "".join([str(e)[1:-1] + "\n" for e in M])
 
 class Solver(ABC):
+    '''A maximum matching solver.  Subclasses declare what they can do in
+    the class attributes below, which registry.py collects to pick an
+    engine per instance and mmb.py uses to skip instances of a d the
+    solver doesn't support.'''
+
+    # Smallest and largest d solved, None for no upper limit
+    min_d = 1
+    max_d = None
+    # Whether the matching is always maximum, see also approximation()
+    exact = False
+    # Whether solve() draws random numbers
+    randomized = False
+    # Whether improve() yields matchings before the last, see solve_until()
+    anytime = False
+    # Whether the solver hands instances to other registered solvers,
+    # which then don't run it in turn, see registry.py
+    delegates = False
+    # Worst case running time, for people to read
+    complexity = None
+
+    @classmethod
+    def supports(cls, d):
+        '''Returns whether the solver solves instances with d parts.'''
+        return cls.min_d <= d and (cls.max_d is None or d <= cls.max_d)
+
+    @classmethod
+    def approximation(cls, d):
+        '''Returns the ratio r such that the matchings found on instances
+        with d parts have at least OPT / r edges: 1 if the solver is
+        exact, None if it has no guarantee.'''
+        return 1 if cls.exact else None
+
+    @classmethod
+    def cost(cls, d, n, m):
+        '''Returns a rough estimate of the steps taken solving an instance
+        of size d, n, m, to rank solvers by, or None if unknown.'''
+        return None
 
     @abstractmethod
     def solve(self, G):
@@ -28,38 +101,169 @@ class Solver(ABC):
         matching of G.
         '''
         pass
-        
-    def do_main(self):
 
-        # Capture the instance from stdin.
-        stdin_lines = []
+    def improve(self, G):
+        '''Yields matchings of G, each larger than the one before, as they
+        are found.  Anytime solvers, which hold a valid matching while
+        they search, override this, set anytime and solve with
+        solve_until(G).  Each matching yielded must be left unchanged
+        afterwards.  self.deadline holds solve_until()'s deadline, for
+        solvers that wait on something.  By default only solve(G)'s
+        matching is yielded.
+        '''
+        yield self.solve(G)
+
+    def solve_until(self, G, deadline=None):
+        '''Returns the last matching improve(G) yields, stopping at the
+        first one found after time.perf_counter() passes deadline, if
+        given.  The best matching so far is kept in self.best, so it is
+        still there if the search is interrupted.
+        '''
+        (self.best, self.deadline) = ([], deadline)
+        improvements = self.improve(G)
         try:
-            while True:
-                stdin_lines.append(input())
-        except EOFError:
-            pass
+            for M in improvements:
+                self.best = M
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+        finally:
+            improvements.close()
+        return self.best
+
+    def do_main(self, fast_parse=False):
+        '''Reads an instance from stdin, solves it and writes the matching
+        to stdout.  The instance is read in one go and parsed with
+        parse_instance(): if fast_parse is set, or the instance is large,
+        E is handed to solve as an EdgeView over the edge array of
+        parse_mmi_array().  The matching is written in a single write.
+
+        With --deadline SECONDS, solving stops at the first matching
+        found that many seconds in, see solve_until().  On SIGTERM or
+        SIGINT the best matching found so far is written instead, which
+        is how mmb.py collects it from solvers that time out.
+
+        With --preprocess, the instance is kernelized first, see
+        main_solver().  When run with --debug, the instance is dumped to stderr and the
+        matching checked.  When run with --server, serves a stream of
+        instances instead, see serve().  Either way, the time spent
+        parsing, solving and emitting the matching is reported to mmb.py.
+        With --capabilities, only the d it solves are printed.
+        '''
 
-        # Parse the instance
-        (d, n, m, E, _) = parse_mmi(stdin_lines)
-        G = (d, n, m, E)
+        if CAPABILITIES_FLAG in sys.argv[1:]:
+            capabilities = {"min_d": self.min_d, "max_d": self.max_d}
+            print(CAPABILITIES_PREFIX, " ".join(f"{k}={v}" for (k, v) in capabilities.items() if v is not None))
+            return
+        if SERVER_FLAG in sys.argv[1:]:
+            self.serve(fast_parse)
+            return
+        debug = DEBUG_FLAG in sys.argv[1:]
+        deadline = float(sys.argv[sys.argv.index(DEADLINE_FLAG) + 1]) if DEADLINE_FLAG in sys.argv[1:] else None
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+        # Capture and parse the instance in bulk.
+        parse_start = time.perf_counter()
+        G = parse_instance(sys.stdin.buffer.read(), fast_parse)
 
         # Output debug info to stderr.
-        print("DEBUG:", G, file=sys.stderr)
-    
-        # Solve the instance!
-        M = self.solve(G)
+        debug_start = time.perf_counter()
+        if debug:
+            print("DEBUG:", G, file=sys.stderr)
+        debug_time = time.perf_counter() - debug_start
+
+        # Solve the instance, or until interrupted!
+        solve_start = time.perf_counter()
+        (M, interrupted) = self.main_solver().solve_interruptibly(G, solve_start + deadline if deadline is not None else None)
+        if debug and interrupted:
+            print(f"DEBUG: Interrupted, writing the best matching found, {len(M)} edges", file=sys.stderr)
 
         # Output the matching on stdout.
-        M_lines = [str(e)[1:-1] for e in M]
-        for line in M_lines:
-            print(line)
+        emit_start = time.perf_counter()
+        M_lines = format_matching(M)
+        sys.stdout.write(M_lines)
+        sys.stdout.flush()
+        emit_end = time.perf_counter()
+
+        # Report phase timings, DEBUG output above excluded.
+        timings = {"parse": solve_start - parse_start - debug_time,
+                   "solve": emit_start - solve_start,
+                   "emit": emit_end - emit_start}
+        print(TIMINGS_PREFIX, format_fields(timings), file=sys.stderr)
 
         # Locally test correctness of M.
+        if debug:
+            try:
+                parse_check_is_matching(G, M_lines.splitlines())
+                print("DEBUG: Matching is correct!", file=sys.stderr)
+            except:
+                print("DEBUG: Matching is incorrect.", file=sys.stderr)
+    
+    def main_solver(self):
+        '''Returns the solver do_main() and serve() solve instances with:
+        this one, or, when run with --preprocess, this one behind the
+        reductions of preprocess.py, solving up to N components at once
+        with --preprocess_jobs N.
+        '''
+        argv = sys.argv[1:]
+        if PREPROCESS_FLAG not in argv and PREPROCESS_JOBS_FLAG not in argv:
+            return self
+        # Imported here as preprocess.py builds on this module
+        from preprocess import Kernelized_Solver
+        jobs = int(argv[argv.index(PREPROCESS_JOBS_FLAG) + 1]) if PREPROCESS_JOBS_FLAG in argv else 1
+        return Kernelized_Solver(self, jobs)
+
+    def solve_interruptibly(self, G, deadline=None):
+        '''Solves G with solve_until(G, deadline), returning (M,
+        interrupted).  If a SIGINT, or a SIGTERM with do_main()'s
+        handler, interrupts it, M is the best matching found so far.
+        Both signals are ignored afterwards, so they can't cut the
+        output of the matching short.
+        '''
+        self.best = []
         try:
-            parse_check_is_matching(G, M_lines)
-            print("DEBUG: Matching is correct!", file=sys.stderr)
-        except:
-            print("DEBUG: Matching is incorrect.", file=sys.stderr)
+            M = self.solve_until(G, deadline)
+            interrupted = False
+        except KeyboardInterrupt:
+            (M, interrupted) = (self.best, True)
+        finally:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, signal.SIG_IGN)
+        return (M, interrupted)
+
+    def serve(self, fast_parse=False):
+        '''Runs as a persistent worker for mmb.py (see mmb_persistent.py):
+        reads length prefixed instances from stdin until it is closed and
+        answers each with its length prefixed matching on stdout.  An
+        instance interrupted by SIGTERM is answered with the best
+        matching found so far, and the worker then exits.
+        '''
+
+        stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+        solver = self.main_solver()
+        while True:
+            data = read_message(stdin)
+            if data is None:
+                break
+
+            # Parse the instance
+            parse_start = time.perf_counter()
+            G = parse_instance(data, fast_parse)
+
+            # Solve the instance, or until interrupted!
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+            solve_start = time.perf_counter()
+            (M, interrupted) = solver.solve_interruptibly(G)
+
+            # Answer with the matching, timings go on its length line.
+            emit_start = time.perf_counter()
+            M_lines = format_matching(M).encode()
+            timings = {"parse": solve_start - parse_start,
+                       "solve": emit_start - solve_start,
+                       "emit": time.perf_counter() - emit_start}
+            write_message(stdout, M_lines, timings)
+            if interrupted:
+                break
     
 class Identity_Solver(Solver):
     '''Solves the maximum matching problem for bipartite graphs using the
@@ -0,0 +1,70 @@
+'''test_hopcroft_karp.py
+
+Tests of the Hopcroft-Karp solver of solvers/bipartite against Kuhn's
+algorithm and the known maximum matchings of the d = 2 benchmarks.
+Run from src/ with python3 -m pytest tests.
+'''
+
+import glob
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "../solvers/bipartite/"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "../solvers/approximate/bipartite/"))
+from mmb_tools import parse_check_is_matching
+from mmb_arrays import parse_mmi_array, EdgeView
+from hopcroftKarpSolver import HopcroftKarp_Solver, csr_adjacency, augment_phase, UNMATCHED
+from gptHelpers import BipartiteGraph, maximum_matching
+
+BENCHMARKS = os.path.join(os.path.dirname(__file__), "../benchmarks/tests/")
+
+def check(G, M):
+    '''Returns the size of M, asserting it is a matching of G.'''
+    return parse_check_is_matching(G, [", ".join(map(str, e)) for e in M])
+
+def kuhn(n, E):
+    '''Returns the size of a maximum matching of the bipartite graph with
+    parts 1..n and edges E by Kuhn's algorithm.'''
+    vertices = list(range(1, n + 1))
+    return len(maximum_matching(BipartiteGraph(vertices, vertices, list(E))))
+
+def test_matches_kuhn():
+    rng = random.Random(2)
+    for _ in range(200):
+        n = rng.randint(1, 30)
+        E = {(rng.randint(1, n), rng.randint(1, n)): True for _ in range(rng.randint(0, 4 * n))}
+        G = (2, n, len(E), E)
+        assert check(G, HopcroftKarp_Solver().solve(G)) == kuhn(n, E)
+
+@pytest.mark.parametrize("directory", ["d2", "d2PM"])
+def test_known_results(directory):
+    paths = sorted(glob.glob(os.path.join(BENCHMARKS, directory, "**", "*.mmi"), recursive=True))
+    checked = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            (d, n, m, E, result) = parse_mmi_array(f.read())
+        if result is None:
+            continue
+        G = (d, n, m, EdgeView(E))
+        assert check(G, HopcroftKarp_Solver().solve(G)) == result, path
+        checked += 1
+    assert checked > 0
+
+def test_long_augmenting_path():
+    # Left u is adjacent to right u and u + 1 and matched to u + 1, so the
+    # only augmenting path, from left n to right 1, runs through every
+    # vertex, far deeper than the recursion limit
+    n = 5 * sys.getrecursionlimit()
+    us = np.array([u for u in range(1, n + 1) for v in (u, u + 1) if v <= n])
+    vs = np.array([v for u in range(1, n + 1) for v in (u, u + 1) if v <= n])
+    left = csr_adjacency(us, vs, n)
+    match_l = [UNMATCHED] + [u + 1 for u in range(1, n)] + [UNMATCHED]
+    match_r = [UNMATCHED, UNMATCHED] + list(range(1, n))
+    assert augment_phase(left, match_l, match_r) == 1
+    assert match_l[1:] == list(range(1, n + 1)) and match_r[1:] == list(range(1, n + 1))
+    assert augment_phase(left, match_l, match_r) == 0
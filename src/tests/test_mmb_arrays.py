@@ -0,0 +1,118 @@
+'''test_mmb_arrays.py
+
+Tests of the array based parser, edge views and .mmib binary format of
+mmb_arrays.py.  Run from src/ with python3 -m pytest tests.
+'''
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+from mmb_tools import parse_mmi
+from mmb_arrays import parse_mmi_array, EdgeView, write_mmib, read_mmib, load_mmi, mmib_path, read_header
+
+INSTANCE = os.path.join(os.path.dirname(__file__), "../benchmarks/tests/d3/d3v3test.mmi")
+
+# Malformed instances, each rejected by all the parsers alike
+MALFORMED = [
+    "2\n3\n",                       # Short header
+    "x\n3\n1\n1,1\n",               # d isn't an int
+    "2\n3\n3\n1,1\n2,2\n",          # Fewer edges than m
+    "2\n3\n2\n1,1\n1,2,3\n",        # Edge of the wrong width
+    "2\n3\n2\n1,1\n2,y\n",          # Vertex isn't an int
+    "2\n3\n2\n1,1\n1,1\n",          # Duplicate edge
+    "2\n3\n1\n1,1\nz\n",            # Result isn't an int
+    "2\n3\n1\n1,1\n1\n5\n",         # Lines after the result
+]
+
+def parsed(parse, text):
+    '''Returns what parse makes of text, with the edges as a sorted list
+    of tuples, or the type and message of the exception it raised.'''
+    try:
+        (d, n, m, E, result) = parse(text)
+    except Exception as e:
+        return (type(e), str(e))
+    edges = E.tolist() if hasattr(E, "tolist") else E
+    return (d, n, m, sorted(map(tuple, edges)), result)
+
+def test_same_instance_as_parse_mmi():
+    with open(INSTANCE) as f:
+        text = f.read()
+    (d, n, m, E, result) = parse_mmi_array(text)
+    assert E.dtype.name == "int32" and E.shape == (m, d) and E.flags["C_CONTIGUOUS"]
+    assert parsed(parse_mmi_array, text) == parsed(lambda t: parse_mmi(t.splitlines()), text)
+    assert parse_mmi_array(text.encode())[3].tolist() == E.tolist()
+    assert parse_mmi_array(text.splitlines())[3].tolist() == E.tolist()
+
+@pytest.mark.parametrize("text", MALFORMED)
+def test_rejects_what_parse_mmi_rejects(text):
+    expected = parsed(lambda t: parse_mmi(t.splitlines()), text)
+    assert isinstance(expected[0], type)
+    assert parsed(parse_mmi_array, text) == expected
+
+def test_edge_view_acts_as_the_dict():
+    text = "3\n2\n2\n1,2,1\n2,1,2\n1\n"
+    (_, _, _, E, _) = parse_mmi_array(text)
+    view = EdgeView(E)
+    assert view._dict is None and len(view) == 2
+    assert list(view) == [(1, 2, 1), (2, 1, 2)]
+    assert view._dict is None  # Iterating doesn't build the dict
+    assert (1, 2, 1) in view and (1, 1, 1) not in view
+    assert view.copy() == parse_mmi(text.splitlines())[3]
+
+def test_mmib_round_trip(tmp_path):
+    with open(INSTANCE, "rb") as f:
+        (d, n, m, E, result) = parse_mmi_array(f.read())
+    path = str(tmp_path / "instance.mmib")
+    write_mmib(path, (d, n, m, EdgeView(E)), result)
+
+    (d2, n2, m2, E2, result2) = read_mmib(path)
+    assert (d2, n2, m2, result2) == (d, n, m, result)
+    assert E2.tolist() == E.tolist()
+    with open(path, "rb") as f:
+        assert parse_mmi_array(f.read())[3].tolist() == E.tolist()
+
+    # Without a known result, and without edges
+    write_mmib(path, (2, 0, 0, {}))
+    (d2, n2, m2, E2, result2) = read_mmib(path)
+    assert (d2, n2, m2, result2, E2.shape) == (2, 0, 0, None, (0, 2))
+
+def test_load_mmi_prefers_an_up_to_date_companion(tmp_path):
+    mmi = tmp_path / "instance.mmi"
+    mmi.write_text("2\n2\n1\n1,2\n1\n")
+    assert mmib_path(str(mmi)) is None
+    write_mmib(str(tmp_path / "instance.mmib"), (2, 2, 2, {(1, 2): True, (2, 1): True}), 2)
+    assert load_mmi(str(mmi))[2] == 2
+    assert read_header(str(mmi)) == (2, 2, 2)
+
+    # An .mmi file edited since is parsed again
+    os.utime(tmp_path / "instance.mmib", (0, 0))
+    assert load_mmi(str(mmi))[2] == 1
+
+@pytest.mark.parametrize("damage, message", [
+    (lambda data: data[:10], "Truncated .mmib header"),
+    (lambda data: b"MMIX" + data[4:], "Not an .mmib file"),
+    (lambda data: data[:4] + (2).to_bytes(4, "little") + data[8:], "Unsupported .mmib version 2"),
+    (lambda data: data[:-4], "file size doesn't match"),
+])
+def test_mmib_header_validation(tmp_path, damage, message):
+    path = str(tmp_path / "instance.mmib")
+    write_mmib(path, (2, 2, 2, {(1, 2): True, (2, 1): True}), 2)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(damage(data))
+    with pytest.raises(ValueError, match=message):
+        read_mmib(path)
+
+def test_convert_tree(tmp_path):
+    sys.path.append(os.path.join(os.path.dirname(__file__), "../tools/"))
+    from convert_benchmarks import convert_tree
+    (tmp_path / "d2").mkdir()
+    (tmp_path / "d2" / "good.mmi").write_text("2\n2\n1\n1,2\n1\n")
+    (tmp_path / "d2" / "bad.mmi").write_text("2\n2\n2\n1,2\n1,2\n")
+    assert convert_tree(str(tmp_path)) == (1, 0, 1)
+    assert read_mmib(str(tmp_path / "d2" / "good.mmib"))[3].tolist() == [[1, 2]]
+    assert convert_tree(str(tmp_path)) == (0, 1, 1)
@@ -0,0 +1,26 @@
+'''test_mmb_cache.py
+
+Tests of the instance cache of mmb_cache.py.  Run from src/ with
+python3 -m pytest tests.
+'''
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+from mmb_cache import InstanceCache
+
+INSTANCE = os.path.join(os.path.dirname(__file__), "../benchmarks/tests/d2/d2v10test.mmi")
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = InstanceCache(str(tmp_path))
+    (d, n, m, E, result) = cache.load(INSTANCE)
+    [entry] = os.listdir(tmp_path)
+    with open(tmp_path / entry, "r+b") as f:
+        f.truncate(10)
+
+    (d2, n2, m2, E2, result2) = cache.load(INSTANCE)
+    assert (d2, n2, m2, result2) == (d, n, m, result)
+    assert E2.tolist() == E.tolist()
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert cache.load(INSTANCE)[2] == m and cache.hits == 1
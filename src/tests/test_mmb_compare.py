@@ -0,0 +1,35 @@
+'''test_mmb_compare.py
+
+Tests of the regression verdicts of mmb_compare.py.  Run from src/
+with python3 -m pytest tests.
+'''
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+from mmb_compare import compare_pair, mann_whitney, min_p_value
+
+def entry(samples):
+    return {'path': "test.mmi", 'outcome': "True", 'samples': samples}
+
+def test_min_p_value():
+    assert min_p_value(3, 3) == mann_whitney([1, 2, 3], [4, 5, 6]) == 0.1
+    assert min_p_value(5, 5) < 0.05
+
+def test_three_runs_flag_large_regression():
+    # 3 vs 3 samples can't reach p < 0.05, so the threshold decides
+    (verdict, base_time, new_time, p) = compare_pair(entry([1.0, 1.1, 0.9]), entry([10.0, 11.0, 9.5]),
+                                                     threshold=0.1, alpha=0.05, min_diff=0.0)
+    assert (verdict, base_time, new_time, p) == ("regression", 1.0, 10.0, None)
+
+def test_three_runs_within_threshold_unchanged():
+    (verdict, _, _, _) = compare_pair(entry([1.0, 1.1, 0.9]), entry([1.05, 1.0, 1.02]),
+                                      threshold=0.1, alpha=0.05, min_diff=0.0)
+    assert verdict == "unchanged"
+
+def test_overlapping_samples_not_significant():
+    base = entry([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+    new = entry([1.5, 2.5, 3.5, 4.5, 5.5, 60.0])
+    (verdict, _, _, p) = compare_pair(base, new, threshold=0.1, alpha=0.05, min_diff=0.0)
+    assert verdict == "unchanged" and p >= 0.05
@@ -0,0 +1,33 @@
+'''test_mmb_resume.py
+
+Tests of the solver identities of mmb_resume.py.  Run from src/ with
+python3 -m pytest tests.
+'''
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+from mmb_resume import solver_id, solver_sources
+
+SOLVERS = os.path.join(os.path.dirname(__file__), "../solvers/")
+
+def test_sources_include_the_solver_base():
+    sources = solver_sources("python3 " + os.path.join(SOLVERS, "bipartite/hopcroftKarpSolver.py"))
+    assert os.path.abspath(os.path.join(SOLVERS, "solver.py")) in sources
+    assert os.path.abspath(os.path.join(SOLVERS, "../mmb/mmb_arrays.py")) in sources
+
+def test_editing_an_imported_module_changes_the_id(tmp_path):
+    (tmp_path / "base.py").write_text("class Base:\n    pass\n")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "mySolver.py").write_text(
+        "import os, sys\n"
+        "sys.path.append(os.path.join(os.path.dirname(__file__), \"../\"))\n"
+        "import numpy\n"
+        "from base import Base\n")
+    command = "python3 " + str(tmp_path / "sub" / "mySolver.py")
+    before = solver_id(command)
+    assert solver_id(command) == before
+
+    (tmp_path / "base.py").write_text("class Base:\n    x = 1\n")
+    assert solver_id(command) != before
@@ -0,0 +1,37 @@
+'''test_mmb_schedule.py
+
+Tests of the adaptive scheduling of mmb_schedule.py.  Run from src/
+with python3 -m pytest tests.
+'''
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+from mmb_schedule import AdaptiveScheduler, order_tests, SKIPPED_PREDICTED
+
+# d, n, m of the tests, all of one family
+SIZES = {"f/small.mmi": (3, 10, 20),
+         "f/wide.mmi": (3, 12, 5),  # larger n, far fewer edges
+         "f/dense.mmi": (3, 10, 400),  # same n, many more edges
+         "f/large.mmi": (3, 20, 500)}
+
+def test_order_by_edges_then_vertices():
+    tests = [(i, path) for (i, path) in enumerate(SIZES, 1)]
+    ordered = [path for (_, path) in order_tests(tests, SIZES)]
+    assert ordered == ["f/wide.mmi", "f/small.mmi", "f/dense.mmi", "f/large.mmi"]
+
+def test_skip_only_dominating_instances():
+    scheduler = AdaptiveScheduler(SIZES, skip_after=1)
+    scheduler.record("f/small.mmi", "Timed Out", 1.0)
+    # Larger n with fewer edges is still run, more of both is skipped
+    assert scheduler.skip_reason("f/wide.mmi") is None
+    assert scheduler.skip_reason("f/dense.mmi") == SKIPPED_PREDICTED
+    assert scheduler.skip_reason("f/large.mmi") == SKIPPED_PREDICTED
+
+def test_streak_reset_by_success():
+    scheduler = AdaptiveScheduler(SIZES, skip_after=2)
+    scheduler.record("f/wide.mmi", "Timed Out", 1.0)
+    scheduler.record("f/small.mmi", True, 0.1)
+    scheduler.record("f/dense.mmi", "Timed Out", 1.0)
+    assert scheduler.skip_reason("f/large.mmi") is None
@@ -0,0 +1,78 @@
+'''test_mmb_tools.py
+
+Tests of the streaming parser and the matching verifier of
+mmb_tools.py.  Run from src/ with python3 -m pytest tests.
+'''
+
+import io
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+from mmb_tools import parse_mmi, parse_mmi_file, MMIStream, parse_check_matchings
+
+INSTANCE = os.path.join(os.path.dirname(__file__), "../benchmarks/tests/d2/d2v10test.mmi")
+
+def test_stream_parses_as_parse_mmi():
+    with open(INSTANCE) as f:
+        expected = parse_mmi(f.readlines())
+    with open(INSTANCE) as f:
+        assert parse_mmi_file(f) == expected
+
+    # Edges come in chunks, in file order, the result once they are done
+    with open(INSTANCE) as f:
+        stream = MMIStream(f)
+        assert (stream.d, stream.n, stream.m) == expected[:3]
+        chunks = list(stream.chunks(size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert [e for chunk in chunks for e in chunk] == list(expected[3])
+    assert stream.result == expected[4] and stream.E == expected[3]
+
+@pytest.mark.parametrize("text", [
+    "2\n3\n",                       # Short header
+    "x\n3\n1\n1,1\n",               # d isn't an int
+    "2\n3\n3\n1,1\n2,2\n",          # Fewer edges than m
+    "2\n3\n2\n1,1\n1,2,3\n",        # Edge of the wrong width
+    "2\n3\n2\n1,1\n2,y\n",          # Vertex isn't an int
+    "2\n3\n2\n1,1\n1,1\n",          # Duplicate edge
+    "2\n3\n1\n1,1\nz\n",            # Result isn't an int
+    "2\n3\n1\n1,1\n1\n5\n",         # Lines after the result
+])
+def test_stream_rejects_what_parse_mmi_rejects(text):
+    with pytest.raises(Exception) as expected:
+        parse_mmi(text.splitlines())
+    with pytest.raises(type(expected.value), match=re.escape(str(expected.value))):
+        parse_mmi_file(io.StringIO(text))
+
+def test_stream_validates_as_it_goes():
+    stream = MMIStream(io.StringIO("2\n3\n3\n1,1\n2,2\n2,2\n"))
+    chunks = stream.chunks(size=1)
+    assert next(chunks) == [(1, 1)] and next(chunks) == [(2, 2)]
+    with pytest.raises(Exception, match="Line 5: Duplicate edge detected"):
+        next(chunks)
+
+# A 3-dimensional instance with 2 vertices per part
+G = (3, 2, 4, {(1, 1, 1): True, (2, 2, 2): True, (1, 2, 2): True, (2, 1, 1): True})
+
+def test_batch_checks_each_pair():
+    results = parse_check_matchings([
+        (G, ["1, 1, 1", "2, 2, 2"]),
+        (G, []),
+        (G, ["1, 1, 1", "2, 1, 1"]),
+        (G, ["1, 2, 3"]),
+        (G, ["1, 1"]),
+        (G, ["1, 1, 1", "1, 1, 1"]),
+        (G, ["2, 1, x"]),
+    ])
+    assert results[:2] == [2, 0]
+    assert "conflicts with prior edge (1, 1, 1)" in str(results[2])
+    assert "not present in graph" in str(results[3])
+    assert "Expected 3-edge" in str(results[4])
+    assert "duplicate edge" in str(results[5])
+    assert isinstance(results[6], TypeError)
+
+def test_batch_of_nothing():
+    assert parse_check_matchings([]) == []
@@ -0,0 +1,83 @@
+'''test_preprocess.py
+
+Tests of the kernelization of solvers/preprocess.py against a brute
+force maximum matching.  Run from src/ with python3 -m pytest tests.
+'''
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "../solvers/"))
+from mmb_tools import parse_check_is_matching
+from preprocess import kernelize, Kernelized_Solver
+from solver import Solver
+
+def brute_force(E):
+    '''Returns a maximum matching of the edges E, trying every subset.'''
+    def best(i, used):
+        if i == len(E):
+            return []
+        without = best(i + 1, used)
+        if any(vertex in used for vertex in enumerate(E[i])):
+            return without
+        with_e = [E[i]] + best(i + 1, used | set(enumerate(E[i])))
+        return with_e if len(with_e) > len(without) else without
+    return best(0, frozenset())
+
+class BruteForce_Solver(Solver):
+    def solve(self, G):
+        return brute_force(list(G[3]))
+
+def random_instance(rng, d, n, m):
+    E = {tuple(rng.randint(1, n) for _ in range(d)): True for _ in range(m)}
+    return (d, n, len(E), E)
+
+def check(G, M):
+    '''Returns the size of M, asserting it is a matching of G.'''
+    return parse_check_is_matching(G, [", ".join(map(str, e)) for e in M])
+
+@pytest.mark.parametrize("d", [2, 3])
+def test_kernel_keeps_the_maximum(d):
+    rng = random.Random(d)
+    for _ in range(40):
+        G = random_instance(rng, d, 5, rng.randint(1, 12))
+        kernel = kernelize(G)
+        M = list(kernel.forced)
+        for (i, C) in enumerate(kernel.components):
+            # Each component is an instance of its own, relabeled
+            (_, n_i, m_i, E_i) = C
+            assert m_i == len(E_i) and all(1 <= v <= n_i for e in E_i for v in e)
+            M += kernel.lift(i, brute_force(list(E_i)))
+        assert check(G, M) == len(brute_force(list(G[3])))
+        removed = sum(kernel.stats[rule] for rule in ("isolated", "dominated", "degree1"))
+        assert kernel.stats["kernel"] + removed == G[2]
+
+def test_rules():
+    # (1, 1) is isolated; (2, 2) has a degree one vertex, so (3, 2) goes
+    kernel = kernelize((2, 3, 3, {(1, 1): True, (2, 2): True, (3, 2): True}))
+    assert sorted(kernel.forced) == [(1, 1), (2, 2)]
+    assert kernel.components == [] and kernel.stats["isolated"] == 1 and kernel.stats["degree1"] == 2
+
+    # (1, 1, 1) dominates (1, 1, 2), whose third vertex is shared
+    kernel = kernelize((3, 2, 3, {(1, 1, 1): True, (1, 1, 2): True, (2, 2, 2): True}))
+    assert kernel.stats["dominated"] == 1 and sorted(kernel.forced) == [(1, 1, 1), (2, 2, 2)]
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_kernelized_solver(jobs):
+    rng = random.Random(jobs)
+    components = 0
+    for _ in range(10):
+        # Two dense halves on vertices 1..4 and 5..8
+        (_, _, _, A) = random_instance(rng, 3, 4, 10)
+        (_, _, _, B) = random_instance(rng, 3, 4, 10)
+        E = {**A, **{tuple(v + 4 for v in e): True for e in B}}
+        G = (3, 8, len(E), E)
+        solver = Kernelized_Solver(BruteForce_Solver(), jobs)
+        M = solver.solve(G)
+        assert check(G, M) == len(brute_force(list(G[3])))
+        components = max(components, solver.stats["components"])
+    assert components > 1
@@ -0,0 +1,32 @@
+'''test_race_files.py
+
+Checks that every .race file shipped in the repository resolves: its
+benchmark exists and lists instances, and its solvers' sources exist.
+Run from src/ with python3 -m pytest tests.
+'''
+
+import glob
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+from mmb import read_test_list
+from mmb_race import read_race, missing_source
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+RACE_FILES = sorted(glob.glob(os.path.join(SRC_DIR, "**", "*.race"), recursive=True))
+
+def test_race_files_found():
+    assert RACE_FILES
+
+@pytest.mark.parametrize("race_file", RACE_FILES, ids=os.path.basename)
+def test_race_file_resolves(race_file, monkeypatch):
+    (race, solvers) = read_race(race_file)
+    # Paths are relative to the race file, as mmb_race.py runs it
+    monkeypatch.chdir(os.path.dirname(race_file))
+    assert read_test_list(race["benchmark"]), f"{race['benchmark']} lists no instances"
+    for (name, options) in solvers:
+        in_process = options.get("in_process", "no").lower() in ("yes", "true", "on", "1")
+        assert missing_source(options["command"], in_process) is None, f"[{name}] names a missing solver"
@@ -0,0 +1,79 @@
+'''test_registry.py
+
+Tests of the solver registry of solvers/registry.py, the dispatcher
+built on it and how mmb.py reads a solver command's capabilities.  Run
+from src/ with python3 -m pytest tests.
+'''
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../mmb/"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "../solvers/"))
+from mmb_tools import parse_mmi, parse_check_is_matching
+from registry import discover, applicable, choose
+from dispatchSolver import Dispatch_Solver
+
+SOLVERS = os.path.abspath(os.path.join(os.path.dirname(__file__), "../solvers/"))
+BENCHMARKS = os.path.join(os.path.dirname(__file__), "../benchmarks/tests/")
+
+# Solvers of a registry of their own, by file name
+SOURCES = {
+    "bipartiteSolver.py": "min_d = max_d = 2\n    exact = True\n"
+                          "    @classmethod\n    def cost(cls, d, n, m):\n        return m",
+    "searchSolver.py": "exact = True\n"
+                       "    @classmethod\n    def cost(cls, d, n, m):\n        return m * n",
+    "greedySolver.py": "@classmethod\n    def approximation(cls, d):\n        return d",
+    "delegatingSolver.py": "exact = True\n    delegates = True",
+}
+
+def make_registry(root):
+    for (file_name, body) in SOURCES.items():
+        (root / file_name).write_text(
+            "import sys\n"
+            f"sys.path.append({SOLVERS!r})\n"
+            "from solver import Solver\n\n"
+            f"class {file_name[:-3]}(Solver):\n    {body}\n\n"
+            "    def solve(self, G):\n        return []\n")
+    (root / "brokenSolver.py").write_text("import no_such_module\n")
+    (root / "helpers.py").write_text("raise ImportError\n")
+
+def test_discover(tmp_path):
+    make_registry(tmp_path)
+    solvers = discover(str(tmp_path))
+    assert [solver.name for solver in solvers] == ["bipartiteSolver", "brokenSolver", "delegatingSolver",
+                                                   "greedySolver", "searchSolver"]
+    broken = solvers[1]
+    assert not broken.available and "no_such_module" in broken.error
+    assert solvers[0].describe() == "exact" and solvers[3].describe(3) == "3-approximate"
+
+def test_choose(tmp_path):
+    make_registry(tmp_path)
+    solvers = discover(str(tmp_path))
+    assert [solver.name for solver in applicable(solvers, 3)] == ["greedySolver", "searchSolver"]
+    assert choose(solvers, (2, 10, 20, None), exact=True).name == "bipartiteSolver"
+    assert choose(solvers, (3, 10, 20, None), exact=True).name == "searchSolver"
+
+    inexact = [solver for solver in solvers if solver.name == "greedySolver"]
+    assert choose(inexact, (3, 10, 20, None)).name == "greedySolver"
+    assert choose(inexact, (3, 10, 20, None), exact=True) is None
+
+def test_dispatch_solves_each_d():
+    solver = Dispatch_Solver()
+    for path in ["d2/d2v10test.mmi", "d3/d3v3test.mmi"]:
+        with open(os.path.join(BENCHMARKS, path)) as f:
+            (d, n, m, E, result) = parse_mmi(f.readlines())
+        M = solver.solve((d, n, m, E))
+        assert parse_check_is_matching((d, n, m, E), [", ".join(map(str, e)) for e in M]) == result
+
+def test_command_capabilities():
+    from mmb import supported_d
+    args = argparse.Namespace(any_d=False, exec_cmd=f"{sys.executable} {SOLVERS}/bipartite/hopcroftKarpSolver.py")
+    modules = set(sys.modules)
+    supports = supported_d(args)
+    assert supports(2) and not supports(3)
+    assert set(sys.modules) == modules  # Asked, not imported
+
+    args.exec_cmd = f"{sys.executable} {SOLVERS}/solver.py"
+    assert supported_d(args) is None
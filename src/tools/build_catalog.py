@@ -0,0 +1,32 @@
+"""
+build_catalog.py
+
+Scans the instances below a benchmarks directory and writes their
+metadata (d, n, m, known maximum matching size, density, degree
+statistics and content hash) to a catalog file, by default catalog.csv
+in that directory.  mmb.py --query then selects tests from the catalog
+without parsing them.  Entries of files that haven't changed since the
+last build are reused.
+
+Usage, from the src directory:
+
+python tools/build_catalog.py benchmarks
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../mmb"))
+from mmb_catalog import build_catalog, DEFAULT_CATALOG
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the instance catalog of a benchmarks directory.")
+    parser.add_argument("root", help="directory to search for .mmi and .mmib files")
+    parser.add_argument("-o", "--output", default=None,
+                        help=f"catalog file to write, defaults to {DEFAULT_CATALOG} in root")
+    args = parser.parse_args()
+
+    cataloged, reused, failed = build_catalog(args.root, args.output,
+                                              log=lambda line: print(line, file=sys.stderr))
+    print(f"{args.root}: cataloged {cataloged} instances ({reused} unchanged), failed {failed}")
@@ -0,0 +1,51 @@
+"""
+convert_benchmarks.py
+
+Converts every .mmi instance below the given directories into the binary
+.mmib format (see src/README.md), writing each one next to its source.
+mmb.py memory-maps an up to date .mmib companion instead of parsing the
+text, so benchmark runs can start solving straight away.
+
+Usage, from the src directory:
+
+python tools/convert_benchmarks.py benchmarks
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../mmb"))
+from mmb_arrays import parse_mmi_array, mmib_path, write_mmib
+
+
+def convert_tree(root, force=False):
+    """Converts all .mmi files below root, returning (converted, skipped, failed)."""
+    converted = skipped = failed = 0
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in sorted(file_names):
+            if not file_name.endswith(".mmi"):
+                continue
+            path = os.path.join(dir_path, file_name)
+            if not force and mmib_path(path) is not None:
+                skipped += 1
+                continue
+            try:
+                with open(path, "rb") as f:
+                    (d, n, m, E, result) = parse_mmi_array(f.read())
+                write_mmib(os.path.splitext(path)[0] + ".mmib", (d, n, m, E), result)
+                converted += 1
+            except Exception as e:
+                print(f"Error converting {path}: {e}", file=sys.stderr)
+                failed += 1
+    return converted, skipped, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert .mmi instances to the binary .mmib format.")
+    parser.add_argument("roots", nargs="+", help="directories to search for .mmi files")
+    parser.add_argument("-f", "--force", action="store_true", help="rewrite .mmib files that are already up to date")
+    args = parser.parse_args()
+
+    for root in args.roots:
+        converted, skipped, failed = convert_tree(root, args.force)
+        print(f"{root}: converted {converted}, up to date {skipped}, failed {failed}")